@@ -0,0 +1,43 @@
+from metrics import instrument
+
+
+# Описание столбцов набора для составления запросов: тип, значения категорий, диапазон чисел
+def describe_columns(df):
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == "category":
+            columns[column] = {"type": "category", "values": series.cat.categories.tolist()}
+        else:
+            columns[column] = {"type": "number", "min": series.min().item(), "max": series.max().item()}
+    return columns
+
+
+# Подключение к Flask серверу: JSON API для запросов к набору данных
+# POST /api/query - выполнение запроса (формат см. query.py), GET /api/columns - столбцы набора.
+# Набор данных и движок запросов импортируются при первом запросе, а не при старте процесса
+def init_app(server):
+    from flask import jsonify, request
+
+    @server.route("/api/query", methods=["POST"])
+    @instrument("api/query")
+    def query_endpoint():
+        from data import run_query
+        from query import Query, result_json
+
+        spec = request.get_json(silent=True)
+        try:
+            query = Query.parse(spec)
+            result, plan, version = run_query(query)
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
+        return jsonify(result_json(result, version, plan))
+
+    @server.route("/api/columns")
+    @instrument("api/columns")
+    def columns_endpoint():
+        from data import external, get_df, get_version
+
+        if external is not None:
+            return jsonify({"version": get_version(), "columns": external.get_derived("columns")})
+        return jsonify({"version": get_version(), "columns": describe_columns(get_df())})
@@ -1,12 +1,44 @@
-from dash import Dash, html, dcc, callback, Output, Input
+import argparse
+from dash import Dash, html, dcc, clientside_callback, ClientsideFunction, no_update, Output, Input, State
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-from pages import main, first, second
+from config import COMPRESS
+import api
+import metrics
+from metrics import instrument
+from pages import PAGES, load_page, page_container_id, register_callbacks
+from static_assets import image
+import static_assets
+
+# Объявления обратных вызовов страниц (сами страницы загружаются при первом переходе)
+register_callbacks()
+
+try:
+    from flask_compress import Compress
+except ImportError:
+    # Пакет flask-compress не установлен: ответы отдаются без сжатия
+    Compress = None
 
 # Настройка внешних стилей для приложения
 external_stylesheets = [dbc.themes.MORPH, 'https://fonts.googleapis.com/css2?family=Roboto:wght@300;400;700&display=swap', 'https://use.fontawesome.com/releases/v5.15.4/css/all.css']
 app = Dash(__name__, external_stylesheets=external_stylesheets)
 app.config.suppress_callback_exceptions = True
 
+# Сжатие ответов: JSON графиков сжимается в 4-5 раз. Сжатие Dash (compress=True)
+# не используется, так как оно принудительно оставляет только gzip
+if COMPRESS and Compress is not None:
+    app.server.config.update(COMPRESS_ALGORITHM=["br", "gzip"], COMPRESS_BR_LEVEL=4, COMPRESS_MIN_SIZE=500)
+    Compress(app.server)
+
+# Метрики времени обратных вызовов на /metrics
+metrics.init_app(app.server)
+
+# JSON API запросов к набору данных для аналитиков
+api.init_app(app.server)
+
+# Собранные изображения (python static_assets.py) и долгое кеширование статических файлов
+static_assets.init_app(app.server)
+
 # Определение цветовой схемы
 DARK = "#211B5F"
 LIGHT = "#ADA6E4"
@@ -34,7 +66,8 @@ CONTENT_STYLE = {
     "color": DARK
 }
 
-# Стили для кнопок
+# Стили для кнопок. Кнопка текущей страницы выделяется классом sidebar-current
+# (assets/sidebar.css) на стороне браузера, без запроса к серверу
 BUTTON_STYLE = {
     "width": "100%",
     "text-align": "left",
@@ -47,29 +80,57 @@ BUTTON_STYLE = {
     "text-shadow": "0 2px 10px #141135"
 }
 
-# Стили для активных кнопок
-BUTTON_STYLE_ACTIVE = {
-    "background-color": ACCENT,
-    "color": "#FFEEB3",
-    "box-shadow": "0 4px 8px #141135",
-    "text-shadow": "0 2px 12px #A67A09"
-}
+ICON_STYLE = {"width": "24px", "height": "24px", "marginLeft": "0px"}
+
+# Кнопки боковой панели: идентификатор, адрес, иконки (обычная и для текущей страницы), подпись
+BUTTONS = [
+    ("btn-home", "/", "star1.png", "star2.png", " Главная"),
+    ("btn-page-1", "/page-1", "sleep1.png", "sleep2.png", " Образ жизни"),
+    ("btn-page-2", "/page-2", "hp1.png", "hp2.png", " Здоровье"),
+]
+
+
+# Кнопка боковой панели. Обе иконки загружаются сразу, видна одна из них
+# в зависимости от класса кнопки
+def nav_button(button_id, href, icon, current_icon, label):
+    return dbc.Button([
+        image(icon, sizes="24px", className="sidebar-icon", style=ICON_STYLE),
+        image(current_icon, sizes="24px", className="sidebar-icon-current", style=ICON_STYLE),
+        label,
+    ], href=href, style=BUTTON_STYLE, className="sidebar-button", id=button_id)
+
 
 # Создание боковой панели
 sidebar = html.Div(
     [
         html.H2("Страницы", className="display-6", style={"font-weight": "bold", "color": LIGHT, "font-size": "2.6rem", "margin-top": "0rem", "margin-left": "0.7rem", "text-shadow": "0 2px 10px #141135"}),
-        html.Div([
-            dbc.Button([html.Img(src="/assets/star1.png", style={"width": "24px", "height": "24px", "marginLeft": "0px"}, id="img-home"), " Главная"], href="/", style=BUTTON_STYLE, id="btn-home"),
-            dbc.Button([html.Img(src="/assets/sleep1.png", style={"width": "24px", "height": "24px", "marginLeft": "0px"}, id="img-page-1"), " Образ жизни"], href="/page-1", style=BUTTON_STYLE, id="btn-page-1"),
-            dbc.Button([html.Img(src="/assets/hp1.png", style={"width": "24px", "height": "24px", "marginLeft": "0px"}, id="img-page-2"), " Здоровье"], href="/page-2", style=BUTTON_STYLE, id="btn-page-2"),
-        ],style={"margin-top": "2rem"}),
+        html.Div([nav_button(*button) for button in BUTTONS], style={"margin-top": "2rem"}),
     ],
     style=SIDEBAR_STYLE,
 )
 
-# Создание контейнера для основного содержимого
-content = html.Div(id="page-content", style=CONTENT_STYLE)
+HIDDEN = {"display": "none"}
+
+# Страница для неизвестного адреса; текст с адресом подставляется в браузере
+not_found = html.Div(
+    [
+        html.H1("404: Not found", className="text-danger"),
+        html.Hr(),
+        html.P(id="not-found-text", className="lead"),
+    ],
+    id="page-not-found",
+    className="p-5 bg-light rounded-3 text-center",
+    style=HIDDEN,
+)
+
+# Создание контейнера для основного содержимого: по контейнеру на страницу,
+# пути страниц для браузера и запрос макета страницы у сервера
+content = html.Div(
+    [html.Div(id=page_container_id(pathname), style=HIDDEN) for pathname in PAGES]
+    + [not_found, dcc.Store(id="page-routes", data=list(PAGES)), dcc.Store(id="page-request")],
+    id="page-content",
+    style=CONTENT_STYLE,
+)
 
 # Определение макета приложения
 app.layout = html.Div([
@@ -78,52 +139,44 @@ app.layout = html.Div([
     content
 ], style={"font-family": "Roboto, sans-serif", "background-color": LIGHT})
 
-# Callback для обновления стилей кнопок и изображений в зависимости от текущей страницы
-@app.callback(
-    [Output("btn-home", "style"),
-     Output("btn-page-1", "style"),
-     Output("btn-page-2", "style"),
-     Output("img-home", "src"),
-     Output("img-page-1", "src"),
-     Output("img-page-2", "src")],
-    [Input("url", "pathname")]
+# Подсветка кнопки текущей страницы (assets/clientside.js)
+clientside_callback(
+    ClientsideFunction(namespace="sleep", function_name="active_page"),
+    [Output(button_id, "className") for button_id, *_ in BUTTONS],
+    Input("url", "pathname"),
+    [State(button_id, "href") for button_id, *_ in BUTTONS]
 )
-def update_active_button(pathname):
-    btn_styles = [BUTTON_STYLE.copy(), BUTTON_STYLE.copy(), BUTTON_STYLE.copy()]
-    img_srcs = ["/assets/star1.png", "/assets/sleep1.png", "/assets/hp1.png"]
-    
-    if pathname == "/":
-        btn_styles[0].update(BUTTON_STYLE_ACTIVE)
-        img_srcs[0] = "/assets/star2.png"
-    elif pathname == "/page-1":
-        btn_styles[1].update(BUTTON_STYLE_ACTIVE)
-        img_srcs[1] = "/assets/sleep2.png"
-    elif pathname == "/page-2":
-        btn_styles[2].update(BUTTON_STYLE_ACTIVE)
-        img_srcs[2] = "/assets/hp2.png"
-    
-    return btn_styles + img_srcs
-
-# Callback для отображения содержимого страницы в зависимости от URL
+
+# Показ страницы по адресу в браузере: при возврате на открытую ранее страницу
+# сервер не участвует, при первом переходе запрашивается её макет
+clientside_callback(
+    ClientsideFunction(namespace="sleep", function_name="show_page"),
+    [Output(page_container_id(pathname), "style") for pathname in PAGES]
+    + [Output("page-not-found", "style"), Output("not-found-text", "children"), Output("page-request", "data")],
+    Input("url", "pathname"),
+    [State("page-routes", "data")] + [State(page_container_id(pathname), "children") for pathname in PAGES]
+)
+
+# Callback для загрузки макета страницы в её контейнер (один раз за сеанс)
 @app.callback(
-    Output("page-content", "children"),
-    [Input("url", "pathname")])
+    [Output(page_container_id(pathname), "children") for pathname in PAGES],
+    Input("page-request", "data"),
+    prevent_initial_call=True)
+@instrument("render_page_content")
 def render_page_content(pathname):
-    if pathname == "/":
-        return main.layout
-    elif pathname == "/page-1":
-        return first.layout
-    elif pathname == "/page-2":
-        return second.layout
-    return html.Div(
-        [
-            html.H1("404: Not found", className="text-danger"),
-            html.Hr(),
-            html.P(f"The pathname {pathname} was not recognised...", className="lead"),
-        ],
-        className="p-5 bg-light rounded-3 text-center",
-    )
+    page = load_page(pathname)
+    if page is None:
+        raise PreventUpdate
+    return [page.layout if path == pathname else no_update for path in PAGES]
 
 # Запуск сервера приложения
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Дашборд показателей сна")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="вывести время импорта модулей и память при старте и при загрузке страниц, затем выйти")
+    args = parser.parse_args()
+    if args.profile_startup:
+        from import_profile import print_import_profile
+        print_import_profile("app", ["pages.first", "pages.second"])
+    else:
         app.run_server(debug=True)
\ No newline at end of file
@@ -0,0 +1,436 @@
+// Клиентский режим (SLEEP_CLIENTSIDE=1): фильтрация, агрегация и построение
+// графиков по кубу предагрегатов, переданному сервером в dcc.Store.
+// В серверном режиме отсюда используются задержка фильтров (debounce_filters)
+// и навигация по страницам (active_page, show_page)
+(function () {
+    // Свёртка ячеек куба: отбор по выбранным значениям фильтров
+    // и суммирование по ключам группировки, как Cube.answer на сервере
+    function fold(store, name, selections) {
+        var cube = store.cube;
+        var grouping = cube.groupings[name];
+        var columns = grouping.columns;
+        var categories = cube.categories;
+
+        var allowed = {};
+        Object.keys(selections).forEach(function (column) {
+            var values = selections[column];
+            if (values && values.length) {
+                var codes = {};
+                values.forEach(function (value) {
+                    var code = categories[column].indexOf(value);
+                    if (code >= 0) {
+                        codes[code] = true;
+                    }
+                });
+                allowed[column] = codes;
+            }
+        });
+
+        var groups = {};
+        var order = [];
+        for (var i = 0; i < columns.count.length; i++) {
+            var selected = true;
+            for (var column in allowed) {
+                if (!allowed[column][columns[column][i]]) {
+                    selected = false;
+                    break;
+                }
+            }
+            if (!selected) {
+                continue;
+            }
+            var keys = grouping.keys.map(function (key) { return columns[key][i]; });
+            var id = keys.join("|");
+            var group = groups[id];
+            if (!group) {
+                group = groups[id] = {keys: keys, count: 0, sums: grouping.measures.map(function () { return 0; })};
+                order.push(id);
+            }
+            group.count += columns.count[i];
+            for (var j = 0; j < grouping.measures.length; j++) {
+                group.sums[j] += columns[grouping.measures[j]][i];
+            }
+        }
+
+        var rows = order.map(function (id) {
+            var group = groups[id];
+            var row = {count: group.count};
+            grouping.keys.forEach(function (key, j) { row[key] = group.keys[j]; });
+            grouping.measures.forEach(function (measure, j) { row[measure] = group.sums[j] / group.count; });
+            return row;
+        });
+        // Категории сравниваются по кодам, т.е. в порядке категорий, как при groupby
+        rows.sort(function (a, b) {
+            for (var j = 0; j < grouping.keys.length; j++) {
+                var key = grouping.keys[j];
+                if (a[key] !== b[key]) {
+                    return a[key] - b[key];
+                }
+            }
+            return 0;
+        });
+        rows.forEach(function (row) {
+            grouping.keys.forEach(function (key) {
+                if (categories[key]) {
+                    row[key] = categories[key][row[key]];
+                }
+            });
+        });
+        return rows;
+    }
+
+    function pluck(rows, column) {
+        return rows.map(function (row) { return row[column]; });
+    }
+
+    function round2(value) {
+        return Math.round(value * 100) / 100;
+    }
+
+    function axes(xTitle, yTitle) {
+        return {
+            xaxis: {anchor: "y", domain: [0, 1], title: {text: xTitle}},
+            yaxis: {anchor: "x", domain: [0, 1], title: {text: yTitle}}
+        };
+    }
+
+    function layout(store, extra) {
+        return Object.assign({template: store.template, margin: {t: 60}}, extra);
+    }
+
+    function gauge(figure, value) {
+        var result = JSON.parse(JSON.stringify(figure));
+        result.data[0].value = value;
+        return result;
+    }
+
+    function overall(store, selections, measure) {
+        var rows = fold(store, "overall", selections);
+        return rows.length ? rows[0][measure] : null;
+    }
+
+    // Идентификатор вкладки и номер последнего изменения фильтров: по ним сервер
+    // отбрасывает запросы, фильтры которых уже изменились снова
+    var session = Math.random().toString(36).slice(2) + Date.now().toString(36);
+    var sequence = 0;
+    // Отложенные обновления хранилищ фильтров: идентификатор хранилища -> {timer, resolve}
+    var pendingFilters = {};
+
+    // Подгонка графиков видимой страницы под ширину: графики, построенные
+    // или изменённые, пока страница была скрыта, имеют ширину по умолчанию
+    function resizeVisibleGraphs() {
+        if (!window.Plotly) {
+            return;
+        }
+        document.querySelectorAll(".js-plotly-plot").forEach(function (graph) {
+            if (graph.offsetParent !== null) {
+                window.Plotly.Plots.resize(graph);
+            }
+        });
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        sleep: {
+            // Перенос значений фильтров в хранилище через state.delay мс после последнего
+            // изменения. Первое значение (загрузка страницы) переносится сразу, отменённое
+            // ожидание завершается без обновления
+            debounce_filters: function () {
+                var values = Array.prototype.slice.call(arguments, 0, -1);
+                var state = arguments[arguments.length - 1];
+                var pending = pendingFilters[state.store];
+                if (pending) {
+                    clearTimeout(pending.timer);
+                    pending.resolve(window.dash_clientside.no_update);
+                    delete pendingFilters[state.store];
+                }
+                if (state.values && JSON.stringify(values) === JSON.stringify(state.values)) {
+                    return window.dash_clientside.no_update;
+                }
+                var update = Object.assign({}, state, {values: values, session: session});
+                if (!state.values || !state.delay) {
+                    return Object.assign(update, {seq: ++sequence});
+                }
+                return new Promise(function (resolve) {
+                    var entry = {resolve: resolve};
+                    entry.timer = setTimeout(function () {
+                        delete pendingFilters[state.store];
+                        resolve(Object.assign(update, {seq: ++sequence}));
+                    }, state.delay);
+                    pendingFilters[state.store] = entry;
+                });
+            },
+
+            // Классы кнопок боковой панели: кнопка текущей страницы подсвечивается
+            // (assets/sidebar.css). Аргументы - путь и адреса кнопок
+            active_page: function (pathname) {
+                return Array.prototype.slice.call(arguments, 1).map(function (href) {
+                    return href === pathname ? "sidebar-button sidebar-current" : "sidebar-button";
+                });
+            },
+
+            // Показ страницы по пути: контейнеры остальных страниц скрываются, но остаются
+            // в документе вместе с графиками и значениями фильтров. Макет страницы
+            // запрашивается у сервера (page-request) только при первом переходе на неё.
+            // Аргументы - путь, пути страниц и содержимое их контейнеров
+            show_page: function (pathname, routes) {
+                var contents = Array.prototype.slice.call(arguments, 2);
+                var index = routes.indexOf(pathname);
+                var hidden = {display: "none"};
+                var styles = routes.map(function (route, i) {
+                    return i === index ? {} : hidden;
+                });
+                if (index < 0) {
+                    return styles.concat([{}, "The pathname " + pathname + " was not recognised...", window.dash_clientside.no_update]);
+                }
+                setTimeout(resizeVisibleGraphs, 0);
+                return styles.concat([hidden, window.dash_clientside.no_update, contents[index] ? window.dash_clientside.no_update : pathname]);
+            },
+
+            // Страница «Образ жизни»
+            first_scatter: function (genders, bmis, store) {
+                if (!store) {
+                    return window.dash_clientside.no_update;
+                }
+                var labels = store.labels;
+                var rows = fold(store, "scatter", {"Gender": genders, "BMI Category": bmis});
+                var byProfession = {};
+                rows.forEach(function (row) {
+                    (byProfession[row.Occupation] = byProfession[row.Occupation] || []).push(row);
+                });
+                // Много точек: WebGL вместо SVG, как на сервере
+                var type = rows.length > labels.scatter_webgl_points ? "scattergl" : "scatter";
+                var data = labels.professions.filter(function (profession) {
+                    return byProfession[profession];
+                }).map(function (profession) {
+                    var group = byProfession[profession];
+                    var name = labels.profession_translation[profession];
+                    return {
+                        type: type,
+                        mode: "markers",
+                        name: name,
+                        legendgroup: profession,
+                        showlegend: true,
+                        orientation: "v",
+                        x: pluck(group, "Sleep Duration"),
+                        y: pluck(group, "Stress Level"),
+                        xaxis: "x",
+                        yaxis: "y",
+                        marker: {
+                            color: labels.profession_colors[profession],
+                            size: group.map(function (row) { return round2(row["Quality of Sleep"]); }),
+                            sizemode: "diameter",
+                            sizeref: 0.3,
+                            symbol: "circle"
+                        },
+                        hovertemplate: [
+                            "Профессия: " + name,
+                            "Продолжительность сна: %{x}",
+                            "Уровень стресса: %{y}",
+                            "Качество сна: %{marker.size:.2f}"
+                        ].join("<br>") + "<extra></extra>"
+                    };
+                });
+                return {
+                    data: data,
+                    layout: layout(store, Object.assign(axes("Продолжительность сна", "Уровень стресса"), {
+                        legend: {title: {text: "Профессия"}, tracegroupgap: 0, itemsizing: "constant"},
+                        plot_bgcolor: "#E3E1F4",
+                        paper_bgcolor: "#E3E1F4",
+                        height: 378
+                    }))
+                };
+            },
+
+            first_pie: function (genders, bmis, store) {
+                if (!store) {
+                    return window.dash_clientside.no_update;
+                }
+                var rows = fold(store, "steps_by_quality", {"Gender": genders, "BMI Category": bmis});
+                var colors = store.palettes.Purp.slice(0, rows.length);
+                var quality = pluck(rows, "Quality of Sleep");
+                return {
+                    data: [{
+                        type: "pie",
+                        labels: quality,
+                        values: pluck(rows, "Daily Steps"),
+                        hole: 0.3,
+                        marker: {colors: colors},
+                        texttemplate: "%{value:.0f}",
+                        textposition: "inside",
+                        hovertemplate: "<b>%{label}</b><br>Шаги: %{value:.0f}<extra></extra>",
+                        pull: rows.map(function () { return 0.05; })
+                    }, {
+                        type: "scatter",
+                        x: [null],
+                        y: [null],
+                        mode: "markers",
+                        marker: {
+                            colorscale: colors.map(function (color, i) {
+                                return [colors.length > 1 ? i / (colors.length - 1) : 0, color];
+                            }),
+                            showscale: true,
+                            cmin: Math.min.apply(null, quality),
+                            cmax: Math.max.apply(null, quality),
+                            colorbar: {title: {side: "top"}, thickness: 30, len: 1, x: 1.1}
+                        },
+                        hoverinfo: "none",
+                        showlegend: false
+                    }],
+                    layout: {
+                        template: store.template,
+                        showlegend: false,
+                        plot_bgcolor: "#E3E1F4",
+                        paper_bgcolor: "#E3E1F4",
+                        height: 378,
+                        margin: {r: 120, l: 50},
+                        annotations: [{x: 1.36, y: 1.1, xref: "paper", yref: "paper", text: "Качество сна", showarrow: false}],
+                        xaxis: {showgrid: false, zeroline: false, visible: false},
+                        yaxis: {showgrid: false, zeroline: false, visible: false}
+                    }
+                };
+            },
+
+            first_line: function (genders, bmis, store) {
+                if (!store) {
+                    return window.dash_clientside.no_update;
+                }
+                var rows = fold(store, "quality_by_duration", {"Gender": genders, "BMI Category": bmis});
+                return {
+                    data: [{
+                        type: "scatter",
+                        mode: "lines",
+                        x: pluck(rows, "Sleep Duration"),
+                        y: pluck(rows, "Quality of Sleep"),
+                        xaxis: "x",
+                        yaxis: "y",
+                        name: "",
+                        showlegend: false,
+                        line: {color: "#826DBA", dash: "solid"},
+                        hovertemplate: "Продолжительность сна=%{x}<br>Качество сна=%{y}<extra></extra>"
+                    }],
+                    layout: layout(store, Object.assign(axes("Продолжительность сна", "Качество сна"), {
+                        legend: {tracegroupgap: 0},
+                        plot_bgcolor: "#E3E1F4",
+                        paper_bgcolor: "#E3E1F4",
+                        height: 335
+                    }))
+                };
+            },
+
+            // Страница «Здоровье»
+            second_line: function (bmis, occupations, store) {
+                if (!store) {
+                    return window.dash_clientside.no_update;
+                }
+                var rows = fold(store, "duration_by_pressure", {"BMI Category": bmis, "Occupation": occupations});
+                return {
+                    data: [{
+                        type: "scatter",
+                        mode: "lines",
+                        x: pluck(rows, "Blood Pressure"),
+                        y: pluck(rows, "Sleep Duration"),
+                        xaxis: "x",
+                        yaxis: "y",
+                        name: "",
+                        showlegend: false,
+                        line: {color: "#826DBA", dash: "solid"},
+                        hovertemplate: "Давление=%{x}<br>Продолжительность сна=%{y}<extra></extra>"
+                    }],
+                    layout: layout(store, Object.assign(axes("Давление", "Продолжительность сна"), {
+                        legend: {tracegroupgap: 0},
+                        plot_bgcolor: "#E3E1F4",
+                        paper_bgcolor: "#E3E1F4",
+                        height: 335
+                    }))
+                };
+            },
+
+            second_pie: function (bmis, occupations, store) {
+                if (!store) {
+                    return window.dash_clientside.no_update;
+                }
+                var translation = store.labels.sleep_disorder_translation;
+                var rows = fold(store, "disorders", {"BMI Category": bmis, "Occupation": occupations});
+                rows.sort(function (a, b) { return b.count - a.count; });
+                return {
+                    data: [{
+                        type: "pie",
+                        labels: rows.map(function (row) { return translation[row["Sleep Disorder"]]; }),
+                        values: pluck(rows, "count"),
+                        marker: {colors: store.palettes.YlOrBr.slice(0, rows.length)},
+                        texttemplate: "%{percent:.1%}",
+                        textposition: "inside",
+                        hovertemplate: "<b>%{label}</b><br>Количество: %{value}<extra></extra>"
+                    }],
+                    layout: {
+                        template: store.template,
+                        plot_bgcolor: "#E3E1F4",
+                        paper_bgcolor: "#E3E1F4",
+                        height: 335,
+                        margin: {t: 10, b: 0, l: 20, r: 15},
+                        legend: {title: {text: "Нарушения сна"}, y: 0.5}
+                    }
+                };
+            },
+
+            second_age_gender: function (bmis, occupations, store) {
+                if (!store) {
+                    return window.dash_clientside.no_update;
+                }
+                var labels = store.labels;
+                var rows = fold(store, "quality_by_age_gender", {"BMI Category": bmis, "Occupation": occupations});
+                var genders = [];
+                rows.forEach(function (row) {
+                    if (genders.indexOf(row.Gender) < 0) {
+                        genders.push(row.Gender);
+                    }
+                });
+                var data = genders.map(function (gender) {
+                    var group = rows.filter(function (row) { return row.Gender === gender; });
+                    var name = labels.gender_translation[gender];
+                    // Значения для мужчин инвертируются для симметричной пирамиды
+                    var sign = gender === "Male" ? -1 : 1;
+                    return {
+                        type: "bar",
+                        orientation: "h",
+                        name: name,
+                        legendgroup: name,
+                        offsetgroup: name,
+                        alignmentgroup: "True",
+                        showlegend: true,
+                        x: group.map(function (row) { return sign * row["Quality of Sleep"]; }),
+                        y: pluck(group, "Age"),
+                        xaxis: "x",
+                        yaxis: "y",
+                        marker: {color: labels.gender_colors[name]},
+                        hovertemplate: "Пол=" + name + "<br>Качество сна=%{x}<br>Возраст=%{y}<extra></extra>"
+                    };
+                });
+                return {
+                    data: data,
+                    layout: layout(store, Object.assign(axes("Качество сна", "Возраст"), {
+                        legend: {title: {text: "Пол"}, tracegroupgap: 0, y: 0.5},
+                        barmode: "relative",
+                        plot_bgcolor: "#E3E1F4",
+                        paper_bgcolor: "#E3E1F4",
+                        height: 378
+                    }))
+                };
+            },
+
+            second_stress: function (bmis, occupations, store, figure) {
+                if (!store) {
+                    return window.dash_clientside.no_update;
+                }
+                return gauge(figure, overall(store, {"BMI Category": bmis, "Occupation": occupations}, "Stress Level"));
+            },
+
+            second_quality: function (bmis, occupations, store, figure) {
+                if (!store) {
+                    return window.dash_clientside.no_update;
+                }
+                return gauge(figure, overall(store, {"BMI Category": bmis, "Occupation": occupations}, "Quality of Sleep"));
+            }
+        }
+    });
+})();
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import logging
+from dash import DiskcacheManager
+from config import BACKGROUND_CACHE_DIR, BACKGROUND_EXPIRE, BACKGROUND_MODE, CLIENTSIDE_MODE
+
+logger = logging.getLogger(__name__)
+
+# Как часто браузер спрашивает о ходе фоновой задачи (в миллисекундах)
+POLL_INTERVAL_MS = 250
+
+# Идентификатор задачи, результат которой уже был в кеше (процесс не запускался)
+CACHED_JOB = -1
+
+
+# Менеджер фоновых задач без внешнего брокера: задача выполняется в отдельном
+# процессе, результат и ход выполнения передаются через кеш diskcache на диске.
+# Ключ результата - обратный вызов, значения фильтров (без идентификатора вкладки
+# и номера изменения) и версия данных, поэтому одинаковые запросы разных
+# пользователей получают готовый результат без новой задачи
+class JobManager(DiskcacheManager):
+    def build_cache_key(self, fn, args, cache_args_to_ignore):
+        key = {
+            "callback": f"{fn.__module__}.{fn.__name__}",
+            "args": [_normalize_filters(arg) for arg in args],
+            "cache_by": [cache_item() for cache_item in self.cache_by or []],
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+    # Готовый результат отдаётся без запуска процесса: вместо идентификатора
+    # процесса задачи возвращается несуществующий, такая задача считается завершённой
+    def call_job_fn(self, key, job_fn, args, context):
+        if self.result_ready(key):
+            return CACHED_JOB
+        return super().call_job_fn(key, job_fn, args, context)
+
+
+# Значения хранилища фильтров (pages.filter_store) без повторов и порядка выбора
+def _normalize_filters(arg):
+    if isinstance(arg, dict) and "values" in arg:
+        return [sorted(set(values or [])) for values in arg["values"] or []]
+    return arg
+
+
+# Версия набора данных: задачи запускаются копией процесса сервера и считают
+# по загруженной в нём версии, поэтому она и входит в ключ результата
+def _data_version():
+    from data import get_version
+
+    return get_version()
+
+
+# Менеджер фоновых задач; None - фоновый режим выключен или недоступен
+def make_manager():
+    if not BACKGROUND_MODE or CLIENTSIDE_MODE:
+        return None
+    try:
+        import diskcache
+
+        return JobManager(diskcache.Cache(BACKGROUND_CACHE_DIR), cache_by=[_data_version], expire=BACKGROUND_EXPIRE)
+    except ImportError:
+        logger.warning("Фоновый режим недоступен: нужны пакеты diskcache, multiprocess и psutil "
+                       "(pip install \"dash[diskcache]\"), графики строятся в обработчиках запросов")
+        return None
+
+
+manager = make_manager()
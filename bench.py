@@ -0,0 +1,764 @@
+import argparse
+import gzip
+import importlib
+import json
+import logging
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:
+    # Windows: пиковый RSS процесса не измеряется
+    resource = None
+
+from warmup import PAGES
+
+# Множители размера синтетического набора относительно исходной таблицы
+SCALES = [1, 100, 10000, 1000000]
+
+# Серверные обратные вызовы страниц, которые вызываются напрямую
+CALLBACKS = {
+    "first": ["update_scatter", "update_pie", "update_line"],
+    "second": ["update_line", "update_pie", "update_age_gender", "update_stress_indicator", "update_sleep_quality_indicator"],
+}
+
+# Пауза между запросами серии быстрых изменений фильтров в нагрузочном тесте (в секундах)
+BURST_INTERVAL = 0.02
+
+# Строк в одном блоке при записи синтетического набора
+CHUNK_ROWS = 1_000_000
+
+# Переходы сеанса просмотра в измерении --session: по всем страницам и обратно
+SESSION_PATHS = ["/", "/page-1", "/page-2", "/", "/page-1", "/page-2"]
+
+# Модель браузера в измерении --session: ширина окна в CSS пикселях (плотность
+# пикселей 1), заголовки запросов и поддерживаемые форматы изображений
+VIEWPORT_WIDTH = 1920
+BROWSER_HEADERS = {"Accept-Encoding": "br, gzip", "Accept": "image/avif,image/webp,image/png,image/*,*/*"}
+IMAGE_TYPES = ["image/avif", "image/webp", "image/png", "image/jpeg"]
+
+# Метрики, которые сравниваются с эталоном: чем больше значение, тем хуже
+COMPARED_METRICS = ["p50", "p95", "cpu_seconds", "peak_bytes", "payload_bytes", "gzip_bytes"]
+
+
+# Синтетический набор с той же схемой, что и исходная таблица: строки выбираются
+# из неё случайно с повторениями, поэтому распределения и сочетания значений
+# сохраняются. Пишется блоками, чтобы не держать в памяти весь набор
+def generate_dataset(source_df, scale, path, seed=0):
+    import numpy as np
+    import pandas as pd
+
+    rows = len(source_df) * scale
+    rng = np.random.default_rng(seed)
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        for start in range(0, rows, CHUNK_ROWS):
+            size = min(CHUNK_ROWS, rows - start)
+            chunk = source_df.iloc[rng.integers(0, len(source_df), size)]
+            chunk.index = pd.RangeIndex(start + 1, start + size + 1, name=source_df.index.name)
+            chunk.to_csv(file, header=start == 0)
+    return rows
+
+
+# Реалистичная смесь фильтров: примерно половина фильтров не задана,
+# в заданных выбрано одно-три значения
+def sample_selections(page, rng):
+    selections = {}
+    for column, options in page.FILTERS.items():
+        values = [option["value"] for option in options]
+        if rng.random() < 0.5:
+            selections[column] = []
+        else:
+            selections[column] = rng.sample(values, rng.randint(1, min(3, len(values))))
+    return selections
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {}
+
+    def at(fraction):
+        return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values),
+        "p50": at(0.5),
+        "p90": at(0.9),
+        "p95": at(0.95),
+        "p99": at(0.99),
+        "max": values[-1],
+    }
+
+
+def payload_json(result):
+    from plotly.io.json import to_json_plotly
+
+    return to_json_plotly(result).encode()
+
+
+def max_rss_bytes():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS - байты
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+# Прямой вызов функций обратного вызова: время и процессорное время без кеша
+# графиков (cold), повторный вызов с теми же фильтрами (warm), пик памяти
+# под tracemalloc и размер ответа без сжатия и после gzip
+def bench_callbacks(samples, seed):
+    from figure_cache import cache
+
+    rng = random.Random(seed)
+    results = {}
+    for namespace, names in CALLBACKS.items():
+        page = importlib.import_module(PAGES[namespace])
+        mix = [sample_selections(page, rng) for _ in range(samples)]
+        for name in names:
+            function = getattr(page, name)
+            cold, cpu, warm, peaks, payloads, compressed = [], [], [], [], [], []
+            for selections in mix:
+                args = [selections[column] for column in page.FILTERS]
+
+                cache.clear()
+                started, started_cpu = time.perf_counter(), time.process_time()
+                result = function(*args)
+                cold.append(time.perf_counter() - started)
+                cpu.append(time.process_time() - started_cpu)
+
+                started = time.perf_counter()
+                function(*args)
+                warm.append(time.perf_counter() - started)
+
+                cache.clear()
+                tracemalloc.start()
+                try:
+                    function(*args)
+                    peaks.append(tracemalloc.get_traced_memory()[1])
+                finally:
+                    tracemalloc.stop()
+                payload = payload_json(result)
+                payloads.append(len(payload))
+                compressed.append(len(gzip.compress(payload)))
+            results[f"{namespace}/{name}"] = {
+                "cold": percentiles(cold),
+                "warm": percentiles(warm),
+                "cpu_seconds": statistics.median(cpu),
+                "peak_bytes": max(peaks),
+                "payload_bytes": statistics.median(payloads),
+                "gzip_bytes": statistics.median(compressed),
+            }
+    return results
+
+
+# Идентификаторы всех компонентов макета страницы
+def component_ids(layout):
+    return {component.id for component in layout._traverse() if getattr(component, "id", None)}
+
+
+# Тела запросов _dash-update-component для серверных обратных вызовов страниц
+# со смесью фильтров. Фильтры приходят через хранилище страницы (pages.filter_store)
+# в порядке FILTERS страницы, вкладка и номер изменения задаются при отправке
+# (with_session). Остальные входы (например, relayoutData) не заданы
+def request_bodies(dependencies, samples, seed):
+    rng = random.Random(seed)
+    pages = {namespace: importlib.import_module(module) for namespace, module in PAGES.items()}
+    ids = {namespace: component_ids(page.layout) for namespace, page in pages.items()}
+    bodies = []
+    for dependency in dependencies:
+        if dependency.get("clientside_function") or dependency["output"].startswith(".."):
+            continue
+        store, *inputs = dependency["inputs"]
+        if store["property"] != "data":
+            continue
+        for namespace, page in pages.items():
+            if store["id"] in ids[namespace]:
+                break
+        else:
+            continue
+        output_id, output_property = dependency["output"].rsplit(".", 1)
+        for _ in range(samples):
+            filters = {"store": store["id"], "values": list(sample_selections(page, rng).values())}
+            bodies.append({
+                "output": dependency["output"],
+                "outputs": {"id": output_id, "property": output_property},
+                "inputs": [dict(store, value=filters)] + [dict(item, value=None) for item in inputs],
+                "state": [dict(item, value=None) for item in dependency.get("state", [])],
+                "changedPropIds": [f"{store['id']}.{store['property']}"],
+            })
+    return bodies
+
+
+# Тело запроса от вкладки session с номером изменения фильтров sequence
+def with_session(body, session, sequence):
+    store = body["inputs"][0]
+    filters = dict(store["value"], session=session, seq=sequence)
+    return dict(body, inputs=[dict(store, value=filters)] + body["inputs"][1:])
+
+
+# Нагрузочный тест: clients параллельных клиентов отправляют запросы
+# к локальному серверу, каждый через своё соединение. При burst > 1 каждое
+# обновление графика - серия из burst запросов с разными фильтрами через
+# BURST_INTERVAL секунд (быстрое переключение фильтров без задержки в браузере),
+# а в задержки и процессорное время на обновление входит только последний из них
+def load_test(server, clients, requests_per_client, seed, burst=1):
+    import requests
+    from werkzeug.serving import make_server
+
+    from figure_cache import cache
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    http_server = make_server("127.0.0.1", 0, server, threaded=True)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{http_server.server_port}"
+    try:
+        session = requests.Session()
+        session.get(base_url + "/")
+        dependencies = session.get(base_url + "/_dash-dependencies").json()
+        bodies = request_bodies(dependencies, 20, seed)
+        by_output = {}
+        for body in bodies:
+            by_output.setdefault(body["output"], []).append(body)
+        cache.clear()
+
+        def client(number):
+            rng = random.Random(seed + number)
+            client_session = requests.Session()
+            latencies, sizes, wire_sizes, errors, dropped = [], [], [], 0, 0
+            for update in range(requests_per_client):
+                series = rng.sample(by_output[rng.choice(list(by_output))], burst)
+                responses = [None] * burst
+
+                def send(position):
+                    body = with_session(series[position], f"bench-{number}", update * burst + position)
+                    started = time.perf_counter()
+                    response = client_session.post(base_url + "/_dash-update-component", json=body)
+                    responses[position] = (time.perf_counter() - started, response)
+
+                senders = []
+                for position in range(burst):
+                    if position:
+                        time.sleep(BURST_INTERVAL)
+                    senders.append(threading.Thread(target=send, args=(position,)))
+                    senders[-1].start()
+                for sender in senders:
+                    sender.join()
+
+                for _, response in responses:
+                    dropped += response.status_code == 204
+                    errors += response.status_code not in (200, 204)
+                latency, response = responses[-1]
+                latencies.append(latency)
+                sizes.append(len(response.content))
+                # Размер на проводе: со сжатием, если сервер его включил
+                wire_sizes.append(int(response.headers.get("Content-Length", len(response.content))))
+            return latencies, sizes, wire_sizes, errors, dropped
+
+        started, started_cpu = time.perf_counter(), time.process_time()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            outcomes = list(pool.map(client, range(clients)))
+        wall, cpu = time.perf_counter() - started, time.process_time() - started_cpu
+    finally:
+        http_server.shutdown()
+
+    latencies = [value for outcome in outcomes for value in outcome[0]]
+    sizes = [value for outcome in outcomes for value in outcome[1]]
+    wire_sizes = [value for outcome in outcomes for value in outcome[2]]
+    return dict(
+        percentiles(latencies),
+        clients=clients,
+        burst=burst,
+        requests=len(latencies) * burst,
+        updates=len(latencies),
+        errors=sum(outcome[3] for outcome in outcomes),
+        dropped=sum(outcome[4] for outcome in outcomes),
+        throughput=len(latencies) / wall,
+        cpu_per_update=cpu / len(latencies),
+        payload_bytes=statistics.median(sizes),
+        wire_bytes=statistics.median(wire_sizes),
+    )
+
+
+# Тело ответа без сжатия
+def decoded(response):
+    body = response.get_data()
+    encoding = response.headers.get("Content-Encoding")
+    if encoding == "br":
+        import brotli
+
+        return brotli.decompress(body)
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    return body
+
+
+# Запросы и переданные байты (тело ответа на проводе) по видам запросов
+class Traffic:
+    def __init__(self):
+        self.kinds = {}
+
+    def add(self, kind, response):
+        requests, size = self.kinds.get(kind, (0, 0))
+        self.kinds[kind] = (requests + 1, size + len(response.get_data()))
+
+    def summary(self, page_views):
+        requests = sum(count for count, _ in self.kinds.values())
+        return {
+            "requests": requests,
+            "requests_per_view": requests / page_views,
+            "bytes": sum(size for _, size in self.kinds.values()),
+            "kinds": {kind: {"requests": count, "bytes": size} for kind, (count, size) in sorted(self.kinds.items())},
+        }
+
+
+# HTTP кеш браузера: свежий ответ (max-age без no-cache) берётся без запроса,
+# ответ с ETag или Last-Modified проверяется условным запросом (304 без тела)
+class BrowserCache:
+    def __init__(self):
+        self.entries = {}
+
+    def fetch(self, client, url, traffic, kind):
+        entry = self.entries.get(url)
+        headers = dict(BROWSER_HEADERS)
+        if entry is not None:
+            if entry["fresh"]:
+                return entry["body"]
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        response = client.get(url, headers=headers)
+        traffic.add(kind, response)
+        if response.status_code == 304:
+            return entry["body"]
+        body = decoded(response)
+        cache_control = response.cache_control
+        entry = {
+            "fresh": bool(cache_control.max_age) and not cache_control.no_cache and not cache_control.no_store,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "body": body,
+        }
+        if entry["fresh"] or entry["etag"] or entry["last_modified"]:
+            self.entries[url] = entry
+        return body
+
+
+# Компоненты дерева макета Dash (JSON) вместе с вложенными через children
+def layout_components(node):
+    if isinstance(node, list):
+        for item in node:
+            yield from layout_components(item)
+    elif isinstance(node, dict) and "props" in node:
+        yield node
+        yield from layout_components(node["props"].get("children"))
+
+
+# Ширина места изображения по атрибуту sizes ("24px", "40vw"; по умолчанию ширина окна)
+def slot_width(sizes):
+    if sizes and sizes.endswith("px"):
+        return float(sizes[:-2])
+    if sizes and sizes.endswith("vw"):
+        return VIEWPORT_WIDTH * float(sizes[:-2]) / 100
+    return VIEWPORT_WIDTH
+
+
+# Выбор из srcset, как в браузере: самая узкая копия не уже места изображения
+def pick_source(srcset, sizes):
+    candidates = []
+    for item in srcset.split(","):
+        url, *descriptor = item.split()
+        width = int(descriptor[0][:-1]) if descriptor and descriptor[0].endswith("w") else 0
+        candidates.append((width, url))
+    target = slot_width(sizes)
+    fitting = [candidate for candidate in candidates if candidate[0] >= target]
+    return min(fitting)[1] if fitting else max(candidates)[1]
+
+
+# Адреса изображений документа, которые загрузит браузер. У <picture> - первый
+# <source> поддерживаемого формата, иначе вложенный <img>. Скрытые изображения
+# (display: none) браузер тоже загружает
+def image_urls(node):
+    if isinstance(node, list):
+        for item in node:
+            yield from image_urls(item)
+        return
+    if not isinstance(node, dict) or "props" not in node:
+        return
+    props = node["props"]
+    if node["type"] == "Picture":
+        children = list(layout_components(props.get("children")))
+        sources = [child["props"] for child in children if child["type"] == "Source" and child["props"].get("type") in IMAGE_TYPES]
+        fallback = [child["props"] for child in children if child["type"] == "Img"]
+        chosen = (sources + fallback)[0]
+        yield pick_source(chosen["srcSet"], chosen.get("sizes")) if chosen.get("srcSet") else chosen["src"]
+        return
+    if node["type"] == "Img" and props.get("src"):
+        yield pick_source(props["srcSet"], props.get("sizes")) if props.get("srcSet") else props["src"]
+    yield from image_urls(props.get("children"))
+
+
+def dependency_outputs(dependency):
+    output = dependency["output"]
+    specs = output[2:-2].split("...") if output.startswith("..") else [output]
+    return [tuple(spec.rsplit(".", 1)) for spec in specs]
+
+
+def dependency_items(dependency, key):
+    return [(item["id"], item["property"]) for item in dependency.get(key, [])]
+
+
+# Просмотр страниц paths в одной вкладке: загрузка документа (HTML, локальные скрипты
+# и стили, макет и граф обратных вызовов), затем переходы по адресам. Обратные вызовы
+# выполняются как в dash-renderer: первичные вызовы для появившихся компонентов
+# (кроме prevent_initial_call), вызовы по изменению входов, вызов ждёт обратные вызовы,
+# которые изменят его входы. Серверные вызовы отправляются на сервер, клиентские
+# из assets/clientside.js заменены функциями на Python (см. clientside_models).
+# Модули, которые dash-renderer подгружает динамически, и внешние адреса не учитываются
+def browse(client, cache, paths, traffic, session):
+    props_by_id = {}
+    fetched_images = set()
+    unmodelled = set()
+    models = clientside_models(session)
+
+    html = cache.fetch(client, paths[0], traffic, "document").decode()
+    for url in re.findall(r'<(?:script|link)\b[^>]*?\b(?:src|href)="([^"]+)"', html):
+        if url.startswith("/"):
+            cache.fetch(client, url.replace("&amp;", "&"), traffic, "static")
+    layout = json.loads(cache.fetch(client, "/_dash-layout", traffic, "document"))
+    dependencies = json.loads(cache.fetch(client, "/_dash-dependencies", traffic, "document"))
+
+    def register(node, present):
+        for component in layout_components(node):
+            if component["props"].get("id") is not None:
+                if present:
+                    props_by_id[component["props"]["id"]] = component["props"]
+                else:
+                    props_by_id.pop(component["props"]["id"], None)
+
+    def ready(dependency):
+        return all(component_id in props_by_id for component_id, _ in dependency_items(dependency, "inputs"))
+
+    def initial(node):
+        ids = {component["props"].get("id") for component in layout_components(node)}
+        return [dependency for dependency in dependencies
+                if not dependency.get("prevent_initial_call") and ready(dependency)
+                and any(component_id in ids for component_id, _ in dependency_items(dependency, "inputs") + dependency_outputs(dependency))]
+
+    def execute(dependency):
+        values = [props_by_id[component_id].get(prop) for component_id, prop in dependency_items(dependency, "inputs")]
+        states = [props_by_id.get(component_id, {}).get(prop) for component_id, prop in dependency_items(dependency, "state")]
+        outputs = dependency_outputs(dependency)
+        function = dependency.get("clientside_function")
+        if function:
+            model = models.get(function["function_name"])
+            if model is None:
+                unmodelled.add(function["function_name"])
+                return []
+            return [(output, value) for output, value in zip(outputs, model(*values, *states)) if value is not NO_UPDATE]
+        specs = [{"id": component_id, "property": prop} for component_id, prop in outputs]
+        body = {
+            "output": dependency["output"],
+            "outputs": specs if dependency["output"].startswith("..") else specs[0],
+            "inputs": [{"id": component_id, "property": prop, "value": value}
+                       for (component_id, prop), value in zip(dependency_items(dependency, "inputs"), values)],
+            "state": [{"id": component_id, "property": prop, "value": value}
+                      for (component_id, prop), value in zip(dependency_items(dependency, "state"), states)],
+            "changedPropIds": [f"{component_id}.{prop}" for component_id, prop in dependency_items(dependency, "inputs")],
+        }
+        response = client.post("/_dash-update-component", json=body, headers=BROWSER_HEADERS)
+        traffic.add("callbacks", response)
+        data = json.loads(decoded(response)) if response.status_code == 200 else {}
+        # Фоновый обратный вызов (SLEEP_BACKGROUND=1): опрос задачи до получения результата
+        job = {key: data[key] for key in ("cacheKey", "job") if key in data}
+        interval = (dependency.get("long") or {}).get("interval", 1000) / 1000
+        while job and "response" not in data and response.status_code in (200, 204):
+            time.sleep(interval)
+            response = client.post("/_dash-update-component", query_string=job, json=body, headers=BROWSER_HEADERS)
+            traffic.add("callbacks", response)
+            data = json.loads(decoded(response)) if response.status_code == 200 else {}
+        if "response" not in data:
+            return []
+        updates = data["response"]
+        return [((component_id, prop), value) for component_id, props in updates.items() for prop, value in props.items()]
+
+    def run(pending):
+        while pending:
+            waiting = {output for dependency in pending for output in dependency_outputs(dependency)}
+            dependency = next((dependency for dependency in pending
+                               if not set(dependency_items(dependency, "inputs")) & (waiting - set(dependency_outputs(dependency)))),
+                              pending[0])
+            pending.remove(dependency)
+            for (component_id, prop), value in execute(dependency):
+                props = props_by_id.get(component_id)
+                if props is None:
+                    continue
+                if prop == "children":
+                    register(props.get("children"), False)
+                    props["children"] = value
+                    register(value, True)
+                    pending.extend(item for item in initial(value) if item not in pending)
+                else:
+                    props[prop] = value
+                pending.extend(item for item in dependencies
+                               if (component_id, prop) in dependency_items(item, "inputs") and ready(item) and item not in pending)
+
+    def load_images():
+        for url in image_urls(layout):
+            if url.startswith("/") and url not in fetched_images:
+                fetched_images.add(url)
+                cache.fetch(client, url, traffic, "images")
+
+    register(layout, True)
+    location = next(component["props"] for component in layout_components(layout) if component["type"] == "Location")
+    location["pathname"] = paths[0]
+    run(initial(layout))
+    load_images()
+    for path in paths[1:]:
+        location["pathname"] = path
+        run([dependency for dependency in dependencies
+             if (location["id"], "pathname") in dependency_items(dependency, "inputs") and ready(dependency)])
+        load_images()
+    return unmodelled
+
+
+# Признак "без изменения" в ответах моделей клиентских функций
+NO_UPDATE = object()
+
+
+# Клиентские функции assets/clientside.js серверного режима на Python
+# (возвращают значения всех выходов). Задержка фильтров не моделируется
+def clientside_models(session):
+    sequence = iter(range(1, 1 << 30))
+
+    def debounce_filters(*args):
+        *values, state = args
+        if state.get("values") == values:
+            return [NO_UPDATE]
+        return [dict(state, values=values, session=session, seq=next(sequence))]
+
+    def active_page(pathname, *hrefs):
+        return ["sidebar-button sidebar-current" if href == pathname else "sidebar-button" for href in hrefs]
+
+    def show_page(pathname, routes, *contents):
+        hidden = {"display": "none"}
+        styles = [{} if route == pathname else hidden for route in routes]
+        if pathname not in routes:
+            return styles + [{}, f"The pathname {pathname} was not recognised...", NO_UPDATE]
+        return styles + [hidden, NO_UPDATE, NO_UPDATE if contents[routes.index(pathname)] else pathname]
+
+    return {"debounce_filters": debounce_filters, "active_page": active_page, "show_page": show_page}
+
+
+# Запросы и байты за сеанс просмотра paths: первый сеанс с пустым кешем браузера
+# (cold), второй - новая вкладка с кешем после первого (warm)
+def session_test(server, paths):
+    client = server.test_client()
+    cache = BrowserCache()
+    results = {}
+    for number, name in enumerate(["cold", "warm"]):
+        traffic = Traffic()
+        unmodelled = browse(client, cache, paths, traffic, f"bench-session-{number}")
+        results[name] = traffic.summary(len(paths))
+        if unmodelled:
+            results[name]["unmodelled"] = sorted(unmodelled)
+    return results
+
+
+def print_session(results, paths):
+    print(f"Сеанс: {' -> '.join(paths)} ({len(paths)} просмотров страниц)")
+    for name, result in results.items():
+        kinds = ", ".join(f"{kind} {item['requests']} / {item['bytes'] / 1024:.1f} КБ" for kind, item in result["kinds"].items())
+        print(f"  {name}: {result['requests']} запросов ({result['requests_per_view']:.1f} на просмотр), "
+              f"{result['bytes'] / 1024:.1f} КБ; {kinds}")
+        if result.get("unmodelled"):
+            print(f"  клиентские функции без модели: {', '.join(result['unmodelled'])}")
+
+
+# Измерения для одного размера набора в отдельном процессе: настройки
+# (источник, каталог кеша) читаются из переменных окружения при импорте
+def run_worker(args):
+    started = time.perf_counter()
+    from data import get_df
+
+    rows = len(get_df())
+    load_seconds = time.perf_counter() - started
+
+    import app
+
+    result = {
+        "rows": rows,
+        "load_seconds": load_seconds,
+        "callbacks": bench_callbacks(args.samples, args.seed),
+    }
+    if args.clients:
+        result["load_test"] = load_test(app.app.server, args.clients, args.requests, args.seed, args.burst)
+    result["max_rss_bytes"] = max_rss_bytes()
+    with open(args.worker_output, "w", encoding="utf-8") as file:
+        json.dump(result, file)
+
+
+def run_scale(args, source_df, scale, workdir):
+    directory = os.path.join(workdir, f"scale-{scale}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "sleep.csv")
+    print(f"x{scale}: генерация {len(source_df) * scale} строк", flush=True)
+    generate_dataset(source_df, scale, path, args.seed)
+
+    output = os.path.join(directory, "result.json")
+    env = dict(
+        os.environ,
+        SLEEP_DATA_SOURCE=path,
+        SLEEP_CACHE_DIR=os.path.join(directory, "cache"),
+        SLEEP_FIGURE_CACHE=os.path.join(directory, "cache", "figures.sqlite"),
+        SLEEP_REFRESH_INTERVAL="0",
+        SLEEP_CLIENTSIDE="0",
+        SLEEP_PROFILE_DIR="",
+    )
+    command = [sys.executable, os.path.abspath(__file__), "--worker-output", output,
+               "--samples", str(args.samples), "--seed", str(args.seed),
+               "--clients", str(args.clients), "--requests", str(args.requests), "--burst", str(args.burst)]
+    completed = subprocess.run(command, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        # Например, набор не поместился в память - остальные размеры всё равно измеряются
+        return {"error": f"процесс измерения завершился с кодом {completed.returncode}"}
+    with open(output, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def print_summary(results):
+    for scale, result in results["scales"].items():
+        if "error" in result:
+            print(f"x{scale}: {result['error']}")
+            continue
+        print(f"x{scale}: {result['rows']} строк, загрузка {result['load_seconds']:.2f} с")
+        for name, metrics in result["callbacks"].items():
+            print(f"  {name}: p50 {metrics['cold']['p50'] * 1000:.1f} мс, p95 {metrics['cold']['p95'] * 1000:.1f} мс, "
+                  f"CPU {metrics['cpu_seconds'] * 1000:.1f} мс, из кеша p50 {metrics['warm']['p50'] * 1000:.1f} мс, "
+                  f"пик памяти {metrics['peak_bytes'] / 1024:.0f} КБ, ответ {metrics['payload_bytes'] / 1024:.1f} КБ "
+                  f"(gzip {metrics['gzip_bytes'] / 1024:.1f} КБ)")
+        load = result.get("load_test")
+        if load:
+            print(f"  нагрузка: {load['clients']} клиентов, серии по {load.get('burst', 1)}, {load['throughput']:.1f} обновлений/с, "
+                  f"p50 {load['p50'] * 1000:.1f} мс, p99 {load['p99'] * 1000:.1f} мс, CPU на обновление {load.get('cpu_per_update', 0) * 1000:.1f} мс, "
+                  f"ответ {load['payload_bytes'] / 1024:.1f} КБ (передано {load['wire_bytes'] / 1024:.1f} КБ), "
+                  f"отброшено {load.get('dropped', 0)}, ошибок {load['errors']}")
+
+
+# Значения сравниваемых метрик: {(размер, обратный вызов, метрика): значение}
+def flatten(results):
+    values = {}
+    for scale, result in results["scales"].items():
+        for name, metrics in result.get("callbacks", {}).items():
+            for metric in COMPARED_METRICS:
+                value = metrics["cold"].get(metric) if metric in metrics["cold"] else metrics.get(metric)
+                if value is not None:
+                    values[(scale, name, metric)] = value
+        load = result.get("load_test")
+        if load:
+            for metric in ["p50", "p95", "p99", "cpu_per_update", "wire_bytes"]:
+                if metric in load:
+                    values[(scale, "load_test", metric)] = load[metric]
+    return values
+
+
+# Сравнение с эталоном; возвращает число метрик, ухудшившихся больше допустимого
+def compare(results, baseline, threshold):
+    current, previous = flatten(results), flatten(baseline)
+    regressions = 0
+    for key in sorted(current.keys() & previous.keys()):
+        if not previous[key]:
+            continue
+        ratio = current[key] / previous[key]
+        marker = ""
+        if ratio > threshold:
+            marker = "  <-- хуже"
+            regressions += 1
+        elif ratio < 1 / threshold:
+            marker = "  (лучше)"
+        scale, name, metric = key
+        print(f"x{scale} {name} {metric}: {previous[key]:.6g} -> {current[key]:.6g} ({ratio:.2f}x){marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры обратных вызовов на синтетических наборах разного размера")
+    parser.add_argument("--scales", nargs="+", type=int, default=SCALES[:3],
+                        help=f"множители размера набора (по умолчанию {' '.join(map(str, SCALES[:3]))}; "
+                             f"x{SCALES[-1]} требует сотен гигабайт памяти)")
+    parser.add_argument("--samples", type=int, default=30, help="число комбинаций фильтров для каждого обратного вызова")
+    parser.add_argument("--clients", type=int, default=8, help="параллельных клиентов в нагрузочном тесте (0 - без него)")
+    parser.add_argument("--requests", type=int, default=50, help="обновлений графиков от каждого клиента")
+    parser.add_argument("--burst", type=int, default=1, help="запросов в серии быстрых изменений фильтров на одно обновление")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора случайных чисел")
+    parser.add_argument("--source", help="исходная таблица для синтетических наборов (по умолчанию источник данных приложения)")
+    parser.add_argument("--workdir", help="каталог для наборов и кешей (по умолчанию временный)")
+    parser.add_argument("--output", default="bench-results.json", help="путь к JSON файлу с результатами")
+    parser.add_argument("--baseline", help="JSON файл с эталонными результатами для сравнения")
+    parser.add_argument("--threshold", type=float, default=1.2, help="допустимое ухудшение относительно эталона (во сколько раз)")
+    parser.add_argument("--session", nargs="*", metavar="PATH",
+                        help="вместо замеров на синтетических наборах: запросы и байты за сеанс просмотра "
+                             f"страниц (по умолчанию {' '.join(SESSION_PATHS)}) на данных приложения")
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_output:
+        run_worker(args)
+        return
+
+    if args.session is not None:
+        import app
+
+        paths = args.session or SESSION_PATHS
+        print_session(session_test(app.app.server, paths), paths)
+        return
+
+    from config import DATA_SOURCE
+    from ingest import read_raw
+    from sources import make_sources
+
+    source_df = read_raw(make_sources(args.source or DATA_SOURCE))
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {"samples": args.samples, "clients": args.clients, "requests": args.requests, "burst": args.burst, "seed": args.seed},
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="sleep-bench-") as tmp:
+        workdir = args.workdir or tmp
+        for scale in args.scales:
+            results["scales"][str(scale)] = run_scale(args, source_df, scale, workdir)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+    print_summary(results)
+    print(f"Результаты сохранены в {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Ухудшилось метрик: {regressions}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+
+# Видимая область графика из relayoutData: ((x0, x1) или None, (y0, y1) или None).
+# None по оси - область не задана (автомасштаб или исходный вид)
+def viewport_from_relayout(relayout_data):
+    relayout_data = relayout_data or {}
+    ranges = []
+    for axis in ("xaxis", "yaxis"):
+        if relayout_data.get(f"{axis}.autorange"):
+            ranges.append(None)
+        elif f"{axis}.range[0]" in relayout_data:
+            ranges.append((relayout_data[f"{axis}.range[0]"], relayout_data[f"{axis}.range[1]"]))
+        elif f"{axis}.range" in relayout_data:
+            ranges.append(tuple(relayout_data[f"{axis}.range"]))
+        else:
+            ranges.append(None)
+    return tuple(sorted(axis_range) if axis_range else None for axis_range in ranges)
+
+
+# Изменяет ли событие relayoutData видимую область (а не, например, размер графика)
+def changes_viewport(relayout_data):
+    return any(key.startswith(("xaxis.", "yaxis.")) for key in relayout_data or {})
+
+
+# Точки внутри видимой области
+def clip_points(points, x, y, viewport):
+    mask = np.ones(len(points), dtype=bool)
+    for column, axis_range in zip((x, y), viewport or (None, None)):
+        if axis_range:
+            values = points[column].to_numpy()
+            mask &= (values >= axis_range[0]) & (values <= axis_range[1])
+    return points[mask]
+
+
+# Объединение точек в ячейки сетки bins x bins по области (видимой или всего набора)
+# отдельно для каждого значения by. Координаты ячейки и показатели - средние,
+# взвешенные по числу строк (столбец count), поэтому при приближении сетка
+# мельчает, а число точек не превышает bins * bins на значение by
+def bin_points(points, x, y, by, measures, bins, viewport=None):
+    weights = points["count"].to_numpy(dtype="float64")
+    codes = {}
+    for column, axis_range in zip((x, y), viewport or (None, None)):
+        values = points[column].to_numpy(dtype="float64")
+        low, high = axis_range or (values.min(), values.max())
+        step = (high - low) / bins or 1.0
+        codes[column] = np.clip(((values - low) / step).astype(np.int64), 0, bins - 1)
+
+    weighted = pd.DataFrame({
+        by: points[by].to_numpy(),
+        "x_bin": codes[x],
+        "y_bin": codes[y],
+        "count": weights,
+        **{column: points[column].to_numpy(dtype="float64") * weights for column in [x, y] + measures},
+    })
+    cells = weighted.groupby([by, "x_bin", "y_bin"], observed=True, sort=False).sum()
+    for column in [x, y] + measures:
+        cells[column] = cells[column] / cells["count"]
+    cells["count"] = cells["count"].astype("int64")
+    return cells.reset_index().drop(columns=["x_bin", "y_bin"])
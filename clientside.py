@@ -0,0 +1,15 @@
+from plotly.colors import sequential
+from data import export_cube
+from figure_format import TEMPLATE_JSON
+
+
+# Данные для клиентского режима страницы: ячейки нужных группировок куба,
+# шаблон оформления plotly, палитры и подписи. Передаются в dcc.Store один раз,
+# после чего графики пересчитываются в браузере (assets/clientside.js)
+def store_payload(groupings, labels):
+    return {
+        "cube": export_cube(groupings),
+        "template": TEMPLATE_JSON,
+        "palettes": {"Purp": sequential.Purp, "YlOrBr": sequential.YlOrBr},
+        "labels": labels,
+    }
@@ -0,0 +1,153 @@
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dash.exceptions import PreventUpdate
+from config import COALESCE_REQUESTS, COALESCE_STATE_PATH
+from metrics import current_callback, registry
+
+# Сколько последних вкладок (сессий) помнит учёт устаревших запросов
+SESSION_LIMIT = 10000
+
+# Через сколько новых запросов процесс удаляет записи сверх SESSION_LIMIT
+PRUNE_EVERY = 1000
+
+# Как часто ожидающий чужого результата запрос проверяет, не устарел ли он сам (в секундах)
+WAIT_CHECK_INTERVAL = 0.05
+
+_current_request = contextvars.ContextVar("request", default=None)
+
+
+# Запрос устарел: из той же вкладки пришёл запрос с более новыми фильтрами.
+# Dash отвечает на него без обновления графика (204), браузер ждёт ответа на новый
+class Superseded(PreventUpdate):
+    pass
+
+
+# Учёт устаревших запросов: для каждой вкладки и обратного вызова запоминается
+# наибольший номер изменения фильтров (браузер нумерует их по порядку).
+# Номера хранятся в SQLite файле, общем для всех процессов сервера: запросы
+# одной вкладки обычно попадают в разные процессы
+class SupersedeTracker:
+    def __init__(self, path, limit=SESSION_LIMIT):
+        self.path = path
+        self.limit = limit
+        self._local = threading.local()
+        self._begun = 0
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        # Соединение SQLite нельзя использовать в дочернем процессе, там открывается своё
+        if connection is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute("CREATE TABLE IF NOT EXISTS latest (session TEXT NOT NULL, name TEXT NOT NULL, sequence INTEGER NOT NULL, updated REAL NOT NULL, PRIMARY KEY (session, name))")
+            connection.execute("CREATE INDEX IF NOT EXISTS latest_updated ON latest (updated)")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def begin(self, session, name, sequence):
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT INTO latest (session, name, sequence, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (session, name) DO UPDATE SET sequence = max(sequence, excluded.sequence), updated = excluded.updated",
+                (session, name, sequence, time.time()),
+            )
+            self._begun += 1
+            if self._begun % PRUNE_EVERY == 0:
+                connection.execute("DELETE FROM latest WHERE rowid IN (SELECT rowid FROM latest ORDER BY updated DESC LIMIT -1 OFFSET ?)", (self.limit,))
+        return (session, name), sequence
+
+    def is_current(self, ticket):
+        (session, name), sequence = ticket
+        row = self._connection().execute("SELECT sequence FROM latest WHERE session = ? AND name = ?", (session, name)).fetchone()
+        return row is None or row[0] <= sequence
+
+
+# Совмещение одинаковых вычислений: пока результат для ключа считается, другие
+# запросы с тем же ключом (от любых пользователей) ждут его, а не считают заново
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, compute):
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+            if leader:
+                return self._lead(key, flight, compute)
+
+            registry.increment("sleep_coalesced_requests_total", {"callback": current_callback()})
+            while not flight.done.wait(WAIT_CHECK_INTERVAL):
+                check_current()
+            if isinstance(flight.error, Superseded):
+                # Запрос, который считал результат, устарел и остановился - считаем сами
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+    def _lead(self, key, flight, compute):
+        try:
+            flight.value = compute()
+            return flight.value
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+tracker = SupersedeTracker(COALESCE_STATE_PATH)
+flights = SingleFlight()
+
+
+# Вычисление compute с ключом key, совмещённое с одинаковыми вычислениями в других потоках
+def coalesced(key, compute):
+    if not COALESCE_REQUESTS:
+        return compute()
+    return flights.run(key, compute)
+
+
+# Контекст обработки изменения фильтров номер sequence из вкладки session
+# обратным вызовом name. Результат устаревшего запроса отбрасывается
+@contextmanager
+def filter_request(session, name, sequence):
+    if not COALESCE_REQUESTS or session is None or sequence is None:
+        yield
+        return
+    ticket = tracker.begin(session, name, sequence)
+    token = _current_request.set(ticket)
+    try:
+        yield
+        check_current()
+    finally:
+        _current_request.reset(token)
+
+
+# Точка отмены: прерывает устаревший запрос перед дорогим этапом
+def check_current():
+    ticket = _current_request.get()
+    if ticket is not None and not tracker.is_current(ticket):
+        (_, name), _ = ticket
+        registry.increment("sleep_superseded_requests_total", {"callback": name})
+        raise Superseded()
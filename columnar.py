@@ -0,0 +1,43 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# Формат снимка: каталог, в котором каждый столбец лежит отдельным .npy файлом
+# (категориальные - кодами), а имена, типы и категории - в columns.json.
+# Файлы открываются через memory map только для чтения, поэтому все процессы
+# сервера используют одни и те же страницы памяти вместо собственных копий
+META_FILE = "columns.json"
+INDEX_FILE = "__index__.npy"
+
+
+def write_frame(df, directory):
+    os.makedirs(directory, exist_ok=True)
+    columns = []
+    for position, column in enumerate(df.columns):
+        values = df[column]
+        if not isinstance(values.dtype, pd.CategoricalDtype) and values.dtype == object:
+            values = values.astype("category")
+        entry = {"name": column, "file": f"{position}.npy"}
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            entry["categories"] = values.cat.categories.tolist()
+            values = values.cat.codes
+        np.save(os.path.join(directory, entry["file"]), np.ascontiguousarray(values.to_numpy()))
+        columns.append(entry)
+    np.save(os.path.join(directory, INDEX_FILE), df.index.to_numpy())
+    with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as file:
+        json.dump({"columns": columns, "index_name": df.index.name}, file, ensure_ascii=False)
+
+
+# Набор данных поверх отображённых в память файлов, без копирования столбцов
+def read_frame(directory):
+    with open(os.path.join(directory, META_FILE), encoding="utf-8") as file:
+        meta = json.load(file)
+    data = {}
+    for entry in meta["columns"]:
+        values = np.load(os.path.join(directory, entry["file"]), mmap_mode="r")
+        if "categories" in entry:
+            values = pd.Categorical.from_codes(values, categories=entry["categories"], validate=False)
+        data[entry["name"]] = values
+    index = pd.Index(np.load(os.path.join(directory, INDEX_FILE), mmap_mode="r"), name=meta["index_name"], copy=False)
+    return pd.DataFrame(data, index=index, copy=False)
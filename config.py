@@ -0,0 +1,100 @@
+import os
+
+# Корневой каталог проекта
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# URL-адрес опубликованной Google Таблицы в формате CSV
+SHEET_URL = 'https://docs.google.com/spreadsheets/d/e/2PACX-1vTHKgmSTdI0uGDzHCX0aiW5bBdwoOuh7sxI3M9NJkZB_bhwPwRQazYzfHZcFwvxXHXoJyqLL08k6t-A/pub?output=csv'
+
+# Источник данных: URL, путь к CSV или Parquet файлу; несколько источников
+# (например, таблицы регионов) перечисляются через запятую и объединяются
+DATA_SOURCE = os.environ.get("SLEEP_DATA_SOURCE", SHEET_URL)
+
+# Число строк CSV, разбираемых за один раз, и число одновременных загрузок источников
+CSV_CHUNK_ROWS = int(os.environ.get("SLEEP_CSV_CHUNK_ROWS", "50000"))
+DOWNLOAD_WORKERS = int(os.environ.get("SLEEP_DOWNLOAD_WORKERS", "8"))
+
+# Каталог локального кеша и каталог версий снимков набора данных
+CACHE_DIR = os.environ.get("SLEEP_CACHE_DIR", os.path.join(BASE_DIR, "cache"))
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshots")
+
+# Период опроса источника на изменения (в секундах), 0 - только одно обновление при старте
+REFRESH_INTERVAL = float(os.environ.get("SLEEP_REFRESH_INTERVAL", "300"))
+
+# Как часто процессы проверяют, не опубликована ли новая версия снимка (в секундах)
+SNAPSHOT_CHECK_INTERVAL = float(os.environ.get("SLEEP_SNAPSHOT_CHECK_INTERVAL", "5"))
+
+# Таймаут сетевых запросов к источнику (в секундах)
+HTTP_TIMEOUT = float(os.environ.get("SLEEP_HTTP_TIMEOUT", "30"))
+
+# Кеш готовых фигур (SQLite, общий для всех процессов) и его размер в записях
+FIGURE_CACHE_PATH = os.environ.get("SLEEP_FIGURE_CACHE", os.path.join(CACHE_DIR, "figures.sqlite"))
+FIGURE_CACHE_SIZE = int(os.environ.get("SLEEP_FIGURE_CACHE_SIZE", "1024"))
+# Как часто (в секундах) чтение из кеша записывает в базу время обращения к записи
+# и накопленные в процессе счётчики попаданий и промахов
+FIGURE_CACHE_TOUCH_INTERVAL = float(os.environ.get("SLEEP_FIGURE_CACHE_TOUCH_INTERVAL", "60"))
+
+# Число результатов запросов /api/query и страниц, которые хранятся в памяти каждого процесса
+QUERY_CACHE_SIZE = int(os.environ.get("SLEEP_QUERY_CACHE_SIZE", "512"))
+
+# Клиентский режим: куб передаётся в браузер, фильтрация и построение
+# графиков выполняются без обращений к серверу
+CLIENTSIDE_MODE = os.environ.get("SLEEP_CLIENTSIDE", "0") == "1"
+
+# Каталог для профилей отдельных запросов (cProfile); пусто - профилирование выключено
+PROFILE_DIR = os.environ.get("SLEEP_PROFILE_DIR", "")
+
+# График рассеяния: число точек, начиная с которого он рисуется через WebGL (Scattergl),
+# и с которого точки объединяются в ячейки сетки bins x bins по видимой области
+SCATTER_WEBGL_POINTS = int(os.environ.get("SLEEP_SCATTER_WEBGL_POINTS", "1000"))
+SCATTER_BIN_POINTS = int(os.environ.get("SLEEP_SCATTER_BIN_POINTS", "5000"))
+SCATTER_BINS = int(os.environ.get("SLEEP_SCATTER_BINS", "24"))
+
+# Сжатие ответов сервера (brotli или gzip, нужен пакет flask-compress)
+COMPRESS = os.environ.get("SLEEP_COMPRESS", "1") == "1"
+
+# Задержка отправки изменённых фильтров из браузера (в миллисекундах): серия быстрых
+# изменений отправляется на сервер одним запросом, 0 - без задержки
+FILTER_DEBOUNCE_MS = int(os.environ.get("SLEEP_FILTER_DEBOUNCE_MS", "250"))
+
+# Совмещение одинаковых вычислений графиков в одновременных запросах и отбрасывание
+# устаревших запросов вкладки, фильтры которой уже изменились снова
+COALESCE_REQUESTS = os.environ.get("SLEEP_COALESCE", "1") == "1"
+
+# SQLite файл с последним номером изменения фильтров каждой вкладки: общий для всех
+# процессов сервера, поэтому устаревший запрос узнаёт о новом, даже если тот попал
+# в другой процесс
+COALESCE_STATE_PATH = os.environ.get("SLEEP_COALESCE_STATE", os.path.join(CACHE_DIR, "requests.sqlite"))
+
+# Фоновый режим: графики страницы "Здоровье" строятся фоновыми задачами в отдельных
+# процессах (фоновые обратные вызовы Dash, нужны пакеты diskcache, multiprocess и psutil).
+# Результаты задач хранятся в BACKGROUND_CACHE_DIR и удаляются, если к ним не обращались
+# BACKGROUND_EXPIRE секунд
+BACKGROUND_MODE = os.environ.get("SLEEP_BACKGROUND", "0") == "1"
+BACKGROUND_CACHE_DIR = os.path.join(CACHE_DIR, "jobs")
+BACKGROUND_EXPIRE = float(os.environ.get("SLEEP_BACKGROUND_EXPIRE", "3600"))
+
+# Хранилище набора данных: "memory" - набор целиком в памяти процесса (pandas, снимки
+# в SNAPSHOT_DIR), "duckdb" - набор в локальном файле Parquet или базе DuckDB, фильтры
+# и группировки выполняются запросами SQL, в память попадают только их результаты
+# (нужен пакет duckdb; файл готовит python duckdb_store.py import)
+DATA_BACKEND = os.environ.get("SLEEP_BACKEND", "memory")
+
+# Файл набора для хранилища duckdb: Parquet (можно шаблон вида data/*.parquet)
+# или база DuckDB (.duckdb) с таблицей DUCKDB_TABLE
+DUCKDB_PATH = os.environ.get("SLEEP_DUCKDB_PATH", os.path.join(CACHE_DIR, "sleep.parquet"))
+DUCKDB_TABLE = os.environ.get("SLEEP_DUCKDB_TABLE", "sleep")
+
+# Ограничение памяти DuckDB (промежуточные данные сверх него сбрасываются во временные
+# файлы на диске) и число потоков одного запроса, 0 - по числу ядер
+DUCKDB_MEMORY_LIMIT = os.environ.get("SLEEP_DUCKDB_MEMORY_LIMIT", "1GB")
+DUCKDB_THREADS = int(os.environ.get("SLEEP_DUCKDB_THREADS", "0"))
+
+# Каталог хранилища duckdb: сохранённые куб, статистика и описание столбцов по версиям
+# файла и временные файлы запросов. Лежит вне SNAPSHOT_DIR, где хранилище в памяти
+# удаляет старые снимки
+DUCKDB_CACHE_DIR = os.path.join(CACHE_DIR, "duckdb")
+
+# Каталог собранных изображений (python static_assets.py): копии в форматах AVIF и WebP
+# с хешем содержимого в имени, которые отдаются с долгим кешированием
+ASSET_BUILD_DIR = os.environ.get("SLEEP_ASSET_BUILD_DIR", os.path.join(BASE_DIR, "build", "assets"))
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from filter_index import FILTER_COLUMNS
+from query import ADDITIVE_AGGREGATIONS, condition_mask, result_column
+
+# Группировки, которые отображают страницы: имя -> (ключи группировки, усредняемые показатели)
+GROUPINGS = {
+    # Пузырьковая диаграмма: качество сна по профессии, продолжительности сна и стрессу
+    "scatter": (["Occupation", "Sleep Duration", "Stress Level"], ["Quality of Sleep"]),
+    # Кольцевая диаграмма: шаги по качеству сна
+    "steps_by_quality": (["Quality of Sleep"], ["Daily Steps"]),
+    # Линейный график: качество сна по продолжительности сна
+    "quality_by_duration": (["Sleep Duration"], ["Quality of Sleep"]),
+    # Линейный график: продолжительность сна по давлению
+    "duration_by_pressure": (["Blood Pressure"], ["Sleep Duration"]),
+    # Половозрастная пирамида: качество сна по возрасту и полу
+    "quality_by_age_gender": (["Age", "Gender"], ["Quality of Sleep"]),
+    # Круговая диаграмма: количество людей по нарушениям сна
+    "disorders": (["Sleep Disorder"], []),
+    # Индикаторы: средний уровень стресса и качество сна
+    "overall": ([], ["Stress Level", "Quality of Sleep"]),
+}
+
+
+# Куб предагрегатов: для каждой группировки хранятся суммы показателей
+# и количество строк в ячейках (значения фильтров x ключи группировки).
+# Запрос складывает выбранные ячейки, поэтому его стоимость зависит
+# от числа ячеек, а не от числа строк набора
+class Cube:
+    def __init__(self, df, groupings=GROUPINGS, dimensions=FILTER_COLUMNS):
+        self.groupings = groupings
+        self.dimensions = [column for column in dimensions if column in df.columns]
+        self.cells = {}
+        for name, (keys, measures) in groupings.items():
+            by = self.dimensions + [key for key in keys if key not in self.dimensions]
+            # Суммы считаются в float64, чтобы не переполнить узкие целые типы
+            values = df[by].assign(**{measure: df[measure].astype("float64") for measure in measures})
+            grouped = values.groupby(by, observed=True)
+            cells = grouped[measures].sum() if measures else pd.DataFrame(index=grouped.size().index)
+            cells["count"] = grouped.size()
+            self.cells[name] = cells.reset_index()
+
+    # Куб из готовых ячеек {группировка: таблица ячеек} в том же виде, что строит
+    # конструктор (например, посчитанных запросами SQL, см. duckdb_store.py)
+    @classmethod
+    def from_cells(cls, cells, dimensions, groupings=GROUPINGS):
+        cube = cls.__new__(cls)
+        cube.groupings = groupings
+        cube.dimensions = list(dimensions)
+        cube.cells = cells
+        return cube
+
+    # Группировка, по ячейкам которой можно ответить на запрос (query.Query): фильтры
+    # и ключи запроса входят в ячейки, а агрегаты - суммы и средние её показателей.
+    # Из подходящих выбирается группировка с наименьшим числом ячеек; None, если таких нет
+    def grouping_for(self, query):
+        candidates = []
+        for name, (keys, measures) in self.groupings.items():
+            columns = set(self.dimensions) | set(keys)
+            if not set(query.filters) <= columns or not set(query.group_by) <= columns:
+                continue
+            if any(column not in measures or not set(functions) <= ADDITIVE_AGGREGATIONS
+                   for column, functions in query.aggregations.items()):
+                continue
+            candidates.append((len(self.cells[name]), name))
+        return min(candidates)[1] if candidates else None
+
+    # Ответ на запрос по ячейкам группировки name: выбранные ячейки складываются
+    # по ключам запроса, средние - суммы, делённые на количество строк
+    def answer(self, name, query):
+        cells = self.cells[name]
+        if query.filters:
+            mask = np.ones(len(cells), dtype=bool)
+            for column, condition in query.filters.items():
+                mask &= condition_mask(cells[column], condition)
+            cells = cells[mask]
+
+        columns = list(query.aggregations) + ["count"]
+        if query.group_by:
+            sums = cells.groupby(query.group_by, observed=True)[columns].sum().reset_index()
+        else:
+            sums = cells[columns].sum().to_frame().T
+        result = sums[query.group_by + ["count"]].copy()
+        result["count"] = result["count"].astype("int64")
+        for column, functions in query.aggregations.items():
+            for function in functions:
+                values = sums[column] / sums["count"] if function == "mean" else sums[column]
+                result[result_column(function, column)] = values
+        return result
+
+    # Компактное представление ячеек для передачи в браузер: значения столбцов
+    # списками, категориальные значения - кодами со списком категорий
+    def export(self, names=None):
+        result = {"dimensions": self.dimensions, "categories": {}, "groupings": {}}
+        for name in names or self.groupings:
+            keys, measures = self.groupings[name]
+            cells = self.cells[name]
+            columns = {}
+            for column in cells.columns:
+                values = cells[column]
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    result["categories"].setdefault(column, values.cat.categories.tolist())
+                    values = values.cat.codes
+                columns[column] = values.tolist()
+            result["groupings"][name] = {"keys": keys, "measures": measures, "columns": columns}
+        return result
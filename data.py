@@ -1,11 +1,442 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
 import pandas as pd
-import requests
-from io import StringIO
+from coalesce import coalesced
+from columnar import read_frame, write_frame
+from config import (DATA_BACKEND, DATA_SOURCE, DUCKDB_CACHE_DIR, DUCKDB_PATH, DUCKDB_TABLE, QUERY_CACHE_SIZE,
+                    REFRESH_INTERVAL, SNAPSHOT_CHECK_INTERVAL, SNAPSHOT_DIR)
+from cube import GROUPINGS, Cube
+from filter_index import FilterIndex
+from ingest import download as ingest_download, download_all, parse_download, read_downloads
+from metrics import current_callback, phase, registry
+from query import Query, QueryCache, execute, result_column
+from schema import append_rows
+from stats import CellStats
+from sources import make_sources
 
-# URL-адрес опубликованной Google Таблицы в формате CSV
-url = 'https://docs.google.com/spreadsheets/d/e/2PACX-1vTHKgmSTdI0uGDzHCX0aiW5bBdwoOuh7sxI3M9NJkZB_bhwPwRQazYzfHZcFwvxXHXoJyqLL08k6t-A/pub?output=csv'
-response = requests.get(url)
-response.raise_for_status()
+try:
+    import fcntl
+except ImportError:
+    # Windows: блокировки нет, источник опрашивает каждый процесс
+    fcntl = None
 
-#Чтение CSV-данных из ответа и создание DataFrame
-df = pd.read_csv(StringIO(response.text), index_col=0)
\ No newline at end of file
+logger = logging.getLogger(__name__)
+
+
+# Хранилище набора данных с версионированными снимками в локальном кеше.
+# Холодный старт - чтение последнего снимка; источники опрашиваются параллельно
+# в фоновом потоке условными запросами и разбираются потоково, блоками строк,
+# а если в единственном CSV только дописаны строки, разбираются лишь они. Новая версия публикуется атомарной заменой файла-указателя,
+# остальные процессы замечают её и подменяют набор без перезапуска.
+# Вместе с набором хранятся производные структуры (индексы, куб и т.п.),
+# которые строятся при загрузке и заменяются вместе с ним
+class DataStore:
+    def __init__(self, sources, snapshot_dir):
+        self.sources = sources
+        self.snapshot_dir = snapshot_dir
+        self.pointer_path = os.path.join(snapshot_dir, "current.json")
+        self._factories = {}
+        self._updaters = {}
+        self._lazy = set()
+        self._persisted = set()
+        self._listeners = []
+        self._state = None
+        self._meta = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._poller = None
+        self._leader_file = None
+
+    # Регистрация производной структуры: factory(df) вызывается при каждой загрузке.
+    # lazy - строить при первом обращении, а не при загрузке;
+    # persist - строить один раз при публикации версии и хранить в снимке,
+    # тогда остальные процессы загружают готовую структуру вместо пересчёта;
+    # update(structure, new_rows) - новая структура после дописывания строк в источник
+    # без пересчёта по всему набору (для хранимых в снимке структур)
+    def register(self, name, factory, lazy=False, persist=False, update=None):
+        self._factories[name] = factory
+        if update is not None:
+            self._updaters[name] = update
+        if lazy:
+            self._lazy.add(name)
+        if persist:
+            self._persisted.add(name)
+
+    # Подписка на смену версии набора: listener(version) вызывается после замены
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def get_state(self):
+        if self._state is None:
+            with self._lock:
+                if self._state is None:
+                    self._load()
+                    self._start_polling()
+        return self._state
+
+    def get(self):
+        return self.get_state()[0]
+
+    def get_derived(self, name, state=None):
+        df, derived = state or self.get_state()
+        if name not in derived:
+            derived[name] = self._factories[name](df)
+        return derived[name]
+
+    def _set_df(self, df, meta):
+        derived = {}
+        for name, factory in self._factories.items():
+            path = os.path.join(self.snapshot_dir, meta["snapshot"], "derived", f"{name}.pkl")
+            if name in self._persisted and os.path.exists(path):
+                derived[name] = pd.read_pickle(path)
+            elif name not in self._lazy:
+                derived[name] = factory(df)
+        derived["version"] = meta["version"]
+        previous = self._state
+        # Набор и его производные заменяются одним присваиванием
+        self._state = (df, derived)
+        self._meta = meta
+        if previous is not None:
+            for listener in self._listeners:
+                listener(derived["version"])
+
+    def _load(self):
+        meta = self._read_pointer()
+        if meta is not None:
+            self._set_df(read_frame(os.path.join(self.snapshot_dir, meta["snapshot"])), meta)
+        else:
+            # Снимка ещё нет - единственный случай, когда старт ждёт сеть
+            self.refresh()
+
+    def _read_pointer(self):
+        try:
+            with open(self.pointer_path, encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    # Проверка новой версии, опубликованной другим процессом
+    def follow(self):
+        meta = self._read_pointer()
+        if meta is not None and meta["version"] != self._meta.get("version"):
+            self._set_df(read_frame(os.path.join(self.snapshot_dir, meta["snapshot"])), meta)
+            logger.info("Загружена версия данных %s", meta["version"])
+
+    # Параллельный запрос источников и публикация новой версии; False, если данные не изменились
+    def refresh(self):
+        with self._refresh_lock:
+            meta = self._read_pointer() or {}
+            # Указатель старого формата описывает единственный источник на верхнем уровне
+            previous = meta.get("sources") or [meta]
+            if len(previous) != len(self.sources):
+                previous = [{}] * len(self.sources)
+            downloads = download_all(self.sources, [item.get("validators") for item in previous])
+            if all(download is None for download in downloads):
+                return False
+            try:
+                if any(download is None for download in downloads):
+                    # Набор собирается из всех источников, неизменённые загружаются повторно
+                    downloads = [download or ingest_download(source) for download, source in zip(downloads, self.sources)]
+                sources_meta = [download.meta() for download in downloads]
+                if len(downloads) == 1:
+                    digest = downloads[0].sha1
+                else:
+                    digest = hashlib.sha1("".join(download.sha1 for download in downloads).encode()).hexdigest()
+                if digest == meta.get("sha1"):
+                    # Содержимое то же, но у источника новые валидаторы (ETag, Last-Modified,
+                    # время изменения файла): без их сохранения следующие опросы загружали
+                    # бы источник целиком
+                    if sources_meta != meta.get("sources"):
+                        self._save_sources_meta(meta, sources_meta)
+                    return False
+
+                df, new_rows = self._append(downloads, previous, meta)
+                if df is None:
+                    df = read_downloads(downloads)
+                    logger.info("Память набора данных по столбцам (байт):\n%s", df.memory_usage(deep=True).to_string())
+                self._publish(df, {"sha1": digest, "sources": sources_meta}, new_rows)
+            finally:
+                for download in downloads:
+                    if download is not None:
+                        download.close()
+            return True
+
+    # Замена описания источников в указателе без публикации новой версии набора
+    def _save_sources_meta(self, meta, sources_meta):
+        meta = dict(meta, sources=sources_meta)
+        self._write_atomic(self.pointer_path, lambda path: _dump_json(meta, path))
+        if meta.get("version") == self._meta.get("version"):
+            self._meta = dict(self._meta, sources=sources_meta)
+
+    # Разбор только дописанных строк, если источник один и его старое содержимое - неизменный префикс нового.
+    # Возвращает (набор, новые строки) или (None, None)
+    def _append(self, downloads, previous, meta):
+        if len(downloads) != 1:
+            return None, None
+        download, length = downloads[0], previous[0].get("length")
+        if not (download.source.appendable and self._state is not None and length and previous[0].get("complete_lines")):
+            return None, None
+        if meta.get("version") != self._meta.get("version") or download.length <= length:
+            return None, None
+        if download.prefix_sha1(length) != previous[0]["sha1"]:
+            return None, None
+        try:
+            new_rows = parse_download(download, offset=length)
+            df = append_rows(self._state[0], new_rows)
+        except ValueError:
+            logger.warning("Не удалось дописать новые строки, набор будет разобран целиком", exc_info=True)
+            return None, None
+        logger.info("Добавлено строк: %d", len(new_rows))
+        return df, new_rows
+
+    def _publish(self, df, meta, new_rows=None):
+        version = dataset_version(df)
+        if version == self._meta.get("version"):
+            # Содержимое источника изменилось, а данные нет (например, форматирование)
+            self._meta = dict(self._meta, **meta)
+            self._write_atomic(self.pointer_path, lambda path: _dump_json(self._meta, path))
+            return
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        snapshot = version
+        if not os.path.exists(os.path.join(self.snapshot_dir, snapshot)):
+            self._write_atomic(os.path.join(self.snapshot_dir, snapshot), lambda path: self._write_snapshot(df, path, new_rows))
+        meta = dict(meta, version=version, snapshot=snapshot)
+        self._write_atomic(self.pointer_path, lambda path: _dump_json(meta, path))
+        # Этот процесс тоже переходит на отображённые в память столбцы снимка
+        self._set_df(read_frame(os.path.join(self.snapshot_dir, snapshot)), meta)
+        self._prune_snapshots(keep={snapshot})
+        logger.info("Опубликована версия данных %s", version)
+
+    # Снимок набора и хранимых производных структур. Если к текущему набору только
+    # дописаны строки new_rows, структуры с функцией обновления обновляются по ним
+    def _write_snapshot(self, df, path, new_rows=None):
+        write_frame(df, path)
+        os.makedirs(os.path.join(path, "derived"))
+        for name in self._persisted:
+            if new_rows is not None and name in self._updaters:
+                structure = self._updaters[name](self.get_derived(name), new_rows)
+            else:
+                structure = self._factories[name](df)
+            pd.to_pickle(structure, os.path.join(path, "derived", f"{name}.pkl"))
+
+    def _write_atomic(self, path, write):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            write(tmp_path)
+        except BaseException:
+            _remove(tmp_path)
+            raise
+        # Атомарная замена, чтобы другие процессы не прочитали недописанный файл
+        os.replace(tmp_path, path)
+
+    # Удаление старых снимков; предыдущий оставляется для процессов, которые ещё его читают.
+    # Удаляются только каталоги с именем версии (dataset_version), остальное не трогается.
+    # Недописанные снимки и указатели (*.<pid>.tmp) процессов, которые завершились
+    # посреди публикации, тоже удаляются: каждый такой снимок - полная копия столбцов
+    def _prune_snapshots(self, keep, previous=1):
+        entries = list(os.scandir(self.snapshot_dir))
+        snapshots = sorted(
+            (entry for entry in entries
+             if entry.is_dir() and entry.name not in keep and SNAPSHOT_NAME.match(entry.name)),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True,
+        )
+        for entry in snapshots[previous:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+        for entry in entries:
+            match = TEMPORARY_NAME.match(entry.name)
+            if match and not _process_alive(int(match.group(1))):
+                _remove(entry.path)
+
+    # Источник опрашивает только один процесс (владелец файловой блокировки),
+    # остальные следят за указателем на текущую версию
+    def _is_leader(self):
+        if self._leader_file is not None or fcntl is None:
+            return True
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        file = open(os.path.join(self.snapshot_dir, "refresh.lock"), "w")
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return False
+        self._leader_file = file
+        return True
+
+    def _start_polling(self):
+        if self._poller is None:
+            self._poller = threading.Thread(target=self._poll, daemon=True)
+            self._poller.start()
+
+    def _poll(self):
+        next_refresh = 0
+        while True:
+            leader = self._is_leader()
+            try:
+                if not leader:
+                    self.follow()
+                elif time.monotonic() >= next_refresh:
+                    next_refresh = time.monotonic() + REFRESH_INTERVAL
+                    self.refresh()
+            except Exception:
+                logger.warning("Не удалось обновить данные из источника, используется снимок", exc_info=True)
+            if leader and not REFRESH_INTERVAL:
+                return
+            time.sleep(SNAPSHOT_CHECK_INTERVAL)
+
+
+def _dump_json(value, path):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(value, file)
+
+
+# Удаление файла или каталога, если он есть
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+# Выполняется ли процесс pid на этой машине. Без сигналов (Windows) процесс
+# считается живым, и его временные файлы не удаляются
+def _process_alive(pid):
+    if pid == os.getpid():
+        return True
+    if fcntl is None:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# Версия набора данных - хеш содержимого, входит в ключи кешей и имя снимка
+SNAPSHOT_NAME = re.compile(r"^[0-9a-f]{16}$")
+# Временные снимки и указатели при записи (DataStore._write_atomic) с номером процесса
+TEMPORARY_NAME = re.compile(r"^(?:[0-9a-f]{16}|current\.json)\.(\d+)\.tmp$")
+
+
+def dataset_version(df):
+    hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    digest = hashlib.sha1(hashes.tobytes())
+    digest.update(",".join(map(str, df.columns)).encode())
+    return digest.hexdigest()[:16]
+
+
+store = DataStore(make_sources(DATA_SOURCE), SNAPSHOT_DIR)
+# Битовые индексы строятся при первом полном проходе (query.scan), который нужен
+# только запросам API, не покрытым кубом
+store.register("filter_index", FilterIndex, lazy=True)
+store.register("cube", Cube, persist=True)
+store.register("stats", CellStats, persist=True, update=CellStats.updated)
+
+
+# Хранилище набора вне памяти процесса (SLEEP_BACKEND=duckdb, см. duckdb_store.py);
+# None - набор загружается в память (store)
+def make_external():
+    if DATA_BACKEND != "duckdb":
+        return None
+    try:
+        from duckdb_store import DuckDBStore, build_cube, build_stats, describe
+    except ImportError:
+        logger.warning("Хранилище duckdb недоступно: нужен пакет duckdb (pip install duckdb), "
+                       "набор данных загружается в память")
+        return None
+    external = DuckDBStore(DUCKDB_PATH, DUCKDB_TABLE, DUCKDB_CACHE_DIR)
+    external.register("cube", build_cube, persist=True)
+    external.register("stats", build_stats, persist=True)
+    external.register("columns", describe, persist=True)
+    return external
+
+
+external = make_external()
+# Хранилище, из которого страницы и API получают данные
+active = external or store
+
+
+# Доступ к актуальному набору данных (только для набора в памяти)
+def get_df():
+    if external is not None:
+        raise RuntimeError("Набор данных в хранилище duckdb не загружается в память")
+    return store.get()
+
+
+def get_version():
+    return active.get_derived("version")
+
+
+# Подписка на смену версии набора в действующем хранилище
+def subscribe(listener):
+    active.subscribe(listener)
+
+
+query_cache = QueryCache(QUERY_CACHE_SIZE)
+# Результаты прошлых версий данных больше не понадобятся
+subscribe(query_cache.clear)
+
+
+# Выполнение запроса (query.Query) над актуальным набором: по кубу, если он покрывает
+# запрос, иначе полным проходом (в хранилище duckdb - запросом SQL по файлу). Результаты кешируются по отпечатку запроса и версии данных.
+# Возвращает (результат, способ выполнения, версия данных); результат не изменяется на месте
+def run_query(query):
+    state = active.get_state()
+    version = state[1]["version"]
+    key = (version, query.fingerprint())
+    cached = query_cache.get(key)
+    registry.increment("sleep_query_cache_requests_total", {"callback": current_callback(), "result": "miss" if cached is None else "hit"})
+    if cached is None:
+        # Одновременные одинаковые запросы выполняются один раз
+        cached = coalesced(("query",) + key, lambda: _execute_query(state, query, key))
+    return cached + (version,)
+
+
+def _execute_query(state, query, key):
+    cube = active.get_derived("cube", state)
+    if external is not None:
+        from duckdb_store import execute as execute_sql
+
+        with phase("query"):
+            result = execute_sql(state[0], query, cube)
+    else:
+        # Битовые индексы нужны только полному проходу
+        index = store.get_derived("filter_index", state) if cube.grouping_for(query) is None else None
+        with phase("query"):
+            result = execute(state[0], query, cube, index)
+    query_cache.set(key, result)
+    registry.increment("sleep_queries_total", {"plan": result[1]})
+    return result
+
+
+# Средние показатели и количество строк группировки name (см. cube.GROUPINGS) для фильтров
+def aggregate(name, selections):
+    keys, measures = GROUPINGS[name]
+    query = Query(
+        filters={column: {"values": sorted(set(values))} for column, values in selections.items() if values},
+        group_by=keys,
+        aggregations={measure: ["mean"] for measure in measures},
+    )
+    with phase("aggregate"):
+        result = run_query(query)[0]
+        return result.rename(columns={result_column("mean", measure): measure for measure in measures})
+
+
+# Количество, среднее, дисперсия и доверительный интервал показателей индикаторов
+# (stats.STATS_MEASURES) для фильтров по ячейкам потоковой статистики
+def indicator_stats(selections):
+    with phase("aggregate"):
+        return active.get_derived("stats").summary(selections)
+
+
+# Ячейки куба для группировок names в виде, пригодном для передачи в браузер
+def export_cube(names):
+    return active.get_derived("cube").export(names)
@@ -0,0 +1,550 @@
+import glob
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+import duckdb
+import numpy as np
+import pandas as pd
+from config import DUCKDB_MEMORY_LIMIT, DUCKDB_TABLE, DUCKDB_THREADS, SNAPSHOT_CHECK_INTERVAL
+from cube import GROUPINGS, Cube
+from filter_index import FILTER_COLUMNS
+from query import result_column
+from stats import STATS_DIMENSIONS, STATS_MEASURES, CellStats
+
+logger = logging.getLogger(__name__)
+
+# Типы столбцов DuckDB -> типы пустого набора, по которому проверяются запросы
+SQL_DTYPES = {
+    "TINYINT": "int8", "SMALLINT": "int16", "INTEGER": "int32", "BIGINT": "int64",
+    "UTINYINT": "uint8", "USMALLINT": "uint16", "UINTEGER": "uint32", "UBIGINT": "uint64",
+    "FLOAT": "float32", "DOUBLE": "float64",
+}
+
+# Порядковые статистики query.AGGREGATIONS -> уровень квантиля (остальное - процентили pNN)
+QUANTILE_LEVELS = {"min": 0.0, "max": 1.0, "median": 0.5}
+
+
+# Файл набора одной версии, открытый в DuckDB: соединение и выражение для FROM.
+# Соединение DuckDB нельзя делить между потоками, поэтому у каждого потока свой курсор;
+# копия процесса (фоновые задачи) открывает файл заново. schema - типы столбцов
+# (см. read_schema), если они уже известны
+class Snapshot:
+    def __init__(self, path, table=DUCKDB_TABLE, temp_dir=None, schema=None):
+        self.path = path
+        self.table = table
+        self.temp_dir = temp_dir
+        if path.endswith(".duckdb"):
+            self.relation = _identifier(table)
+        else:
+            self.relation = f"read_parquet({_literal(path)})"
+        self._local = threading.local()
+        self._connect()
+        self.schema = schema if schema is not None else read_schema(self)
+
+    def _connect(self):
+        config = {"memory_limit": DUCKDB_MEMORY_LIMIT}
+        if DUCKDB_THREADS:
+            config["threads"] = DUCKDB_THREADS
+        if self.temp_dir:
+            config["temp_directory"] = self.temp_dir
+        if self.path.endswith(".duckdb"):
+            self.connection = duckdb.connect(self.path, read_only=True, config=config)
+        else:
+            self.connection = duckdb.connect(config=config)
+        self._pid = os.getpid()
+
+    def cursor(self):
+        if self._pid != os.getpid():
+            self._connect()
+        local = self._local
+        if getattr(local, "connection", None) is not self.connection:
+            local.connection, local.cursor = self.connection, self.connection.cursor()
+        return local.cursor
+
+    # Результат запроса SQL в виде pandas (результаты небольшие: группы и ячейки)
+    def fetch(self, sql, params=()):
+        return self.cursor().execute(sql, list(params)).df()
+
+    # Группы, ячейки и т.п. с категориальными столбцами в типах набора
+    def to_frame(self, result):
+        schema = self.schema
+        for column in result.columns:
+            if column in schema.columns and isinstance(schema[column].dtype, pd.CategoricalDtype):
+                result[column] = pd.Categorical(result[column].astype(object), dtype=schema[column].dtype)
+        return result
+
+
+# Пустой набор с типами столбцов файла; строковые столбцы - категории со всеми
+# значениями, отсортированными как в pandas (для проверки запросов и ключей результатов)
+def read_schema(snapshot):
+    cursor = snapshot.cursor()
+    columns = {}
+    for column, sql_type, *_ in cursor.execute(f"DESCRIBE SELECT * FROM {snapshot.relation}").fetchall():
+        if sql_type in SQL_DTYPES:
+            columns[column] = pd.Series([], dtype=SQL_DTYPES[sql_type])
+        else:
+            key = _text(column)
+            rows = cursor.execute(f"SELECT DISTINCT {key} AS value FROM {snapshot.relation} WHERE {key} IS NOT NULL ORDER BY value").fetchall()
+            columns[column] = pd.Series(pd.Categorical([], categories=[row[0] for row in rows]))
+    return pd.DataFrame(columns)
+
+
+# Набор данных в локальном файле Parquet или базе DuckDB, который не загружается
+# в память процесса: фильтры и группировки выполняются запросами SQL по файлу,
+# DuckDB читает только нужные столбцы и при нехватке памяти (DUCKDB_MEMORY_LIMIT)
+# сбрасывает промежуточные данные на диск. Интерфейс как у data.DataStore:
+# производные структуры (куб, статистика индикаторов) строятся запросами SQL
+# один раз на версию и хранятся в cache_dir; версия - отпечаток размеров и времени
+# изменения файлов набора, файл проверяется не чаще раза в SNAPSHOT_CHECK_INTERVAL
+class DuckDBStore:
+    def __init__(self, path, table=DUCKDB_TABLE, cache_dir=None):
+        self.path = path
+        self.table = table
+        self.cache_dir = cache_dir
+        self._factories = {}
+        self._persisted = set()
+        self._listeners = []
+        self._state = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    # Регистрация производной структуры: factory(snapshot) строится при первом обращении;
+    # persist - хранить в cache_dir, тогда остальные процессы загружают готовую структуру
+    def register(self, name, factory, persist=False):
+        self._factories[name] = factory
+        if persist:
+            self._persisted.add(name)
+
+    # Подписка на смену версии набора: listener(version) вызывается после замены
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def get_state(self):
+        if self._state is None or time.monotonic() >= self._next_check:
+            with self._lock:
+                if self._state is None or time.monotonic() >= self._next_check:
+                    self._next_check = time.monotonic() + SNAPSHOT_CHECK_INTERVAL
+                    version = file_version(self.path)
+                    if self._state is None or version != self._state[1]["version"]:
+                        self._open(version)
+        return self._state
+
+    def get(self):
+        return self.get_state()[0]
+
+    def get_derived(self, name, state=None):
+        snapshot, derived = state or self.get_state()
+        if name not in derived:
+            # Структура строится полным проходом по файлу, одновременные обращения ждут одну
+            with self._build_lock:
+                if name not in derived:
+                    derived[name] = self._build(name, snapshot, derived["version"])
+        return derived[name]
+
+    def _build(self, name, snapshot, version):
+        structure = self._load(name, version) if name in self._persisted else None
+        if structure is None:
+            started = time.perf_counter()
+            structure = self._factories[name](snapshot)
+            logger.info("Построено %s по %s за %.1f с", name, self.path, time.perf_counter() - started)
+            if name in self._persisted:
+                self._save(name, version, structure)
+        return structure
+
+    def _path(self, name, version):
+        return os.path.join(self.cache_dir, version, f"{name}.pkl") if self.cache_dir else None
+
+    def _load(self, name, version):
+        path = self._path(name, version)
+        return pd.read_pickle(path) if path and os.path.exists(path) else None
+
+    def _save(self, name, version, structure):
+        path = self._path(name, version)
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            pd.to_pickle(structure, tmp_path)
+            os.replace(tmp_path, path)
+
+    # Удаление структур старых версий; предыдущая оставляется для процессов, которые ещё её читают
+    def _prune(self, keep, previous=1):
+        versions = sorted(
+            (entry for entry in os.scandir(self.cache_dir) if entry.is_dir() and entry.name not in (keep, "tmp")),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True,
+        )
+        for entry in versions[previous:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _open(self, version):
+        temp_dir = os.path.join(self.cache_dir, "tmp") if self.cache_dir else None
+        # Типы и категории столбцов нужны каждому запросу: они читаются проходом
+        # по строковым столбцам один раз на версию и хранятся рядом с кубом
+        schema = self._load("schema", version)
+        snapshot = Snapshot(self.path, self.table, temp_dir, schema)
+        if schema is None:
+            self._save("schema", version, snapshot.schema)
+            self._prune(keep=version)
+        previous = self._state
+        # Запросы, которые уже выполняются, дочитывают старую версию своим соединением
+        self._state = (snapshot, {"version": version})
+        logger.info("Открыта версия данных %s (%s)", version, self.path)
+        if previous is not None:
+            for listener in self._listeners:
+                listener(version)
+
+
+# Версия набора: отпечаток путей, размеров и времени изменения файлов (без чтения содержимого)
+def file_version(path):
+    files = sorted(glob.glob(path))
+    if not files:
+        raise FileNotFoundError(f"Нет файла набора данных {path} (см. python duckdb_store.py import)")
+    digest = hashlib.sha1()
+    for name in files:
+        stat = os.stat(name)
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+def _identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+# Строковый столбец как VARCHAR: столбцы ENUM иначе сортируются по порядку значений типа
+def _text(column):
+    return f"CAST({_identifier(column)} AS VARCHAR)"
+
+
+# Ключ группировки: строки - как VARCHAR, чтобы порядок групп совпадал с pandas
+def _key(column, schema):
+    if isinstance(schema[column].dtype, pd.CategoricalDtype):
+        return _text(column)
+    return _identifier(column)
+
+
+# Значения показателя в float64; NaN считается пропуском, как в pandas
+def _value(column):
+    return f"nullif(CAST({_identifier(column)} AS DOUBLE), 'NaN'::DOUBLE)"
+
+
+def _aggregate_sql(function, column):
+    value = _value(column)
+    if function == "sum":
+        return f"coalesce(sum({value}), 0)"
+    if function == "mean":
+        return f"avg({value})"
+    level = QUANTILE_LEVELS[function] if function in QUANTILE_LEVELS else float(function[1:]) / 100
+    if level == 0.0:
+        return f"min({value})"
+    if level == 1.0:
+        return f"max({value})"
+    # Линейная интерполяция между соседними значениями, как numpy.quantile и query.scan
+    return f"quantile_cont({value}, {level!r})"
+
+
+# Условие WHERE и параметры для фильтров запроса и ключей группировки
+# (строки с пропуском в ключе не попадают ни в одну группу, как в pandas)
+def _where(filters, keys, schema):
+    conditions, params = [], []
+    for column, condition in filters.items():
+        if "values" in condition:
+            values = condition["values"]
+            if not values:
+                conditions.append("FALSE")
+                continue
+            conditions.append(f"{_key(column, schema)} IN ({', '.join('?' * len(values))})")
+            params += values
+        if "min" in condition:
+            conditions.append(f"{_identifier(column)} >= ?")
+            params.append(condition["min"])
+        if "max" in condition:
+            conditions.append(f"{_identifier(column)} <= ?")
+            params.append(condition["max"])
+    for column in keys:
+        conditions.append(f"{_identifier(column)} IS NOT NULL")
+        if schema[column].dtype.kind == "f":
+            conditions.append(f"NOT isnan({_identifier(column)})")
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+# Запрос SQL, который возвращает тот же результат, что query.scan: группы в порядке
+# ключей, количество строк в группе и агрегаты со столбцами result_column
+def to_sql(query, relation, schema):
+    columns = [f"{_key(column, schema)} AS {_identifier(column)}" for column in query.group_by]
+    columns.append('count(*) AS "count"')
+    for column, functions in query.aggregations.items():
+        for function in functions:
+            columns.append(f"{_aggregate_sql(function, column)} AS {_identifier(result_column(function, column))}")
+    where, params = _where(query.filters, query.group_by, schema)
+    sql = f"SELECT {', '.join(columns)} FROM {relation}{where}"
+    if query.group_by:
+        keys = ", ".join(_identifier(column) for column in query.group_by)
+        sql += f" GROUP BY {keys} ORDER BY {keys}"
+    if query.limit is not None:
+        sql += f" LIMIT {int(query.limit)}"
+    return sql, params
+
+
+# Выполнение запроса (query.Query): по кубу, если он покрывает запрос, иначе запросом SQL
+# по файлу набора. Возвращает результат и способ выполнения ("cube" или "sql")
+def execute(snapshot, query, cube=None):
+    query.validate(snapshot.schema)
+    name = cube.grouping_for(query) if cube is not None else None
+    if name is not None:
+        result = cube.answer(name, query)
+        if query.limit is not None:
+            result = result.iloc[:query.limit]
+        return result.reset_index(drop=True), "cube"
+
+    sql, params = to_sql(query, snapshot.relation, snapshot.schema)
+    try:
+        result = snapshot.fetch(sql, params)
+    except (duckdb.ConversionException, duckdb.BinderException) as error:
+        # Значения фильтра не приводятся к типу столбца - ошибка запроса, а не сервера
+        raise ValueError(str(error)) from error
+    result["count"] = result["count"].astype("int64")
+    return snapshot.to_frame(result), "sql"
+
+
+# Куб предагрегатов (cube.Cube) по файлу набора: ячейки каждой группировки - один запрос SQL
+def build_cube(snapshot, groupings=GROUPINGS):
+    schema = snapshot.schema
+    dimensions = [column for column in FILTER_COLUMNS if column in schema.columns]
+    cells = {}
+    for name, (keys, measures) in groupings.items():
+        by = dimensions + [key for key in keys if key not in dimensions]
+        columns = [f"{_key(column, schema)} AS {_identifier(column)}" for column in by]
+        columns += [f"coalesce(sum({_value(measure)}), 0) AS {_identifier(measure)}" for measure in measures]
+        columns.append('count(*) AS "count"')
+        where, params = _where({}, by, schema)
+        group = ", ".join(_identifier(column) for column in by)
+        result = snapshot.fetch(f"SELECT {', '.join(columns)} FROM {snapshot.relation}{where} GROUP BY {group} ORDER BY {group}", params)
+        result["count"] = result["count"].astype("int64")
+        cells[name] = snapshot.to_frame(result)
+    return Cube.from_cells(cells, dimensions, groupings)
+
+
+# Статистика индикаторов (stats.CellStats) по файлу набора одним запросом SQL:
+# M2 ячейки - выборочная дисперсия, умноженная на n - 1
+def build_stats(snapshot, dimensions=STATS_DIMENSIONS, measures=STATS_MEASURES):
+    schema = snapshot.schema
+    columns = [f"{_key(column, schema)} AS {_identifier(column)}" for column in dimensions]
+    for measure in measures:
+        value = _value(measure)
+        columns += [
+            f"count({value}) AS {_identifier(f'count({measure})')}",
+            f"coalesce(avg({value}), 0) AS {_identifier(f'mean({measure})')}",
+            f"coalesce(var_samp({value}) * (count({value}) - 1), 0) AS {_identifier(f'm2({measure})')}",
+        ]
+    where, params = _where({}, dimensions, schema)
+    group = ", ".join(_identifier(column) for column in dimensions)
+    cells = snapshot.fetch(f"SELECT {', '.join(columns)} FROM {snapshot.relation}{where} GROUP BY {group}", params)
+    return CellStats.from_cells(cells, dimensions, measures)
+
+
+# Описание столбцов для /api/columns в формате api.describe_columns, одним запросом SQL
+def describe(snapshot):
+    schema = snapshot.schema
+    numbers = [column for column in schema.columns if not isinstance(schema[column].dtype, pd.CategoricalDtype)]
+    bounds = []
+    if numbers:
+        parts = [f"min({_identifier(column)}), max({_identifier(column)})" for column in numbers]
+        bounds = snapshot.cursor().execute(f"SELECT {', '.join(parts)} FROM {snapshot.relation}").fetchone()
+    columns = {}
+    for column in schema.columns:
+        if column in numbers:
+            position = 2 * numbers.index(column)
+            columns[column] = {"type": "number", "min": bounds[position], "max": bounds[position + 1]}
+        else:
+            columns[column] = {"type": "category", "values": schema[column].cat.categories.tolist()}
+    return columns
+
+
+# Запись набора из источников (SLEEP_DATA_SOURCE) в файл path (.parquet или .duckdb).
+# Источники разбираются блоками строк с той же проверкой и приведением типов, что и
+# в хранилище в памяти (ingest.iter_chunks), и дописываются во временную базу DuckDB
+# на диске, поэтому память ограничена размером блока, а не набора. Готовый файл
+# подменяет старый атомарно, работающие процессы переходят на него сами
+def import_sources(sources, path, table=DUCKDB_TABLE):
+    from ingest import download, iter_chunks
+
+    tmp_database = f"{path}.{os.getpid()}.tmp.duckdb"
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    config = {"memory_limit": DUCKDB_MEMORY_LIMIT}
+    connection = duckdb.connect(tmp_database, config=config)
+    rows = 0
+    try:
+        for source in sources:
+            loaded = download(source)
+            try:
+                for chunk in iter_chunks(loaded):
+                    if not rows:
+                        definitions = ", ".join(f"{_identifier(column)} {_sql_type(chunk[column])}" for column in chunk.columns)
+                        connection.execute(f"CREATE TABLE {_identifier(table)} ({definitions})")
+                    connection.register("chunk", chunk)
+                    connection.execute(f"INSERT INTO {_identifier(table)} BY NAME SELECT * FROM chunk")
+                    connection.unregister("chunk")
+                    rows += len(chunk)
+            finally:
+                loaded.close()
+            logger.info("Источник %s записан, всего строк: %d", source, rows)
+        if not rows:
+            raise ValueError("В источниках нет строк данных")
+        if path.endswith(".duckdb"):
+            connection.close()
+            os.replace(tmp_database, path)
+        else:
+            connection.execute(f"COPY {_identifier(table)} TO {_literal(tmp_path)} (FORMAT PARQUET, COMPRESSION ZSTD)")
+            connection.close()
+            os.replace(tmp_path, path)
+    finally:
+        connection.close()
+        for name in [tmp_database, f"{tmp_database}.wal", tmp_path]:
+            if os.path.exists(name):
+                os.remove(name)
+    return rows
+
+
+# Тип столбца таблицы по столбцу приведённого блока. Целые хранятся в BIGINT:
+# в разных блоках pandas может сузить один столбец до разных типов
+def _sql_type(series):
+    if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+        return "VARCHAR"
+    if pd.api.types.is_integer_dtype(series):
+        return "BIGINT"
+    return "DOUBLE"
+
+
+# Сравнение результатов с путём pandas
+def _differences(expected, actual):
+    if list(expected.columns) != list(actual.columns):
+        return f"столбцы {list(expected.columns)} и {list(actual.columns)}"
+    if len(expected) != len(actual):
+        return f"строк {len(expected)} и {len(actual)}"
+    for column in expected.columns:
+        left, right = expected[column], actual[column]
+        if pd.api.types.is_numeric_dtype(left) and pd.api.types.is_numeric_dtype(right):
+            left, right = left.to_numpy(dtype="float64"), right.to_numpy(dtype="float64")
+            if not np.allclose(left, right, rtol=1e-9, atol=1e-9, equal_nan=True):
+                return f"значения {column}"
+        elif left.astype(object).tolist() != right.astype(object).tolist():
+            return f"значения {column}"
+    return None
+
+
+# Случайный запрос к набору: фильтры по значениям и диапазонам, группировка и агрегаты
+def _random_query(df, random):
+    from query import Query
+
+    columns = list(df.columns)
+    categorical = [column for column in columns if isinstance(df[column].dtype, pd.CategoricalDtype)]
+    numeric = [column for column in columns if column not in categorical]
+    filters = {}
+    for column in random.choice(columns, size=random.integers(0, 3), replace=False):
+        values = df[column].dropna().unique()
+        if column in categorical or random.random() < 0.5:
+            filters[column] = {"values": sorted(random.choice(values, size=random.integers(1, min(len(values), 4) + 1), replace=False).tolist())}
+        else:
+            low, high = sorted(random.choice(values, size=2).tolist())
+            filters[column] = {"min": low, "max": high}
+    group_by = random.choice(columns, size=random.integers(0, 3), replace=False).tolist()
+    functions = ["sum", "mean", "min", "max", "median", "p90", "p99.5"]
+    aggregations = {column: sorted(random.choice(functions, size=random.integers(1, 4), replace=False).tolist())
+                    for column in random.choice(numeric, size=random.integers(0, 3), replace=False)}
+    limit = int(random.integers(1, 20)) if random.random() < 0.2 else None
+    return Query(filters, group_by, aggregations, limit)
+
+
+# Проверка совпадения с путём pandas на наборе, который помещается в память:
+# случайные запросы и группировки страниц (SQL и куб по SQL против query.scan),
+# статистика индикаторов и описание столбцов. Выводит расхождения и время запросов
+def _check(queries=200, seed=0):
+    import tempfile
+    from api import describe_columns
+    from config import DATA_SOURCE
+    from ingest import download_all, read_downloads
+    from query import Query, scan
+    from sources import make_sources
+
+    sources = make_sources(DATA_SOURCE)
+    downloads = download_all(sources, [None] * len(sources))
+    try:
+        df = read_downloads(downloads)
+    finally:
+        for loaded in downloads:
+            loaded.close()
+
+    random = np.random.default_rng(seed)
+    checks = [_random_query(df, random) for _ in range(queries)]
+    checks += [Query(filters={"Gender": {"values": ["Male"]}, "BMI Category": {"values": ["Normal Weight", "Obese"]}},
+                     group_by=keys, aggregations={measure: ["mean"] for measure in measures})
+               for keys, measures in GROUPINGS.values()]
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sleep.parquet")
+        import_sources(sources, path)
+        snapshot = Snapshot(path, temp_dir=directory)
+        cube = build_cube(snapshot)
+
+        pandas_seconds = sql_seconds = 0.0
+        for number, query in enumerate(checks):
+            started = time.perf_counter()
+            expected = scan(df, query)
+            if query.limit is not None:
+                expected = expected.iloc[:query.limit]
+            pandas_seconds += time.perf_counter() - started
+            started = time.perf_counter()
+            actual = execute(snapshot, query)[0]
+            sql_seconds += time.perf_counter() - started
+            for plan, result in [("sql", actual), ("cube", execute(snapshot, query, cube)[0])]:
+                difference = _differences(expected, result)
+                if difference:
+                    failures.append(f"запрос {number} ({plan}): {difference}")
+
+        stats, pandas_stats = build_stats(snapshot), CellStats(df)
+        for selection in [{}, {"BMI Category": ["Obese"]}, {"Occupation": ["Doctor", "Nurse"], "BMI Category": ["Overweight"]}]:
+            actual, expected = stats.summary(selection), pandas_stats.summary(selection)
+            for measure in expected:
+                for field, value in expected[measure].items():
+                    other = actual[measure][field]
+                    if (value is None) != (other is None) or (value is not None and not np.isclose(value, other, rtol=1e-9)):
+                        failures.append(f"статистика {measure} {field}")
+
+        if describe(snapshot) != describe_columns(df):
+            failures.append("описание столбцов")
+
+    for failure in failures:
+        print(failure)
+    print(f"строк {len(df)}, запросов {len(checks)}, расхождений с pandas: {len(failures)}")
+    print(f"среднее время запроса: pandas {pandas_seconds * 1000 / len(checks):.2f} мс, SQL {sql_seconds * 1000 / len(checks):.2f} мс")
+    return len(failures)
+
+
+if __name__ == '__main__':
+    # python duckdb_store.py import [файл] - записать набор из SLEEP_DATA_SOURCE
+    # в файл Parquet или базу DuckDB (по умолчанию SLEEP_DUCKDB_PATH);
+    # python duckdb_store.py check [число запросов] - сравнить с путём pandas
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    if command == "import":
+        from config import DATA_SOURCE, DUCKDB_PATH
+        from sources import make_sources
+
+        target = sys.argv[2] if len(sys.argv) > 2 else DUCKDB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        started = time.perf_counter()
+        count = import_sources(make_sources(DATA_SOURCE), target)
+        print(f"записано строк: {count} в {target} за {time.perf_counter() - started:.1f} с")
+    elif command == "check":
+        sys.exit(1 if _check(*(int(arg) for arg in sys.argv[2:3])) else 0)
+    else:
+        sys.exit(f"Неизвестная команда {command}: import или check")
@@ -0,0 +1,193 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from coalesce import check_current, coalesced
+from config import FIGURE_CACHE_PATH, FIGURE_CACHE_SIZE, FIGURE_CACHE_TOUCH_INTERVAL
+from data import get_version, subscribe
+from figure_format import figure_json
+from metrics import current_callback, phase, registry
+
+
+# Кеш сериализованных фигур в SQLite с вытеснением давно не использованных записей (LRU).
+# Файл базы общий, поэтому кеш разделяют все процессы сервера.
+# Закреплённые записи (предрасчёт warmup.py) не вытесняются и не учитываются в лимите.
+# Чтение не открывает транзакцию записи: время обращения обновляется не чаще раза
+# в touch_interval секунд, а счётчики копятся в процессе и записываются вместе с записью
+# в кеш или раз в touch_interval
+class FigureCache:
+    def __init__(self, path, max_entries=FIGURE_CACHE_SIZE, touch_interval=FIGURE_CACHE_TOUCH_INTERVAL):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pending_pid = os.getpid()
+        self._flushed = time.time()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        # Соединение SQLite нельзя использовать в дочернем процессе (фоновые задачи
+        # запускаются копией процесса сервера), там открывается своё
+        if connection is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS figures (key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed REAL NOT NULL, version TEXT, pinned INTEGER NOT NULL DEFAULT 0)")
+            connection.execute("CREATE INDEX IF NOT EXISTS figures_accessed ON figures (accessed)")
+            connection.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    # Ключ: пространство имён, нормализованные фильтры (без повторов, по порядку) и версия данных.
+    # Пустой список и None означают одно и то же - отсутствие фильтра.
+    # params - дополнительные параметры построения (например, видимая область)
+    @staticmethod
+    def make_key(namespace, selections, version, params=None):
+        normalized = {column: sorted(set(values)) for column, values in selections.items() if values}
+        key = [namespace, version, normalized]
+        if params:
+            key.append(params)
+        return json.dumps(key, sort_keys=True, ensure_ascii=False)
+
+    def get(self, key):
+        connection = self._connection()
+        row = connection.execute("SELECT value, accessed FROM figures WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        # Для порядка вытеснения достаточно грубого времени обращения
+        if row is not None and now - row[1] >= self.touch_interval:
+            connection.execute("UPDATE figures SET accessed = ? WHERE key = ?", (now, key))
+        self._count("hits" if row is not None else "misses")
+        if now - self._flushed >= self.touch_interval:
+            with connection:
+                self._flush(connection)
+        return row[0] if row is not None else None
+
+    def set(self, key, value, version=None, pinned=False):
+        self.set_many([(key, value)], version, pinned)
+
+    def set_many(self, items, version=None, pinned=False):
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO figures (key, value, accessed, version, pinned) VALUES (?, ?, ?, ?, ?)",
+                [(key, value, now, version, int(pinned)) for key, value in items],
+            )
+            excess = connection.execute("SELECT COUNT(*) FROM figures WHERE pinned = 0").fetchone()[0] - self.max_entries
+            if excess > 0:
+                connection.execute("DELETE FROM figures WHERE key IN (SELECT key FROM figures WHERE pinned = 0 ORDER BY accessed LIMIT ?)", (excess,))
+                self._increment(connection, "evictions", excess)
+            self._flush(connection)
+
+    # Удаление закреплённых записей, построенных для других версий данных
+    def prune(self, version):
+        connection = self._connection()
+        with connection:
+            return connection.execute("DELETE FROM figures WHERE pinned = 1 AND version IS NOT ?", (version,)).rowcount
+
+    def _increment(self, connection, name, amount=1):
+        connection.execute("INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount))
+
+    # Счётчик в памяти процесса; в дочернем процессе счёт родителя не повторяется
+    def _count(self, name):
+        with self._lock:
+            if self._pending_pid != os.getpid():
+                self._pending, self._pending_pid = {}, os.getpid()
+            self._pending[name] = self._pending.get(name, 0) + 1
+
+    # Запись накопленных счётчиков в базу (внутри транзакции вызывающего)
+    def _flush(self, connection):
+        with self._lock:
+            pending = self._pending if self._pending_pid == os.getpid() else {}
+            self._pending, self._pending_pid = {}, os.getpid()
+            self._flushed = time.time()
+        for name, amount in pending.items():
+            self._increment(connection, name, amount)
+
+    # Статистика попаданий и промахов по всем процессам
+    def stats(self):
+        connection = self._connection()
+        with connection:
+            self._flush(connection)
+        counters = dict(connection.execute("SELECT name, value FROM counters").fetchall())
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "entries": connection.execute("SELECT COUNT(*) FROM figures").fetchone()[0],
+            "pinned": connection.execute("SELECT COUNT(*) FROM figures WHERE pinned = 1").fetchone()[0],
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+    def clear(self):
+        connection = self._connection()
+        with connection:
+            # Накопленные в процессе счётчики тоже сбрасываются
+            self._flush(connection)
+            connection.execute("DELETE FROM figures")
+            connection.execute("DELETE FROM counters")
+
+
+cache = FigureCache(FIGURE_CACHE_PATH)
+# Графики прошлых версий данных перестают запрашиваться: обычные записи вытесняются
+# по LRU, а закреплённые удаляются сразу при смене версии
+subscribe(cache.prune)
+
+
+# График namespace для фильтров selections: при попадании в кеш
+# возвращается сохранённый JSON без обращения к pandas и построения фигуры.
+# params передаются в build именованными аргументами и входят в ключ
+def cached_figure(namespace, selections, build, params=None):
+    version = get_version()
+    key = FigureCache.make_key(namespace, selections, version, params)
+    with phase("cache_get"):
+        value = cache.get(key)
+    registry.increment("sleep_figure_cache_requests_total", {"callback": current_callback(), "result": "miss" if value is None else "hit"})
+    if value is None:
+        # Одинаковые графики, которые сейчас строятся для других запросов, не строятся заново
+        value = coalesced(("figure", key), lambda: _render_and_store(key, version, build, selections, params))
+    with phase("decode"):
+        return json.loads(value)
+
+
+def _render_and_store(key, version, build, selections, params):
+    # Устаревший запрос вкладки останавливается до построения графика
+    check_current()
+    value = render_figure(build, selections, params)
+    with phase("cache_set"):
+        cache.set(key, value, version)
+    return value
+
+
+# Построение и сериализация графика, время этапов учитывается отдельно
+def render_figure(build, selections, params=None):
+    with phase("build"):
+        figure = build(selections, **(params or {}))
+    with phase("serialize"):
+        return figure_json(figure)
+
+
+# Общая для всех процессов статистика кеша для /metrics
+def _cache_metrics():
+    stats = cache.stats()
+    return [
+        ("sleep_figure_cache_entries", {}, stats["entries"]),
+        ("sleep_figure_cache_pinned_entries", {}, stats["pinned"]),
+        ("sleep_figure_cache_hit_ratio", {}, stats["hit_rate"]),
+        ("sleep_figure_cache_evictions", {}, stats["evictions"]),
+    ]
+
+
+registry.add_collector(_cache_metrics)
+
+if __name__ == '__main__':
+    # --clear: очистка кеша, например после изменения функций построения графиков
+    if "--clear" in sys.argv[1:]:
+        cache.clear()
+    print(json.dumps(cache.stats(), indent=2))
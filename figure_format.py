@@ -0,0 +1,91 @@
+import base64
+import json
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.io.json import to_json_plotly
+
+# Элементы стандартного шаблона plotly, которые влияют на графики дашборда.
+# Полный шаблон (~7.5 КБ: цветовые шкалы, 3D сцены, карты, значения по
+# умолчанию для всех типов графиков) встраивается в каждую фигуру и занимал
+# почти весь ответ обратного вызова
+TEMPLATE_LAYOUT_KEYS = ["autotypenumbers", "colorway", "font", "hovermode", "hoverlabel",
+                        "coloraxis", "xaxis", "yaxis", "title"]
+TEMPLATE_TRACE_TYPES = ["bar", "pie", "scatter", "scattergl"]
+
+
+def _compact_template():
+    template = pio.templates["plotly"].to_plotly_json()
+    return go.layout.Template(
+        layout={key: template["layout"][key] for key in TEMPLATE_LAYOUT_KEYS},
+        data={trace_type: template["data"][trace_type] for trace_type in TEMPLATE_TRACE_TYPES},
+    )
+
+
+TEMPLATE = _compact_template()
+# Шаблон в виде словаря для фигур, собранных без plotly.graph_objects (см. figures.py)
+TEMPLATE_JSON = TEMPLATE.to_plotly_json()
+
+# Числовые массивы трасс, которые передаются типизированными массивами
+# (base64 с указанием типа, поддерживается plotly.js начиная с 2.28)
+TYPED_ARRAY_PATHS = [("x",), ("y",), ("values",), ("customdata",), ("marker", "size")]
+
+# Целочисленные типы от самого узкого к самому широкому
+INTEGER_DTYPES = ["i1", "u1", "i2", "u2", "i4", "u4"]
+
+
+# Наиболее узкий тип, в котором значения представимы без потерь; None, если такого нет
+def _narrow_dtype(array):
+    if array.dtype.kind == "f":
+        if not np.isfinite(array).all():
+            return None
+        if not np.array_equal(array, np.round(array)):
+            return "f4" if np.array_equal(array.astype("f4"), array) else "f8"
+    elif array.dtype.kind not in "iu":
+        return None
+    low, high = array.min(), array.max()
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return "f8"
+
+
+# Типизированный массив plotly.js вместо списка чисел, если он получается короче.
+# Короткие числа (например, округлённые до сотых) в тексте JSON компактнее base64
+def typed_array(values):
+    array = np.asarray(values)
+    if array.ndim != 1 or not len(array) or array.dtype.kind not in "iuf":
+        return None
+    dtype = _narrow_dtype(array)
+    if dtype is None:
+        return None
+    data = base64.b64encode(array.astype(f"<{dtype}").tobytes()).decode()
+    if len(data) + 24 >= len(json.dumps(array.tolist())):
+        return None
+    return {"dtype": dtype, "bdata": data}
+
+
+# Замена числовых массивов трасс фигуры (словаря to_plotly_json) на типизированные
+def encode_arrays(figure):
+    for trace in figure.get("data", []):
+        for path in TYPED_ARRAY_PATHS:
+            parent = trace
+            for key in path[:-1]:
+                parent = parent.get(key)
+                if not isinstance(parent, dict):
+                    break
+            else:
+                values = parent.get(path[-1])
+                if isinstance(values, (list, tuple, np.ndarray)):
+                    encoded = typed_array(values)
+                    if encoded is not None:
+                        parent[path[-1]] = encoded
+    return figure
+
+
+# Компактный JSON фигуры (go.Figure или словаря) для ответа обратного вызова
+def figure_json(figure):
+    if not isinstance(figure, dict):
+        figure = figure.to_plotly_json()
+    return to_json_plotly(encode_arrays(figure))
@@ -0,0 +1,206 @@
+import sys
+import numpy as np
+import pandas as pd
+from figure_format import TEMPLATE_JSON
+
+# Построение фигур в формате JSON plotly.js (словари) из предагрегированных массивов NumPy.
+# plotly.graph_objects проверяет каждое свойство при присваивании, включая шаблон,
+# и на построение графика уходило 10-25 мс при агрегации за доли миллисекунды.
+# Здесь трассы собираются из готовых массивов без проверки, значения точек не
+# обходятся в Python, а разбиение на трассы по группам - одна сортировка кодов групп.
+# Свойства задаются в том виде, в каком их выдаёт go.Figure.to_plotly_json()
+
+
+# Фигура с компактным шаблоном оформления; вложенные свойства макета задаются словарями
+def figure(data, **layout):
+    return {"data": data, "layout": {"template": TEMPLATE_JSON, **layout}}
+
+
+# Подпись оси в формате plotly.js
+def axis(title, **props):
+    return {"title": {"text": title}, **props}
+
+
+# Разбиение столбцов по кодам групп: устойчивая сортировка кодов и np.split по границам
+# групп (порядок строк внутри группы сохраняется). Возвращает {код группы: {имя: массив}}
+# для непустых групп в порядке первого появления кода
+def split_groups(codes, **columns):
+    codes = np.asarray(codes)
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    bounds = np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1]) + 1
+    starts = np.concatenate(([0], bounds)) if len(codes) else bounds
+    parts = {name: np.split(np.asarray(values)[order], bounds) for name, values in columns.items()}
+    # Первая строка группы в исходном порядке - первый элемент её части order
+    appearance = np.argsort(order[starts], kind="stable")
+    return {sorted_codes[starts[i]].item(): {name: parts[name][i] for name in columns} for i in appearance}
+
+
+# Коды групп для столбца значений (категориального или обычного) и словарь значение -> код
+def group_codes(values):
+    codes, uniques = pd.factorize(values)
+    return codes, {value: code for code, value in enumerate(uniques)}
+
+
+# Трассы точек по группам (например, по профессиям): groups - список словарей
+# {"code", "name", "color", "legendgroup"} в порядке легенды, группы без точек пропускаются.
+# size - диаметр маркеров, customdata - дополнительное значение точки для подсказки.
+# {name} в hovertemplate заменяется подписью группы (она одна на трассу, а не на точку)
+def bubble_traces(x, y, size, codes, groups, hovertemplate, customdata=None, webgl=False, sizeref=1.0):
+    columns = {"x": x, "y": y, "size": size}
+    if customdata is not None:
+        columns["customdata"] = customdata
+    parts = split_groups(codes, **columns)
+    traces = []
+    for group in groups:
+        part = parts.get(group["code"])
+        if part is None:
+            continue
+        trace = {
+            "type": "scattergl" if webgl else "scatter",
+            "x": part["x"],
+            "y": part["y"],
+            "mode": "markers",
+            "name": group["name"],
+            "legendgroup": group.get("legendgroup", group["name"]),
+            "showlegend": True,
+            "marker": {"color": group["color"], "size": part["size"], "sizemode": "diameter", "sizeref": sizeref},
+            "hovertemplate": hovertemplate.replace("{name}", group["name"]),
+        }
+        if customdata is not None:
+            trace["customdata"] = part["customdata"]
+        traces.append(trace)
+    return traces
+
+
+# Трассы горизонтальной пирамиды (например, половозрастной): значения групп из mirrored
+# откладываются влево (знак меняется сразу для всего массива), трассы - в порядке
+# первого появления группы. groups - {код: {"name", "color"}}, {name} в hovertemplate - подпись группы
+def pyramid_traces(values, levels, codes, groups, mirrored, hovertemplate):
+    values = np.asarray(values)
+    values = np.where(np.isin(codes, list(mirrored)), -values, values)
+    traces = []
+    for code, part in split_groups(codes, x=values, y=levels).items():
+        name = groups[code]["name"]
+        traces.append({
+            "type": "bar",
+            "x": part["x"],
+            "y": part["y"],
+            "orientation": "h",
+            "name": name,
+            "legendgroup": name,
+            "offsetgroup": name,
+            "alignmentgroup": "True",
+            "showlegend": True,
+            "marker": {"color": groups[code]["color"]},
+            "hovertemplate": hovertemplate.replace("{name}", name),
+        })
+    return traces
+
+
+# Линия без легенды
+def line_trace(x, y, color, hovertemplate):
+    return {
+        "type": "scatter",
+        "x": x,
+        "y": y,
+        "mode": "lines",
+        "name": "",
+        "showlegend": False,
+        "line": {"color": color},
+        "hovertemplate": hovertemplate,
+    }
+
+
+# Круговая диаграмма; props - остальные свойства трассы (hole, pull, подписи)
+def pie_trace(labels, values, colors, hovertemplate, **props):
+    return {
+        "type": "pie",
+        "labels": labels,
+        "values": values,
+        "marker": {"colors": list(colors)},
+        "hovertemplate": hovertemplate,
+        **props,
+    }
+
+
+# Цветовая шкала из списка цветов с равными интервалами (как в plotly.colors.make_colorscale)
+def colorscale(colors):
+    colors = list(colors)
+    if len(colors) == 1:
+        colors = colors * 2
+    return [[i / (len(colors) - 1), color] for i, color in enumerate(colors)]
+
+
+# Невидимая трасса, которая рисует только цветовую шкалу (легенду цветов диаграммы)
+def colorbar_trace(colors, cmin, cmax, colorbar):
+    return {
+        "type": "scatter",
+        "x": [None],
+        "y": [None],
+        "mode": "markers",
+        "marker": {"colorscale": colorscale(colors), "showscale": True, "cmin": cmin, "cmax": cmax, "colorbar": colorbar},
+        "hoverinfo": "none",
+        "showlegend": False,
+    }
+
+
+# Индикатор-шкала со значением value (None - шкала без значения)
+def gauge(value, title, bar_color, **layout):
+    trace = {
+        "type": "indicator",
+        "mode": "gauge+number",
+        "title": {"text": title, "font": {"color": "#211B5F"}},
+        "gauge": {"axis": {"range": [0, 10], "tickfont": {"size": 15, "color": "#211B5F"}}, "bar": {"color": bar_color}},
+    }
+    if value is not None:
+        trace["value"] = value
+    return figure([trace], **layout)
+
+
+# Микробенчмарк: время построения и сериализации графика точек в зависимости от числа
+# групп (трасс) при постоянном числе точек, для сравнения - то же через plotly.graph_objects
+def _bench(points=20000, group_counts=(1, 10, 100, 1000), repeats=5):
+    import time
+    import plotly.graph_objects as go
+    from figure_format import figure_json
+
+    rng = np.random.default_rng(0)
+    x = np.round(rng.uniform(5, 9, points), 1)
+    y = rng.integers(3, 9, points).astype("int8")
+    size = rng.uniform(4, 9, points)
+
+    def measure(build):
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            payload = figure_json(build())
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000, len(payload)
+
+    print(f"{points} точек; время построения и сериализации, мс (лучшее из {repeats})")
+    print(f"{'групп':>6} {'figures':>9} {'go':>9} {'на группу':>10} {'ответ, КБ':>10}")
+    for count in group_counts:
+        codes = rng.integers(0, count, points)
+        groups = [{"code": code, "name": f"g{code}", "color": "#826DBA"} for code in range(count)]
+
+        def build_dict():
+            return figure(bubble_traces(x, y, size, codes, groups, "{name}: %{x}, %{y}", webgl=True), height=378)
+
+        def build_go():
+            fig = go.Figure()
+            for code in range(count):
+                mask = codes == code
+                fig.add_trace(go.Scattergl(x=x[mask], y=y[mask], mode="markers", name=f"g{code}",
+                                           marker=dict(color="#826DBA", size=size[mask]), hovertemplate=f"g{code}: %{{x}}, %{{y}}"))
+            fig.update_layout(height=378)
+            return fig
+
+        dict_ms, payload = measure(build_dict)
+        go_ms = measure(build_go)[0] if count <= 100 else float("nan")
+        print(f"{count:>6} {dict_ms:>9.1f} {go_ms:>9.1f} {dict_ms / count:>10.3f} {payload / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    # Микробенчмарк построителя: python figures.py [число точек]
+    _bench(*(int(arg) for arg in sys.argv[1:2]))
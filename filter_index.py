@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+# Измерения, по которым страницы фильтруют данные
+FILTER_COLUMNS = ["Gender", "BMI Category", "Occupation"]
+
+
+# Битовые индексы: для каждого значения измерения хранится булев массив строк,
+# комбинации фильтров вычисляются побитовыми AND/OR без сканирования строк
+class FilterIndex:
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.size = len(df)
+        self.bitmaps = {}
+        for column in columns:
+            if column not in df.columns:
+                continue
+            codes, categories = _codes(df[column])
+            self.bitmaps[column] = {value: codes == i for i, value in enumerate(categories)}
+
+    # Маска строк для словаря {столбец: выбранные значения}; внутри столбца
+    # значения объединяются по OR, между столбцами - по AND.
+    # Пустой выбор означает отсутствие фильтра, тогда возвращается None
+    def mask(self, selections):
+        result = None
+        for column, values in selections.items():
+            if not values:
+                continue
+            bitmaps = self.bitmaps[column]
+            column_mask = np.zeros(self.size, dtype=bool)
+            for value in set(values):
+                bitmap = bitmaps.get(value)
+                if bitmap is not None:
+                    column_mask |= bitmap
+            if result is None:
+                result = column_mask
+            else:
+                result &= column_mask
+        return result
+
+
+def _codes(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, categories = pd.factorize(series)
+    return codes, categories
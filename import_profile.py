@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+from config import BASE_DIR
+
+# Код дочернего процесса: импорт модулей по очереди с выводом пика памяти после каждого.
+# Используется __import__: импорт через importlib.import_module не попадает в отчёт importtime
+CHILD_CODE = """
+import resource, sys
+for name in sys.argv[1:]:
+    __import__(name)
+    print(name, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, flush=True)
+"""
+
+
+# Время импорта модулей в отдельном процессе (python -X importtime): модули
+# импортируются по очереди, поэтому время и память каждого следующего - прирост
+# к предыдущим. Возвращает для каждого модуля (время в секундах, пик памяти в байтах,
+# строки отчёта importtime вида (собственное время, накопленное время, глубина, имя))
+def import_profile(modules):
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_CODE, *modules],
+        cwd=BASE_DIR, capture_output=True, text=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr[-2000:])
+
+    rss = {}
+    for line in process.stdout.splitlines():
+        name, _, value = line.rpartition(" ")
+        if name in modules:
+            # Linux отдаёт килобайты, macOS - байты
+            rss[name] = int(value) * (1 if sys.platform == "darwin" else 1024)
+
+    entries = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((int(own) / 1e6, int(cumulative) / 1e6, depth, name.strip()))
+
+    report = {}
+    for name in modules:
+        # Импорты, выполненные при загрузке модуля name, предшествуют его записи верхнего уровня
+        position = next(i for i, entry in enumerate(entries) if entry[2] == 0 and entry[3] == name)
+        report[name] = (entries[position][1], rss.get(name), entries[:position + 1])
+        entries = entries[position + 1:]
+    return report
+
+
+# Вывод отчёта: время и память на каждом шаге, самые тяжёлые пакеты
+# (по собственному времени всех их модулей) и модули проекта
+def print_import_profile(module, pages=(), top=12):
+    report = import_profile([module, *pages])
+    project = {name[:-3] for name in os.listdir(BASE_DIR) if name.endswith(".py")} | {"pages"}
+    for name, (seconds, rss, entries) in report.items():
+        label = "старт" if name == module else "первый переход"
+        print(f"{name} ({label}): {seconds * 1000:.0f} мс, пик памяти {rss / 2 ** 20:.0f} МБ")
+
+        packages = {}
+        for own, _, _, entry in entries:
+            package = entry.split(".")[0]
+            packages[package] = packages.get(package, 0) + own
+        for package, own in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            marker = " *" if package in project else ""
+            print(f"    {own * 1000:8.1f} мс  {package}{marker}")
+        print()
+    print("* - модули проекта")
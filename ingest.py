@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from config import CSV_CHUNK_ROWS, DOWNLOAD_WORKERS
+from schema import RAW_DTYPES, apply_schema, concat_frames
+
+logger = logging.getLogger(__name__)
+
+# Содержимое источника до этого размера держится в памяти, больше - во временном файле
+SPOOL_SIZE = 8 << 20
+
+
+# Загруженное содержимое одного источника: временный файл и его описание для указателя версии
+class Download:
+    def __init__(self, source, file, validators, sha1, length, complete_lines):
+        self.source = source
+        self.file = file
+        self.validators = validators
+        self.sha1 = sha1
+        self.length = length
+        self.complete_lines = complete_lines
+
+    def meta(self):
+        return {
+            "sha1": self.sha1,
+            "length": self.length,
+            "complete_lines": self.complete_lines,
+            "validators": self.validators,
+        }
+
+    # Хеш первых length байт: совпадает с прошлым, если старое содержимое - префикс нового
+    def prefix_sha1(self, length):
+        digest = hashlib.sha1()
+        self.file.seek(0)
+        remaining = length
+        while remaining > 0:
+            block = self.file.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+        return digest.hexdigest()
+
+    def close(self):
+        self.file.close()
+
+
+# Загрузка источника блоками во временный файл с подсчётом хеша.
+# None, если содержимое не изменилось с прошлого запроса (по validators)
+def download(source, validators=None):
+    result = source.open(validators)
+    if result is None:
+        return None
+    blocks, validators = result
+    file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    digest = hashlib.sha1()
+    length = 0
+    last = b""
+    for block in blocks:
+        if block:
+            digest.update(block)
+            file.write(block)
+            length += len(block)
+            last = block[-1:]
+    file.seek(0)
+    return Download(source, file, validators, digest.hexdigest(), length, last == b"\n")
+
+
+# Параллельная загрузка нескольких источников; validators - список по источникам
+def download_all(sources, validators):
+    with ThreadPoolExecutor(max_workers=min(len(sources), DOWNLOAD_WORKERS)) as pool:
+        return list(pool.map(download, sources, validators))
+
+
+# Разбор загруженного содержимого блоками по CSV_CHUNK_ROWS строк: каждый блок
+# проверяется и сразу приводится к компактным типам, поэтому пик памяти при
+# разборе определяется размером блока, а не файла. offset - разобрать только
+# строки после первых offset байт (дописанные в конец файла)
+def parse_download(download, offset=None):
+    frames = list(iter_chunks(download, offset))
+    if not frames:
+        raise ValueError(f"Источник {download.source}: нет строк данных")
+    return concat_frames(frames)
+
+
+# Приведённые блоки строк загруженного содержимого по одному, без объединения
+# (для записи набора, который не помещается в память, см. duckdb_store.py)
+def iter_chunks(download, offset=None):
+    file = download.file
+    if offset:
+        file = _tail(file, offset)
+    try:
+        for chunk in download.source.read_chunks(file, CSV_CHUNK_ROWS, RAW_DTYPES):
+            yield apply_schema(validate(chunk))
+    except (ValueError, TypeError, pd.errors.ParserError) as error:
+        raise ValueError(f"Источник {download.source}: {error}") from error
+    finally:
+        if file is not download.file:
+            file.close()
+
+
+# Заголовок и строки после offset байт в отдельном временном файле
+def _tail(file, offset):
+    file.seek(0)
+    tail = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    tail.write(file.readline())
+    file.seek(offset)
+    shutil.copyfileobj(file, tail)
+    tail.seek(0)
+    return tail
+
+
+# Проверка блока: все столбцы исходной таблицы на месте, лишние отбрасываются
+def validate(chunk):
+    missing = [column for column in RAW_DTYPES if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"нет столбцов {', '.join(missing)}")
+    return chunk[list(RAW_DTYPES)]
+
+
+# Разбор и объединение нескольких загруженных источников в один набор
+def read_downloads(downloads):
+    with ThreadPoolExecutor(max_workers=min(len(downloads), DOWNLOAD_WORKERS)) as pool:
+        frames = list(pool.map(parse_download, downloads))
+    for download, frame in zip(downloads, frames):
+        logger.info("Источник %s: %d строк", download.source, len(frame))
+    return concat_frames(frames)
+
+
+# Сырые строки источников без приведения типов (для отчёта о памяти и замеров)
+def read_raw(sources):
+    frames = []
+    for download in download_all(sources, [None] * len(sources)):
+        with download.file:
+            frames.append(pd.concat(list(download.source.read_chunks(download.file, CSV_CHUNK_ROWS))))
+    return pd.concat(frames)
@@ -0,0 +1,146 @@
+import bisect
+import contextvars
+import cProfile
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from config import PROFILE_DIR
+
+# Границы корзин гистограмм: время в секундах и размер ответа в байтах
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Имя обратного вызова, внутри которого выполняется текущий код
+_current_callback = contextvars.ContextVar("callback", default="-")
+
+
+# Гистограмма в духе Prometheus: накопительные счётчики по корзинам, сумма и количество
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# Метрики процесса. Каждый процесс сервера отдаёт на /metrics свои значения,
+# суммирование по процессам выполняет Prometheus
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.collectors = []
+
+    def observe(self, name, labels, value, buckets=SECONDS_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    # Функция, возвращающая список (имя, метки, значение) на момент запроса /metrics
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        for (name, labels), histogram in histograms:
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+registry = Registry()
+
+
+# Время этапа внутри текущего обратного вызова
+@contextmanager
+def phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe("sleep_callback_phase_seconds", {"callback": _current_callback.get(), "phase": name},
+                         time.perf_counter() - started)
+
+
+# Декоратор обратного вызова: полное время и имя для вложенных этапов
+def instrument(name):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            token = _current_callback.set(name)
+            try:
+                with phase("total"):
+                    return function(*args, **kwargs)
+            finally:
+                _current_callback.reset(token)
+        return wrapper
+    return decorator
+
+
+def current_callback():
+    return _current_callback.get()
+
+
+# Подключение к Flask серверу: маршрут /metrics, размер ответов обратных вызовов
+# и профилирование отдельных запросов (заголовок X-Profile или параметр ?profile=1
+# при заданном SLEEP_PROFILE_DIR)
+def init_app(server):
+    from flask import Response, g, request
+
+    @server.route("/metrics")
+    def metrics_endpoint():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    @server.before_request
+    def start_profile():
+        if PROFILE_DIR and (request.headers.get("X-Profile") or request.args.get("profile")):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @server.after_request
+    def record_response(response):
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            name = request.path.strip("/").replace("/", "_") or "index"
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{name}.prof"))
+        if request.path.endswith("_dash-update-component"):
+            body = request.get_json(silent=True) or {}
+            output = body.get("output", "-")
+            registry.observe("sleep_callback_response_bytes", {"output": output}, response.calculate_content_length() or 0, BYTES_BUCKETS)
+        return response
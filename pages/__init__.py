@@ -0,0 +1,81 @@
+import importlib
+from dash import callback, clientside_callback, dcc, ClientsideFunction, Output, State
+from dash.exceptions import PreventUpdate
+from coalesce import filter_request
+from config import FILTER_DEBOUNCE_MS
+
+# Страницы приложения: путь -> модуль с макетом. Модуль страницы вместе с
+# построением графиков и набором данных импортируется при первом переходе
+# на неё, поэтому процесс, обслуживший только главную страницу, не загружает
+# pandas и данные
+PAGES = {
+    "/": "pages.main",
+    "/page-1": "pages.first",
+    "/page-2": "pages.second",
+}
+
+# Модули с объявлениями обратных вызовов страниц (входы и выходы без реализации)
+CALLBACK_MODULES = ["pages.first_callbacks", "pages.second_callbacks"]
+
+
+# Регистрация обратных вызовов всех страниц в Dash (dash.callback): модули
+# объявлений регистрируют их при импорте
+def register_callbacks():
+    for module in CALLBACK_MODULES:
+        importlib.import_module(module)
+
+
+# Модуль страницы по пути; None, если такой страницы нет
+def load_page(pathname):
+    module = PAGES.get(pathname)
+    if module is None:
+        return None
+    return importlib.import_module(module)
+
+
+# Идентификатор контейнера страницы в макете приложения (page-main, page-first, ...):
+# страница остаётся в документе после ухода с неё, а при возврате только показывается
+def page_container_id(pathname):
+    return "page-" + PAGES[pathname].rsplit(".", 1)[-1]
+
+
+# Регистрация обратного вызова, реализация которого (функция name модуля module)
+# импортируется при первом вызове. Входы и выходы объявляются при старте:
+# браузер получает граф обратных вызовов один раз, при загрузке приложения.
+# filters=True: первый вход - хранилище фильтров (filter_store), функция получает
+# значения фильтров отдельными аргументами, а устаревшие запросы вкладки отбрасываются.
+# У фоновых обратных вызовов с progress первым аргументом функции идёт set_progress
+def lazy_callback(module, name, *dependencies, filters=False, **kwargs):
+    progress = 1 if kwargs.get("progress") is not None else 0
+
+    def proxy(*values):
+        function = getattr(importlib.import_module(module), name)
+        if not filters:
+            return function(*values)
+        head, state, values = values[:progress], values[progress], values[progress + 1:]
+        if not state or state.get("values") is None:
+            raise PreventUpdate
+        with filter_request(state.get("session"), f"{module}.{name}", state.get("seq")):
+            return function(*head, *state["values"], *values)
+
+    # Имя реализации, а не обёртки: по нему различаются ключи результатов фоновых задач
+    proxy.__module__, proxy.__name__ = module, name
+    return callback(*dependencies, **kwargs)(proxy)
+
+
+# Хранилище фильтров страницы: значения элементов управления попадают в него
+# с задержкой (debounce_filters), серверные графики обновляются по нему
+def filter_store(store_id):
+    return dcc.Store(id=store_id, data={"store": store_id, "delay": FILTER_DEBOUNCE_MS})
+
+
+# Перенос значений фильтров inputs в хранилище store_id в браузере: серия изменений
+# быстрее задержки даёт одно обновление. Каждое обновление получает идентификатор
+# вкладки и порядковый номер, по которым сервер узнаёт устаревшие запросы
+def debounce_filters(store_id, inputs):
+    clientside_callback(
+        ClientsideFunction(namespace="sleep", function_name="debounce_filters"),
+        Output(store_id, "data"),
+        inputs,
+        State(store_id, "data")
+    )
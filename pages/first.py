@@ -1,8 +1,30 @@
-from dash import Dash, html, dcc, callback, Output, Input
-import plotly.express as px
+from dash import html, dcc, ctx
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-from data import df
-import plotly.graph_objects as go
+from binning import bin_points, changes_viewport, clip_points, viewport_from_relayout
+from clientside import store_payload
+from config import CLIENTSIDE_MODE, SCATTER_BIN_POINTS, SCATTER_BINS, SCATTER_WEBGL_POINTS
+from data import aggregate
+from figure_cache import cached_figure
+from figures import axis, bubble_traces, colorbar_trace, figure, group_codes, line_trace, pie_trace
+from metrics import instrument
+from pages import filter_store
+from plotly.colors import sequential
+
+# Варианты фильтров страницы
+GENDER_OPTIONS = [
+    {"label": "М", "value": "Male"},
+    {"label": "Ж", "value": "Female"},
+]
+
+BMI_OPTIONS = [
+    {"label": "Нормальный вес", "value": "Normal Weight"},
+    {"label": "Избыточный вес", "value": "Obese"},
+    {"label": "Ожирение", "value": "Overweight"}
+]
+
+# Столбцы набора данных, по которым фильтруют элементы управления
+FILTERS = {"Gender": GENDER_OPTIONS, "BMI Category": BMI_OPTIONS}
 
 # Определение макета дашборда
 layout = dbc.Container([
@@ -21,10 +43,7 @@ layout = dbc.Container([
         dbc.Col([
             dbc.Label("Пол:"),
             dbc.Checklist(
-                options=[
-                {"label": "М", "value": "Male"},
-                {"label": "Ж", "value": "Female"},
-            ],
+                options=GENDER_OPTIONS,
             value=[],
             id="gender-checklist",
             inline=True,
@@ -37,11 +56,7 @@ layout = dbc.Container([
             dbc.Label("Индекс массы тела:"),
             dcc.Dropdown(
                 id="bmi-dropdown",
-                options=[
-                    {"label": "Нормальный вес", "value": "Normal Weight"},
-                    {"label": "Избыточный вес", "value": "Obese"},
-                    {"label": "Ожирение", "value": "Overweight"}
-                ],
+                options=BMI_OPTIONS,
                 multi=True,
             style={"color": "#211B5F", "background-color": "#E3E1F4", "border-radius": "13px"}
             ), 
@@ -76,140 +91,214 @@ layout = dbc.Container([
     ])
 ])
 
-# Функция обратного вызова для обновления графиков
-@callback(
-    [Output("scatter-plot", "figure"),
-     Output("pie-chart", "figure"),
-     Output("line-chart", "figure")],
-    [Input("gender-checklist", "value"),
-     Input("bmi-dropdown", "value")]
-)
-def update_graphs(selected_genders, selected_bmis):
-    # Фильтрация данных на основе выбранных значений
-    filtered_df = df.copy()
-    
-    if selected_genders:
-        filtered_df = filtered_df[filtered_df['Gender'].isin(selected_genders)]
-    
-    if selected_bmis:
-        filtered_df = filtered_df[filtered_df['BMI Category'].isin(selected_bmis)]
-    
-    # Создание графика рассеяния
-    profession_translation = {
-        "Teacher": "Учитель",
-        "Engineer": "Инженер",
-        "Lawyer": "Адвокат",
-        "Nurse": "Медсестра",
-        "Doctor": "Врач",
-        "Manager": "Менеджер",
-        "Salesperson": "Продавец",
-        "Accountant": "Бухгалтер",
-        "Sales Representative": "Торговый представитель",
-        "Software Engineer": "Программист",
-        "Scientist": "Учёный"
-    }
-
-    color_palette = [
-        '#AA2E62', '#F4A76F', '#FFF3C9', '#3B2FAD', '#C1BAFA',
-        '#C699C3', '#F4776F', '#250F37', '#F4D66F', '#B96FF4', '#9B9FFF'
-    ]
+# Перевод названий профессий для подписей
+PROFESSION_TRANSLATION = {
+    "Teacher": "Учитель",
+    "Engineer": "Инженер",
+    "Lawyer": "Адвокат",
+    "Nurse": "Медсестра",
+    "Doctor": "Врач",
+    "Manager": "Менеджер",
+    "Salesperson": "Продавец",
+    "Accountant": "Бухгалтер",
+    "Sales Representative": "Торговый представитель",
+    "Software Engineer": "Программист",
+    "Scientist": "Учёный"
+}
+
+# Цвета профессий на графике рассеяния
+COLOR_PALETTE = [
+    '#AA2E62', '#F4A76F', '#FFF3C9', '#3B2FAD', '#C1BAFA',
+    '#C699C3', '#F4776F', '#250F37', '#F4D66F', '#B96FF4', '#9B9FFF'
+]
 
-    color_map = {profession: color for profession, color in zip(filtered_df['Occupation'].unique(), color_palette)}
-
-    grouped_df = filtered_df.groupby(['Occupation', 'Sleep Duration', 'Stress Level'])['Quality of Sleep'].mean().reset_index().round(2)
-    grouped_df['Occupation'] = grouped_df['Occupation'].map(profession_translation)
-    
-    scatter_fig = px.scatter(
-        filtered_df.groupby(['Occupation', 'Sleep Duration', 'Stress Level'])['Quality of Sleep'].mean().reset_index().round(2),
-        x="Sleep Duration", 
-        y="Stress Level", 
-        color="Occupation", 
-        size="Quality of Sleep",
-        color_discrete_map=color_map,
-        labels={"Sleep Duration": "Продолжительность сна", "Stress Level": "Уровень стресса", "Occupation": "Профессия", "Quality of Sleep": "Качество сна"},
-        category_orders={"Occupation": list(profession_translation.keys())}
-    ).update_traces(marker=dict(sizeref=0.30, sizemode='diameter'))
-
-    scatter_fig.for_each_trace(lambda t: t.update(name=profession_translation[t.name]))
-
-    scatter_fig.update_traces(
-    hovertemplate="<br>".join([
-        "Профессия: %{customdata[0]}",
+
+# Создание графика рассеяния. Когда точек больше SCATTER_BIN_POINTS, график
+# строится по видимой области viewport (см. binning.viewport_from_relayout):
+# невидимые точки отбрасываются, а если видимых всё ещё слишком много,
+# они объединяются в ячейки сетки. Так размер ответа ограничен при любом числе строк
+def build_scatter(selections, viewport=None):
+    points = aggregate('scatter', selections)
+    adaptive = len(points) > SCATTER_BIN_POINTS
+    binned = False
+    if adaptive:
+        points = clip_points(points, 'Sleep Duration', 'Stress Level', viewport)
+        if len(points) > SCATTER_BIN_POINTS:
+            points = bin_points(points, 'Sleep Duration', 'Stress Level', 'Occupation', ['Quality of Sleep'], SCATTER_BINS, viewport)
+            binned = True
+    scatter_df = points.round(2)
+
+    hover_lines = [
         "Продолжительность сна: %{x}",
         "Уровень стресса: %{y}",
         "Качество сна: %{marker.size:.2f}"
-    ])
+    ]
+    if binned:
+        hover_lines.append("Записей: %{customdata}")
+
+    # Трасса на профессию; цвет закреплён за профессией и не меняется при смене фильтров
+    codes, code_of = group_codes(scatter_df['Occupation'])
+    groups = [{"code": code_of[profession], "name": name, "color": color, "legendgroup": profession}
+              for (profession, name), color in zip(PROFESSION_TRANSLATION.items(), COLOR_PALETTE) if profession in code_of]
+    traces = bubble_traces(
+        scatter_df['Sleep Duration'].to_numpy(),
+        scatter_df['Stress Level'].to_numpy(),
+        scatter_df['Quality of Sleep'].to_numpy(),
+        codes,
+        groups,
+        # Профессия одна на трассу, поэтому она в шаблоне подсказки, а не в данных каждой точки
+        "<br>".join(["Профессия: {name}"] + hover_lines) + "<extra></extra>",
+        customdata=scatter_df['count'].to_numpy() if binned else None,
+        # Много точек: WebGL вместо SVG
+        webgl=len(scatter_df) > SCATTER_WEBGL_POINTS,
+        sizeref=0.30,
+    )
+
+    x_range, y_range = viewport or (None, None)
+    layout = dict(
+        xaxis=axis("Продолжительность сна"),
+        yaxis=axis("Уровень стресса"),
+        legend=dict(title=dict(text="Профессия"), tracegroupgap=0, itemsizing='constant'),
+        margin=dict(t=60),
+        plot_bgcolor='#E3E1F4',
+        paper_bgcolor='#E3E1F4',
+        height=378
     )
+    if adaptive:
+        # Масштаб пользователя сохраняется при обновлении, а график
+        # показывает ровно ту область, для которой построен
+        layout["uirevision"] = 'scatter'
+        if x_range:
+            layout["xaxis"]["range"] = list(x_range)
+        if y_range:
+            layout["yaxis"]["range"] = list(y_range)
+
+    return figure(traces, **layout)
+
+
+# Перестраивается ли график рассеяния при изменении видимой области
+def scatter_is_adaptive(selections):
+    return len(aggregate('scatter', selections)) > SCATTER_BIN_POINTS
+
+
+# Параметры построения графика рассеяния (входят в ключ кеша): у адаптивного графика -
+# видимая область из relayoutData (без него - весь диапазон, как при открытии страницы)
+def scatter_params(selections, relayout_data=None):
+    if not scatter_is_adaptive(selections):
+        return None
+    return {"viewport": viewport_from_relayout(relayout_data)}
+
 
-    scatter_fig.update_traces(customdata=grouped_df[['Occupation']])
-
-    scatter_fig.update_layout(plot_bgcolor='#E3E1F4', paper_bgcolor='#E3E1F4', height=378)
-
-    # Создание круговой диаграммы
-    pie_data = filtered_df.groupby('Quality of Sleep')['Daily Steps'].mean().reset_index().sort_values('Quality of Sleep')
-
-    colors = px.colors.sequential.Purp[:len(pie_data)]
-
-    pie_fig = go.Figure(data=[go.Pie(
-        labels=pie_data['Quality of Sleep'],
-        values=pie_data['Daily Steps'],
-        hole=.3,
-        marker=dict(colors=colors),
-        texttemplate="%{value:.0f}",
-        textposition="inside",
-        hovertemplate="<b>%{label}</b><br>Шаги: %{value:.0f}<extra></extra>",
-        pull=[0.05] * len(pie_data),
-    )])
-
-    pie_fig.add_trace(go.Scatter(
-        x=[None],
-        y=[None],
-        mode='markers',
-        marker=dict(
-            colorscale=colors,
-            showscale=True,
-            cmin=pie_data['Quality of Sleep'].min(),
-            cmax=pie_data['Quality of Sleep'].max(),
-            colorbar=dict( 
-                titleside='top',
+# Создание круговой диаграммы
+def build_pie(selections):
+    pie_data = aggregate('steps_by_quality', selections).sort_values('Quality of Sleep')
+    quality = pie_data['Quality of Sleep'].to_numpy()
+
+    colors = sequential.Purp[:len(pie_data)]
+
+    return figure(
+        [
+            pie_trace(
+                quality,
+                pie_data['Daily Steps'].to_numpy(),
+                colors,
+                "<b>%{label}</b><br>Шаги: %{value:.0f}<extra></extra>",
+                hole=.3,
+                texttemplate="%{value:.0f}",
+                textposition="inside",
+                pull=[0.05] * len(pie_data),
+            ),
+            colorbar_trace(colors, quality.min(), quality.max(), dict(
+                title=dict(side='top'),
                 thickness=30,
                 len=1,
-                x=1.1 
-            )
-        ),
-        hoverinfo='none',
-        showlegend=False
-    ))
-    
-    pie_fig.update_layout(
-    showlegend=False,
-    plot_bgcolor='#E3E1F4',
-    paper_bgcolor='#E3E1F4',
-    height=378,
-    margin=dict(r=120, l=50),
-    annotations=[dict(
-        x=1.36,
-        y=1.1,
-        xref='paper',
-        yref='paper',
-        text='Качество сна',
-        showarrow=False
-    )]
+                x=1.1
+            )),
+        ],
+        showlegend=False,
+        plot_bgcolor='#E3E1F4',
+        paper_bgcolor='#E3E1F4',
+        height=378,
+        margin=dict(r=120, l=50),
+        annotations=[dict(
+            x=1.36,
+            y=1.1,
+            xref='paper',
+            yref='paper',
+            text='Качество сна',
+            showarrow=False
+        )],
+        xaxis=dict(showgrid=False, zeroline=False, visible=False),
+        yaxis=dict(showgrid=False, zeroline=False, visible=False),
     )
 
-    pie_fig.update_xaxes(showgrid=False, zeroline=False, visible=False)
-    pie_fig.update_yaxes(showgrid=False, zeroline=False, visible=False)
-    
-    # Создание линейного графика
-    line_fig = px.line(
-        filtered_df.groupby('Sleep Duration')['Quality of Sleep'].mean().reset_index(), 
-        x='Sleep Duration', 
-        y='Quality of Sleep',
-        labels={"Sleep Duration": "Продолжительность сна", "Quality of Sleep": "Качество сна"}
+
+# Создание линейного графика
+def build_line(selections):
+    line_data = aggregate('quality_by_duration', selections)
+
+    return figure(
+        [line_trace(
+            line_data['Sleep Duration'].to_numpy(),
+            line_data['Quality of Sleep'].to_numpy(),
+            '#826DBA',
+            "Продолжительность сна=%{x}<br>Качество сна=%{y}<extra></extra>"
+        )],
+        xaxis=axis("Продолжительность сна"),
+        yaxis=axis("Качество сна"),
+        margin=dict(t=60),
+        plot_bgcolor='#E3E1F4',
+        paper_bgcolor='#E3E1F4',
+        height=335
     )
 
-    line_fig.update_traces(line_color='#826DBA')
-    
-    line_fig.update_layout(plot_bgcolor='#E3E1F4', paper_bgcolor='#E3E1F4', height=335)
 
-    return scatter_fig, pie_fig, line_fig
\ No newline at end of file
+# Графики страницы: идентификатор компонента -> функция построения
+FIGURES = {"scatter-plot": build_scatter, "pie-chart": build_pie, "line-chart": build_line}
+
+# Параметры построения графиков, которые зависят от фильтров (для предрасчёта warmup.py)
+FIGURE_PARAMS = {"scatter-plot": scatter_params}
+
+
+def _selections(selected_genders, selected_bmis):
+    return {'Gender': selected_genders, 'BMI Category': selected_bmis}
+
+
+if CLIENTSIDE_MODE:
+    # Клиентский режим: куб передаётся в браузер один раз, графики
+    # пересчитываются функциями assets/clientside.js без обращений к серверу
+    layout.children.append(dcc.Store(id="first-cube"))
+else:
+    # Серверный режим: значения фильтров приходят на сервер через хранилище с задержкой
+    layout.children.append(filter_store("first-filters"))
+
+
+# Функции обратного вызова (входы и выходы объявлены в pages/first_callbacks.py)
+@instrument('first/load_cube')
+def load_cube(_):
+    return store_payload(["scatter", "steps_by_quality", "quality_by_duration"], {
+        "professions": list(PROFESSION_TRANSLATION),
+        "profession_translation": PROFESSION_TRANSLATION,
+        "profession_colors": dict(zip(PROFESSION_TRANSLATION, COLOR_PALETTE)),
+        "scatter_webgl_points": SCATTER_WEBGL_POINTS,
+    })
+
+
+@instrument('first/update_scatter')
+def update_scatter(selected_genders, selected_bmis, relayout_data=None):
+    selections = _selections(selected_genders, selected_bmis)
+    params = scatter_params(selections, relayout_data)
+    if relayout_data is not None and ctx.triggered_id == "scatter-plot" and not (params is not None and changes_viewport(relayout_data)):
+        # Масштабирование небольшого графика выполняется в браузере
+        raise PreventUpdate
+    return cached_figure('first/scatter-plot', selections, build_scatter, params)
+
+
+@instrument('first/update_pie')
+def update_pie(selected_genders, selected_bmis):
+    return cached_figure('first/pie-chart', _selections(selected_genders, selected_bmis), build_pie)
+
+
+@instrument('first/update_line')
+def update_line(selected_genders, selected_bmis):
+    return cached_figure('first/line-chart', _selections(selected_genders, selected_bmis), build_line)
@@ -0,0 +1,46 @@
+from dash import clientside_callback, ClientsideFunction, Output, Input
+from config import CLIENTSIDE_MODE
+from pages import debounce_filters, lazy_callback
+
+# Обратные вызовы страницы "Образ жизни". Реализация в pages/first.py
+# импортируется при первом вызове, а не при старте приложения
+
+if CLIENTSIDE_MODE:
+    # Клиентский режим: куб передаётся в браузер один раз, графики
+    # пересчитываются функциями assets/clientside.js без обращений к серверу
+    lazy_callback(
+        "pages.first", "load_cube",
+        Output("first-cube", "data"),
+        Input("first-cube", "id")
+    )
+
+    for figure_id, function_name in [("scatter-plot", "first_scatter"), ("pie-chart", "first_pie"), ("line-chart", "first_line")]:
+        clientside_callback(
+            ClientsideFunction(namespace="sleep", function_name=function_name),
+            Output(figure_id, "figure"),
+            [Input("gender-checklist", "value"),
+             Input("bmi-dropdown", "value"),
+             Input("first-cube", "data")]
+        )
+else:
+    # Каждый график обновляется отдельным запросом, поэтому графики строятся
+    # параллельно на разных процессах сервера, а готовые графики для набора
+    # фильтров берутся из кеша. Фильтры доходят до графиков через хранилище
+    # first-filters с задержкой, поэтому быстрая серия изменений даёт один запрос
+    debounce_filters("first-filters", [Input("gender-checklist", "value"), Input("bmi-dropdown", "value")])
+
+    lazy_callback(
+        "pages.first", "update_scatter",
+        Output("scatter-plot", "figure"),
+        [Input("first-filters", "data"),
+         Input("scatter-plot", "relayoutData")],
+        filters=True
+    )
+
+    for figure_id, function_name in [("pie-chart", "update_pie"), ("line-chart", "update_line")]:
+        lazy_callback(
+            "pages.first", function_name,
+            Output(figure_id, "figure"),
+            Input("first-filters", "data"),
+            filters=True
+        )
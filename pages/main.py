@@ -1,5 +1,6 @@
 from dash import html
 import dash_bootstrap_components as dbc
+from static_assets import image
 
 layout = dbc.Container([
    html.H1("Дашборд «Анализ зависимостей показателей сна от здоровья и образа жизни человека»", 
@@ -18,7 +19,8 @@ layout = dbc.Container([
         ], width=6),
 
         dbc.Col([
-            html.Img(src="/assets/night2.png", style={"max-width": "150%", "height": "auto","margin-top": "0.3rem","margin-left": "9rem"})
+            # Колонка в четверть ширины, изображение до полутора её ширин
+            image("night2.png", sizes="40vw", style={"max-width": "150%", "height": "auto","margin-top": "0.3rem","margin-left": "9rem"})
         ], width=3)
     ]),
     
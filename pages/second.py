@@ -1,8 +1,55 @@
-from dash import Dash, html, dcc, callback, Output, Input
-import plotly.express as px
+from dash import html, dcc, Patch
 import dash_bootstrap_components as dbc
-from data import df
-import plotly.graph_objects as go
+from background import manager as background_manager
+from clientside import store_payload
+from config import CLIENTSIDE_MODE
+from data import aggregate, indicator_stats
+from figure_cache import cached_figure
+from figures import axis, figure, gauge, group_codes, line_trace, pie_trace, pyramid_traces
+from metrics import instrument
+from pages import filter_store
+from pages.second_callbacks import PROGRESS_HIDDEN
+from plotly.colors import sequential
+
+# Варианты фильтров страницы
+BMI_OPTIONS = [
+    {"label": "Нормальный вес", "value": "Normal Weight"},
+    {"label": "Избыточный вес", "value": "Obese"},
+    {"label": "Ожирение", "value": "Overweight"}
+]
+
+PROFESSION_OPTIONS = [
+    {"label": "Бухгалтер", "value": "Accountant"},
+    {"label": "Врач", "value": "Doctor"},
+    {"label": "Инженер", "value": "Engineer"},
+    {"label": "Адвокат", "value": "Lawyer"},
+    {"label": "Менеджер", "value": "Manager"},
+    {"label": "Медсестра", "value": "Nurse"},
+    {"label": "Торговый представитель", "value": "Sales Representative"},
+    {"label": "Продавец", "value": "Salesperson"},
+    {"label": "Учёный", "value": "Scientist"},
+    {"label": "Программист", "value": "Software Engineer"},
+    {"label": "Учитель", "value": "Teacher"},
+]
+
+# Столбцы набора данных, по которым фильтруют элементы управления
+FILTERS = {"BMI Category": BMI_OPTIONS, "Occupation": PROFESSION_OPTIONS}
+
+# Цвета полос на шкалах индикаторов: разброс значений и доверительный интервал среднего
+INDICATOR_BAND_COLORS = ["#D8D3F2", "#8F85D6"]
+
+# Создание индикатора уровня стресса
+def build_stress_indicator(value=None):
+    return gauge(value, "Уровень стресса", "#F4D66F", plot_bgcolor='#E3E1F4', paper_bgcolor='#ADA6E4', height=378, margin=dict(t=0, b=0, l=17, r=27))
+
+
+# Создание индикатора качества сна
+def build_sleep_quality_indicator(value=None):
+    return gauge(value, "Качество сна", "#211B5F", plot_bgcolor='#E3E1F4', paper_bgcolor='#ADA6E4', height=378, margin=dict(t=0, b=0, l=17, r=27))
+
+
+# Полоса хода построения графиков (только в фоновом режиме, см. background.py)
+PROGRESS = [dbc.Progress(id="second-progress", value=0, striped=True, animated=True, color="warning", style=PROGRESS_HIDDEN)] if background_manager is not None else []
 
 # Определение макета дашборда
 layout = dbc.Container([
@@ -22,11 +69,7 @@ layout = dbc.Container([
             dbc.Label("Индекс массы тела:"),
             dcc.Dropdown(
                 id="bmi-dropdown_2",
-                options=[
-                    {"label": "Нормальный вес", "value": "Normal Weight"},
-                    {"label": "Избыточный вес", "value": "Obese"},
-                    {"label": "Ожирение", "value": "Overweight"}
-                ],
+                options=BMI_OPTIONS,
                 multi=True,
                 style={"color": "#211B5F", "background-color": "#E3E1F4", "border-radius": "13px"}
             ), 
@@ -37,19 +80,7 @@ layout = dbc.Container([
             dbc.Label("Профессия:"),
             dcc.Dropdown(
                 id="profession-dropdown",
-                options=[
-                    {"label": "Бухгалтер", "value": "Accountant"},
-                    {"label": "Врач", "value": "Doctor"},
-                    {"label": "Инженер", "value": "Engineer"},
-                    {"label": "Адвокат", "value": "Lawyer"},
-                    {"label": "Менеджер", "value": "Manager"},
-                    {"label": "Медсестра", "value": "Nurse"},
-                    {"label": "Торговый представитель", "value": "Sales Representative"},
-                    {"label": "Продавец", "value": "Salesperson"},
-                    {"label": "Учёный", "value": "Scientist"},
-                    {"label": "Программист", "value": "Software Engineer"},
-                    {"label": "Учитель", "value": "Teacher"},
-                ],
+                options=PROFESSION_OPTIONS,
                 multi=True,
                 style={"color": "#211B5F", "background-color": "#E3E1F4", "border-radius": "13px"}
             ), 
@@ -57,6 +88,7 @@ layout = dbc.Container([
     ]),
 
     html.Br(),
+    *PROGRESS,
 
     # Графики в первом ряду
     dbc.Row ([
@@ -68,12 +100,12 @@ layout = dbc.Container([
 
         # Индикатор уровня стресса
         dbc.Col([
-            dcc.Graph(id='stress-indicator', style={'border-radius': '50px', 'overflow': 'hidden'})
+            dcc.Graph(id='stress-indicator', figure=build_stress_indicator(), style={'border-radius': '50px', 'overflow': 'hidden'})
         ],width=3),
 
         # Индикатор качества сна
         dbc.Col([
-            dcc.Graph(id='sleep-quality-indicator', style={'border-radius': '50px', 'overflow': 'hidden'})
+            dcc.Graph(id='sleep-quality-indicator', figure=build_sleep_quality_indicator(), style={'border-radius': '50px', 'overflow': 'hidden'})
         ],width=3)
     ]),
 
@@ -95,80 +127,142 @@ layout = dbc.Container([
     ])
 ])
 
-# Функция обратного вызова для обновления графиков
-@callback(
-    [Output('line-chart_2', 'figure'),
-     Output('pie-chart_2', 'figure'),
-     Output('stress-indicator', 'figure'),
-     Output('sleep-quality-indicator', 'figure'),
-     Output('age-gender-chart', 'figure')],
-    [Input('bmi-dropdown_2', 'value'),
-     Input('profession-dropdown', 'value')]
-)
-def update_graphs(bmi_categories, occupations):
-    # Фильтрация данных на основе выбранных значений
-    filtered_df = df.copy()
-    
-    if bmi_categories:
-        filtered_df = filtered_df[filtered_df['BMI Category'].isin(bmi_categories)]
-    
-    if occupations:
-        filtered_df = filtered_df[filtered_df['Occupation'].isin(occupations)]
-    
-    # Создание линейного графика
-    line_fig = px.line(filtered_df.groupby('Blood Pressure')['Sleep Duration'].mean().reset_index(), 
-                       x='Blood Pressure', y='Sleep Duration',
-                       labels={"Blood Pressure": "Давление", "Sleep Duration": "Продолжительность сна"})
-    line_fig.update_traces(line_color='#826DBA')
-    line_fig.update_layout(plot_bgcolor='#E3E1F4', paper_bgcolor='#E3E1F4', height=335)
-    
-    # Создание круговой диаграммы
-    sleep_disorder_translation = {
-        "Insomnia": "Бессонница",
-        "Sleep Apnea": "Апноэ",
-        "No": "Отсутствует"
-    }
-
-    pie_data = filtered_df['Sleep Disorder'].value_counts().reset_index()
-    pie_data['Sleep Disorder'] = pie_data['Sleep Disorder'].map(sleep_disorder_translation)
-    pie_fig = go.Figure(data=[go.Pie(
-        labels=pie_data['Sleep Disorder'],
-        values=pie_data['count'],
-        marker=dict(colors=px.colors.sequential.YlOrBr[:len(pie_data)]),
-        texttemplate="%{percent:.1%}",
-        textposition="inside",
-        hovertemplate="<b>%{label}</b><br>Количество: %{value}<extra></extra>",
-    )])
-    pie_fig.update_layout(plot_bgcolor='#E3E1F4', paper_bgcolor='#E3E1F4', height=335, margin=dict(t=10, b=0, l=20, r=15), legend_title_text="Нарушения сна", legend=dict(y=0.5))
-    
-    # Создание индикатора уровня стресса
-    stress_fig = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=filtered_df['Stress Level'].mean(),
-        title={'text': "Уровень стресса", "font": {"color": "#211B5F"}},
-         gauge={'axis': {'range': [0, 10], 'tickfont': {"size": 15, "color": "#211B5F"}}, 'bar': {'color': "#F4D66F"}}
-    ))
-    stress_fig.update_layout(plot_bgcolor='#E3E1F4', paper_bgcolor='#ADA6E4', height=378, margin=dict(t=0, b=0, l=17, r=27))
-    
-    # Создание индикатора качества сна
-    sleep_quality_fig = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=filtered_df['Quality of Sleep'].mean(),
-        title={'text': "Качество сна", "font": {"color": "#211B5F"}},
-        gauge={'axis': {'range': [0, 10], 'tickfont': {"size": 15, "color": "#211B5F"}}, 'bar': {'color': "#211B5F"}}
-    ))
-    sleep_quality_fig.update_layout(plot_bgcolor='#E3E1F4', paper_bgcolor='#ADA6E4', height=378, margin=dict(t=0, b=0, l=17, r=27))
-    
-    # Создание графика качества сна по полу и возрасту
-    age_gender_df = filtered_df.groupby(['Age', 'Gender'])['Quality of Sleep'].mean().reset_index()
-    age_gender_df['Gender'] = age_gender_df['Gender'].map({"Male": "Мужчины", "Female": "Женщины"})
-    age_gender_fig = px.bar(age_gender_df, x="Quality of Sleep", y="Age", orientation="h", color="Gender",
-                            labels={"Quality of Sleep": "Качество сна", "Age": "Возраст", "Gender": "Пол"},
-                            color_discrete_map={"Мужчины": "#826DBA", "Женщины": "#E8B93F"})
-    # Инвертирование значений для мужчин для создания симметричного графика
-    for trace in age_gender_fig.data:
-        if trace.name == 'Мужчины':
-            trace.x = [-x for x in trace.x]
-    age_gender_fig.update_layout(plot_bgcolor='#E3E1F4', paper_bgcolor='#E3E1F4', height=378, legend=dict(y=0.5))
-    
-    return line_fig, pie_fig, stress_fig, sleep_quality_fig, age_gender_fig
\ No newline at end of file
+# Создание линейного графика
+def build_line(selections):
+    line_data = aggregate('duration_by_pressure', selections)
+    return figure(
+        [line_trace(line_data['Blood Pressure'].to_numpy(), line_data['Sleep Duration'].to_numpy(), '#826DBA',
+                    "Давление=%{x}<br>Продолжительность сна=%{y}<extra></extra>")],
+        xaxis=axis("Давление"), yaxis=axis("Продолжительность сна"),
+        margin=dict(t=60), plot_bgcolor='#E3E1F4', paper_bgcolor='#E3E1F4', height=335
+    )
+
+
+# Перевод названий нарушений сна для подписей
+SLEEP_DISORDER_TRANSLATION = {
+    "Insomnia": "Бессонница",
+    "Sleep Apnea": "Апноэ",
+    "No": "Отсутствует"
+}
+
+
+# Создание круговой диаграммы
+def build_pie(selections):
+    pie_data = aggregate('disorders', selections).sort_values('count', ascending=False)
+    labels = pie_data['Sleep Disorder'].map(SLEEP_DISORDER_TRANSLATION).to_numpy()
+    return figure(
+        [pie_trace(labels, pie_data['count'].to_numpy(), sequential.YlOrBr[:len(pie_data)],
+                   "<b>%{label}</b><br>Количество: %{value}<extra></extra>",
+                   texttemplate="%{percent:.1%}", textposition="inside")],
+        plot_bgcolor='#E3E1F4', paper_bgcolor='#E3E1F4', height=335, margin=dict(t=10, b=0, l=20, r=15),
+        legend=dict(title=dict(text="Нарушения сна"), y=0.5)
+    )
+
+
+# Подписи и цвета полов на половозрастной пирамиде
+GENDER_TRANSLATION = {"Male": "Мужчины", "Female": "Женщины"}
+GENDER_COLORS = {"Мужчины": "#826DBA", "Женщины": "#E8B93F"}
+
+
+# Создание графика качества сна по полу и возрасту
+def build_age_gender(selections):
+    age_gender_df = aggregate('quality_by_age_gender', selections)
+    codes, code_of = group_codes(age_gender_df['Gender'])
+    groups = {code: {"name": GENDER_TRANSLATION[gender], "color": GENDER_COLORS[GENDER_TRANSLATION[gender]]} for gender, code in code_of.items()}
+    # Значения мужчин откладываются влево для симметричного графика; трасса на пол в порядке появления
+    traces = pyramid_traces(age_gender_df['Quality of Sleep'].to_numpy(), age_gender_df['Age'].to_numpy(), codes, groups,
+                            [code_of[gender] for gender in ['Male'] if gender in code_of],
+                            "Пол={name}<br>Качество сна=%{x}<br>Возраст=%{y}<extra></extra>")
+    return figure(
+        traces,
+        xaxis=axis("Качество сна"), yaxis=axis("Возраст"),
+        legend=dict(title=dict(text="Пол"), tracegroupgap=0, y=0.5), barmode='relative',
+        margin=dict(t=60), plot_bgcolor='#E3E1F4', paper_bgcolor='#E3E1F4', height=378
+    )
+
+
+# Графики страницы: идентификатор компонента -> функция построения.
+# Индикаторы сюда не входят: они обновляются частично, без пересборки фигуры
+FIGURES = {"line-chart_2": build_line, "pie-chart_2": build_pie, "age-gender-chart": build_age_gender}
+
+
+def _selections(bmi_categories, occupations):
+    return {'BMI Category': bmi_categories, 'Occupation': occupations}
+
+
+# Частичное обновление индикатора: клиенту отправляются только среднее и полосы
+# на шкале - разброс значений (среднее +- стандартное отклонение) и 95% доверительный
+# интервал среднего. Всё берётся из одной сводки статистики (stats.CellStats)
+def _indicator_patch(summary):
+    patch = Patch()
+    patch["data"][0]["value"] = summary["mean"]
+    patch["data"][0]["gauge"]["steps"] = _indicator_bands(summary)
+    return patch
+
+
+def _indicator_bands(summary):
+    if summary["mean"] is None:
+        return []
+    spread = (summary["mean"] - summary["std"], summary["mean"] + summary["std"])
+    confidence = (summary["ci_low"], summary["ci_high"])
+    return [{"range": [max(low, 0), min(high, 10)], "color": color}
+            for (low, high), color in zip([spread, confidence], INDICATOR_BAND_COLORS)]
+
+
+if CLIENTSIDE_MODE:
+    # Клиентский режим: куб передаётся в браузер один раз, графики
+    # пересчитываются функциями assets/clientside.js без обращений к серверу
+    layout.children.append(dcc.Store(id="second-cube"))
+else:
+    # Серверный режим: значения фильтров приходят на сервер через хранилище с задержкой
+    layout.children.append(filter_store("second-filters"))
+
+
+# Функции обратного вызова (входы и выходы объявлены в pages/second_callbacks.py)
+@instrument('second/load_cube')
+def load_cube(_):
+    return store_payload(["duration_by_pressure", "disorders", "quality_by_age_gender", "overall"], {
+        "sleep_disorder_translation": SLEEP_DISORDER_TRANSLATION,
+        "gender_translation": GENDER_TRANSLATION,
+        "gender_colors": GENDER_COLORS,
+    })
+
+
+@instrument('second/update_line')
+def update_line(bmi_categories, occupations):
+    return cached_figure('second/line-chart_2', _selections(bmi_categories, occupations), build_line)
+
+
+@instrument('second/update_pie')
+def update_pie(bmi_categories, occupations):
+    return cached_figure('second/pie-chart_2', _selections(bmi_categories, occupations), build_pie)
+
+
+@instrument('second/update_age_gender')
+def update_age_gender(bmi_categories, occupations):
+    return cached_figure('second/age-gender-chart', _selections(bmi_categories, occupations), build_age_gender)
+
+
+# Все графики страницы одной фоновой задачей (SLEEP_BACKGROUND=1) с передачей хода
+# выполнения. Частичные обновления индикаторов возвращаются в виде JSON: результат
+# задачи сохраняется в кеше задач через pickle
+@instrument('second/update_graphs')
+def update_graphs(set_progress, bmi_categories, occupations):
+    steps = [update_line, update_pie, update_age_gender, update_stress_indicator, update_sleep_quality_indicator]
+    results = []
+    for number, step in enumerate(steps):
+        set_progress((100 * number / len(steps), f"{number}/{len(steps)}"))
+        result = step(bmi_categories, occupations)
+        results.append(result.to_plotly_json() if isinstance(result, Patch) else result)
+    set_progress((100, f"{len(steps)}/{len(steps)}"))
+    return results
+
+
+@instrument('second/update_stress_indicator')
+def update_stress_indicator(bmi_categories, occupations):
+    return _indicator_patch(indicator_stats(_selections(bmi_categories, occupations))['Stress Level'])
+
+
+@instrument('second/update_sleep_quality_indicator')
+def update_sleep_quality_indicator(bmi_categories, occupations):
+    return _indicator_patch(indicator_stats(_selections(bmi_categories, occupations))['Quality of Sleep'])
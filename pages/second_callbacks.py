@@ -0,0 +1,69 @@
+from dash import clientside_callback, ClientsideFunction, Output, Input, State
+from background import POLL_INTERVAL_MS, manager
+from config import CLIENTSIDE_MODE
+from pages import debounce_filters, lazy_callback
+
+# Обратные вызовы страницы "Здоровье". Реализация в pages/second.py
+# импортируется при первом вызове, а не при старте приложения
+
+FILTER_INPUTS = [Input("bmi-dropdown_2", "value"), Input("profession-dropdown", "value")]
+
+# Полоса хода фоновой задачи видна, пока задача выполняется
+PROGRESS_VISIBLE = {"visibility": "visible", "height": "1.2rem"}
+PROGRESS_HIDDEN = {"visibility": "hidden", "height": "1.2rem"}
+
+if CLIENTSIDE_MODE:
+    # Клиентский режим: куб передаётся в браузер один раз, графики
+    # пересчитываются функциями assets/clientside.js без обращений к серверу
+    lazy_callback(
+        "pages.second", "load_cube",
+        Output("second-cube", "data"),
+        Input("second-cube", "id")
+    )
+
+    for figure_id, function_name in [("line-chart_2", "second_line"), ("pie-chart_2", "second_pie"), ("age-gender-chart", "second_age_gender")]:
+        clientside_callback(
+            ClientsideFunction(namespace="sleep", function_name=function_name),
+            Output(figure_id, "figure"),
+            FILTER_INPUTS + [Input("second-cube", "data")]
+        )
+
+    for figure_id, function_name in [("stress-indicator", "second_stress"), ("sleep-quality-indicator", "second_quality")]:
+        clientside_callback(
+            ClientsideFunction(namespace="sleep", function_name=function_name),
+            Output(figure_id, "figure"),
+            FILTER_INPUTS + [Input("second-cube", "data")],
+            State(figure_id, "figure")
+        )
+elif manager is not None:
+    # Фоновый режим: все графики строятся одной фоновой задачей в отдельном процессе,
+    # обработчик запроса только запускает её и отдаёт ход выполнения. Задача прошлого
+    # набора фильтров останавливается при изменении фильтров; при уходе со страницы
+    # задача доводится до конца, так как страница остаётся в документе (скрытой).
+    # Готовые результаты для тех же фильтров берутся из кеша задач
+    debounce_filters("second-filters", FILTER_INPUTS)
+
+    lazy_callback(
+        "pages.second", "update_graphs",
+        [Output("line-chart_2", "figure"), Output("pie-chart_2", "figure"), Output("age-gender-chart", "figure"),
+         Output("stress-indicator", "figure"), Output("sleep-quality-indicator", "figure")],
+        Input("second-filters", "data"),
+        filters=True,
+        background=True,
+        manager=manager,
+        interval=POLL_INTERVAL_MS,
+        progress=[Output("second-progress", "value"), Output("second-progress", "label")],
+        running=[(Output("second-progress", "style"), PROGRESS_VISIBLE, PROGRESS_HIDDEN)]
+    )
+else:
+    # Каждый график обновляется отдельным запросом, поэтому графики строятся
+    # параллельно на разных процессах сервера, а готовые графики для набора
+    # фильтров берутся из кеша. Индикаторы обновляются частично, без пересборки фигуры.
+    # Фильтры доходят до графиков через хранилище second-filters с задержкой
+    debounce_filters("second-filters", FILTER_INPUTS)
+
+    for figure_id, function_name in [("line-chart_2", "update_line"), ("pie-chart_2", "update_pie"),
+                                     ("age-gender-chart", "update_age_gender"),
+                                     ("stress-indicator", "update_stress_indicator"),
+                                     ("sleep-quality-indicator", "update_sleep_quality_indicator")]:
+        lazy_callback("pages.second", function_name, Output(figure_id, "figure"), Input("second-filters", "data"), filters=True)
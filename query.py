@@ -0,0 +1,328 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Запрос к набору данных в виде JSON:
+# {"filters": {"Gender": ["Male"], "Age": {"min": 30, "max": 45}},
+#  "group_by": ["Occupation"],
+#  "aggregations": {"Quality of Sleep": ["mean", "p90"], "Sleep Duration": ["median"]},
+#  "limit": 100}
+# Фильтр - список допустимых значений или диапазон {"min", "max"} (границы включаются).
+# Количество строк в группе ("count") возвращается всегда
+
+# Агрегаты по столбцу; кроме них - процентили вида p90 или p99.9
+AGGREGATIONS = ["count", "sum", "mean", "min", "max", "median"]
+PERCENTILE = re.compile(r"^p(\d{1,2}(\.\d+)?|100)$")
+
+# Агрегаты, которые выражаются через суммы ячеек куба
+ADDITIVE_AGGREGATIONS = {"sum", "mean"}
+
+# Число комбинаций значений ключей группировки, до которого номера групп
+# считаются без сортировки (np.bincount по плотной сетке комбинаций)
+DENSE_GROUPS = 1 << 22
+
+
+class Query:
+    def __init__(self, filters=None, group_by=None, aggregations=None, limit=None):
+        self.filters = filters or {}
+        self.group_by = group_by or []
+        self.aggregations = aggregations or {}
+        self.limit = limit
+
+    # Разбор и нормализация JSON запроса: одинаковые по смыслу запросы
+    # (порядок значений, повторы, пустые фильтры) дают один отпечаток
+    @classmethod
+    def parse(cls, spec):
+        if not isinstance(spec, dict):
+            raise ValueError("Запрос должен быть объектом JSON")
+        unknown = set(spec) - {"filters", "group_by", "aggregations", "limit"}
+        if unknown:
+            raise ValueError(f"Неизвестные поля запроса: {', '.join(sorted(unknown))}")
+
+        filters = {}
+        if not isinstance(spec.get("filters") or {}, dict):
+            raise ValueError("filters должен быть объектом: столбец -> условие")
+        for column, condition in (spec.get("filters") or {}).items():
+            if isinstance(condition, list):
+                if not all(isinstance(value, str) or _is_number(value) for value in condition):
+                    raise ValueError(f"Фильтр {column}: значения должны быть строками или числами")
+                if condition:
+                    filters[column] = {"values": sorted(set(condition), key=lambda value: (str(type(value)), value))}
+            elif isinstance(condition, dict) and condition and set(condition) <= {"min", "max"}:
+                if not all(_is_number(bound) for bound in condition.values()):
+                    raise ValueError(f"Границы диапазона {column} должны быть числами")
+                filters[column] = dict(condition)
+            else:
+                raise ValueError(f"Фильтр {column}: ожидается список значений или диапазон {{\"min\", \"max\"}}")
+
+        group_by = spec.get("group_by") or []
+        if not isinstance(group_by, list) or not all(isinstance(column, str) for column in group_by) \
+                or len(set(group_by)) != len(group_by):
+            raise ValueError("group_by должен быть списком столбцов без повторов")
+
+        aggregations = {}
+        if not isinstance(spec.get("aggregations") or {}, dict):
+            raise ValueError("aggregations должен быть объектом: столбец -> список агрегатов")
+        for column, functions in (spec.get("aggregations") or {}).items():
+            if isinstance(functions, str):
+                functions = [functions]
+            if not isinstance(functions, list) or not all(isinstance(function, str) for function in functions):
+                raise ValueError(f"Агрегаты {column}: ожидается название или список названий агрегатов")
+            for function in functions:
+                if function not in AGGREGATIONS and not PERCENTILE.match(function):
+                    raise ValueError(f"Неизвестный агрегат {function} для {column}")
+            functions = sorted(set(functions) - {"count"})
+            if functions:
+                aggregations[column] = functions
+
+        limit = spec.get("limit")
+        if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 0):
+            raise ValueError("limit должен быть неотрицательным целым числом")
+        return cls(filters, group_by, aggregations, limit)
+
+    # Отпечаток запроса - ключ кеша результатов (вместе с версией данных)
+    def fingerprint(self):
+        spec = {"filters": self.filters, "group_by": self.group_by, "aggregations": self.aggregations, "limit": self.limit}
+        return hashlib.sha1(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+    # Проверка запроса по столбцам набора данных
+    def validate(self, df):
+        for column in list(self.filters) + self.group_by + list(self.aggregations):
+            if column not in df.columns:
+                raise ValueError(f"Нет столбца {column}")
+        for column, condition in self.filters.items():
+            if "values" not in condition and not pd.api.types.is_numeric_dtype(df[column]):
+                raise ValueError(f"Диапазон задаётся только для числового столбца, {column} - не числовой")
+        for column in self.aggregations:
+            if not pd.api.types.is_numeric_dtype(df[column]):
+                raise ValueError(f"Агрегаты считаются только по числовым столбцам, {column} - не числовой")
+
+
+# Число в JSON запроса; true/false (bool - подкласс int) числом не считаются
+def _is_number(value):
+    return not isinstance(value, bool) and isinstance(value, (int, float))
+
+
+# Имя столбца результата для агрегата function по столбцу column
+def result_column(function, column):
+    return f"{function}({column})"
+
+
+# Маска строк (или ячеек куба), удовлетворяющих условию фильтра
+def condition_mask(series, condition):
+    if "values" in condition:
+        return series.isin(condition["values"]).to_numpy()
+    values = series.to_numpy()
+    mask = np.ones(len(values), dtype=bool)
+    if "min" in condition:
+        mask &= values >= condition["min"]
+    if "max" in condition:
+        mask &= values <= condition["max"]
+    return mask
+
+
+# Выполнение запроса полным проходом по столбцам набора данных.
+# Фильтры по индексированным столбцам берутся из битовых индексов (filter_index.FilterIndex),
+# группы нумеруются по кодам категорий, а суммы и количества считаются np.bincount
+# без построения промежуточных таблиц; порядковые статистики (min, max, медиана,
+# процентили) - одной сортировкой показателя внутри групп
+def scan(df, query, index=None):
+    mask = None
+    for column, condition in query.filters.items():
+        if index is not None and "values" in condition and column in index.bitmaps:
+            column_mask = index.mask({column: condition["values"]})
+        else:
+            column_mask = condition_mask(df[column], condition)
+        mask = column_mask if mask is None else mask & column_mask
+    positions = None if mask is None else np.flatnonzero(mask)
+
+    def take(column):
+        series = df[column]
+        values = series.cat.codes.to_numpy() if isinstance(series.dtype, pd.CategoricalDtype) else series.to_numpy()
+        return values if positions is None else values[positions]
+
+    size = len(df) if positions is None else len(positions)
+    ids, groups, keys = _group_ids([df[column] for column in query.group_by], [take(column) for column in query.group_by], size)
+    n_groups = len(groups)
+
+    result = {column: values for column, values in zip(query.group_by, keys)}
+    # Последний номер - строки с пропуском в ключе, они отбрасываются
+    result["count"] = np.bincount(ids, minlength=n_groups + 1)[:n_groups]
+    for column, functions in query.aggregations.items():
+        values = take(column).astype("float64")
+        result.update(_aggregate(values, ids, n_groups, column, functions))
+    return pd.DataFrame(result)
+
+
+# Номера групп строк, список групп и значения ключей каждой группы.
+# Строки с пропуском в ключе не попадают ни в одну группу (как в pandas groupby)
+def _group_ids(series_list, codes_list, size):
+    if not series_list:
+        return np.zeros(size, dtype=np.int64), np.zeros(1, dtype=np.int64), []
+
+    factors, uniques = [], []
+    valid = np.ones(size, dtype=bool)
+    for series, codes in zip(series_list, codes_list):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = series.cat.categories
+        else:
+            codes, categories = pd.factorize(codes, sort=True)
+        factors.append(codes.astype(np.int64))
+        uniques.append(categories)
+        valid &= codes >= 0
+
+    shape = tuple(len(categories) for categories in uniques)
+    combined = np.ravel_multi_index([codes[valid] for codes in factors], shape) if all(shape) else np.zeros(0, dtype=np.int64)
+    total = int(np.prod(shape, dtype=np.float64))
+    if total <= DENSE_GROUPS:
+        counts = np.bincount(combined, minlength=total)
+        groups = np.flatnonzero(counts)
+        lookup = np.full(total, -1, dtype=np.int64)
+        lookup[groups] = np.arange(len(groups))
+        group_ids = lookup[combined]
+    else:
+        groups, group_ids = np.unique(combined, return_inverse=True)
+
+    # Строки с пропуском в ключе получают отдельный номер за пределами групп
+    ids = np.full(size, len(groups), dtype=np.int64)
+    ids[valid] = group_ids
+    keys = []
+    for series, categories, codes in zip(series_list, uniques, np.unravel_index(groups, shape)):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            keys.append(pd.Categorical.from_codes(codes, dtype=series.dtype))
+        else:
+            keys.append(np.asarray(categories)[codes])
+    return ids, groups, keys
+
+
+def _aggregate(values, ids, n_groups, column, functions):
+    present = ~np.isnan(values)
+    if not present.all():
+        values, ids = values[present], ids[present]
+    counts = np.bincount(ids, minlength=n_groups + 1)[:n_groups]
+    result = {}
+    sums = None
+    if ADDITIVE_AGGREGATIONS & set(functions):
+        sums = np.bincount(ids, weights=values, minlength=n_groups + 1)[:n_groups]
+    value_at = None
+    for function in functions:
+        if function == "sum":
+            result[result_column(function, column)] = sums
+        elif function == "mean":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result[result_column(function, column)] = sums / counts
+        else:
+            if value_at is None:
+                value_at = _rank_lookup(values, ids, n_groups, counts)
+            result[result_column(function, column)] = _quantile(value_at, counts, _quantile_level(function))
+    return result
+
+
+def _quantile_level(function):
+    if function == "min":
+        return 0.0
+    if function == "max":
+        return 1.0
+    if function == "median":
+        return 0.5
+    return float(function[1:]) / 100
+
+
+# Функция (группы, ранги) -> значение с данным рангом в упорядоченных значениях группы.
+# Показатели набора принимают немного различных значений, поэтому обычно хватает
+# гистограммы значений по группам (np.bincount) без сортировки строк;
+# иначе значения сортируются внутри групп
+def _rank_lookup(values, ids, n_groups, counts):
+    codes, uniques = pd.factorize(values, sort=True)
+    if 0 < (n_groups + 1) * len(uniques) <= DENSE_GROUPS:
+        width = len(uniques)
+        histogram = np.bincount(ids * width + codes, minlength=(n_groups + 1) * width).reshape(-1, width)
+        cumulative = np.cumsum(histogram[:n_groups], axis=1)
+        # Номер значения с рангом rank - число значений группы с накопленной частотой не больше rank
+        return lambda groups, ranks: uniques[(cumulative[groups] <= ranks[:, None]).sum(axis=1)]
+
+    # Устойчивая сортировка по значению, затем по номеру группы
+    # (для узкого целого типа numpy сортирует поразрядно, за линейное время)
+    order = np.argsort(values, kind="stable")
+    group_order = ids[order]
+    if n_groups < np.iinfo(np.int16).max:
+        group_order = group_order.astype(np.int16)
+    ordered = values[order[np.argsort(group_order, kind="stable")]]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return lambda groups, ranks: ordered[starts[groups] + ranks]
+
+
+# Квантиль с линейной интерполяцией (как numpy.quantile) для всех групп сразу
+def _quantile(value_at, counts, level):
+    result = np.full(len(counts), np.nan)
+    groups = np.flatnonzero(counts)
+    position = (counts[groups] - 1) * level
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    low_values = value_at(groups, low)
+    result[groups] = low_values + (value_at(groups, high) - low_values) * (position - low)
+    return result
+
+
+# Выполнение запроса: по кубу предагрегатов, если он покрывает запрос, иначе полным проходом.
+# Возвращает результат и способ выполнения ("cube" или "scan")
+def execute(df, query, cube=None, index=None):
+    query.validate(df)
+    name = cube.grouping_for(query) if cube is not None else None
+    if name is not None:
+        result, plan = cube.answer(name, query), "cube"
+    else:
+        result, plan = scan(df, query, index), "scan"
+    if query.limit is not None:
+        result = result.iloc[:query.limit]
+    return result.reset_index(drop=True), plan
+
+
+# Кеш результатов запросов в памяти процесса с вытеснением давно не использованных (LRU).
+# Ключ - версия данных и отпечаток запроса; при смене версии кеш очищается
+class QueryCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self, version=None):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Результат запроса в виде JSON: имена столбцов и строки значений (пропуски - null)
+def result_json(result, version, plan):
+    columns = []
+    for column in result.columns:
+        values = result[column]
+        if pd.api.types.is_float_dtype(values):
+            values = values.astype(object).where(values.notna(), None)
+        columns.append(values.tolist())
+    return {
+        "version": version,
+        "plan": plan,
+        "columns": [str(column) for column in result.columns],
+        "rows": [list(row) for row in zip(*columns)],
+    }
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Столбцы с небольшим числом различных значений хранятся как категории
+CATEGORICAL_COLUMNS = ["Gender", "Occupation", "BMI Category", "Sleep Disorder", "Blood Pressure"]
+
+# Типы столбцов исходной таблицы при разборе: строки сразу читаются категориями,
+# числа - без определения типа по содержимому (сужение типов в apply_schema)
+RAW_DTYPES = {
+    "Gender": "category",
+    "Age": "int64",
+    "Occupation": "category",
+    "Sleep Duration": "float64",
+    "Quality of Sleep": "int64",
+    "Physical Activity Level": "int64",
+    "Stress Level": "int64",
+    "BMI Category": "category",
+    "Blood Pressure": "category",
+    "Heart Rate": "int64",
+    "Daily Steps": "int64",
+    "Sleep Disorder": "category",
+}
+
+# Столбцы, получаемые разбиением давления вида "126/83"
+SYSTOLIC_COLUMN = "Systolic BP"
+DIASTOLIC_COLUMN = "Diastolic BP"
+
+
+# Приведение набора данных к компактным типам
+def apply_schema(df):
+    df = df.copy()
+
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+
+    if "Blood Pressure" in df.columns:
+        # Разбиение выполняется по категориям, а не по каждой строке
+        categories = df["Blood Pressure"].cat.categories.to_series()
+        parts = categories.str.split("/", n=1, expand=True)
+        codes = df["Blood Pressure"].cat.codes.to_numpy()
+        df[SYSTOLIC_COLUMN] = _take_by_codes(pd.to_numeric(parts[0], errors="coerce", downcast="integer"), codes, df.index)
+        df[DIASTOLIC_COLUMN] = _take_by_codes(pd.to_numeric(parts[1], errors="coerce", downcast="integer"), codes, df.index)
+
+    for column in df.columns:
+        if column not in CATEGORICAL_COLUMNS:
+            df[column] = _downcast(df[column])
+
+    return df
+
+
+def _take_by_codes(values, codes, index):
+    values = values.to_numpy()
+    if (codes < 0).any():
+        # Пропуски в исходном столбце остаются пропусками
+        values = values.astype("float64")
+        return pd.Series(np.where(codes < 0, np.nan, values[codes]), index=index)
+    return pd.Series(values[codes], index=index)
+
+
+def _downcast(series):
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast="integer")
+    if pd.api.types.is_float_dtype(series):
+        # float32 используется только без потери точности: иначе 7.1 превратится
+        # в 7.099999904632568 на осях и в ключах группировки
+        narrowed = series.astype("float32")
+        if (narrowed.astype("float64") == series).all():
+            return narrowed
+    return series
+
+
+# Добавление новых строк к уже приведённому набору без повторного разбора старых строк
+def append_rows(df, new_df):
+    return concat_frames([df, new_df])
+
+
+# Объединение приведённых наборов (блоков одного файла или нескольких источников).
+# Категории объединяются и сортируются, чтобы порядок групп не зависел от порядка поступления
+def concat_frames(frames):
+    first = frames[0]
+    for frame in frames[1:]:
+        if list(frame.columns) != list(first.columns):
+            raise ValueError("Состав столбцов новых строк отличается от набора данных")
+    if len(frames) == 1:
+        return first
+    columns = {}
+    for column in first.columns:
+        if isinstance(first[column].dtype, pd.CategoricalDtype):
+            columns[column] = union_categoricals([frame[column].astype("category") for frame in frames], sort_categories=True)
+        else:
+            columns[column] = _downcast(pd.Series(np.concatenate([frame[column].to_numpy() for frame in frames])))
+    result = pd.DataFrame(columns)
+    result.index = first.index.append([frame.index for frame in frames[1:]])
+    return result
+
+
+# Объём памяти по столбцам до и после приведения типов (в байтах)
+def memory_report(before, after):
+    report = pd.DataFrame({
+        "before": before.memory_usage(deep=True, index=False),
+        "after": after.memory_usage(deep=True, index=False),
+    }).reindex(after.columns).fillna(0).astype("int64")
+    report.loc["Total"] = report.sum()
+    return report
+
+
+if __name__ == '__main__':
+    from config import DATA_SOURCE
+    from ingest import read_raw
+    from sources import make_sources
+
+    raw_df = read_raw(make_sources(DATA_SOURCE))
+    print(memory_report(raw_df, apply_schema(raw_df)).to_string())
@@ -0,0 +1,103 @@
+import os
+import pandas as pd
+import requests
+from config import HTTP_TIMEOUT
+
+# Источник отдаёт сырое содержимое потоком через open(validators): None, если оно
+# не изменилось с прошлого запроса, иначе пару (итератор блоков байт, новые валидаторы).
+# read_chunks разбирает сохранённое содержимое блоками строк
+
+# Размер блока при чтении содержимого источника (в байтах)
+BLOCK_SIZE = 1 << 20
+
+
+# Источник данных из локального CSV файла
+class CSVSource:
+    # Новые строки дописываются в конец файла, их можно разобрать отдельно
+    appendable = True
+
+    def __init__(self, path):
+        self.path = path
+
+    def __str__(self):
+        return self.path
+
+    def open(self, validators=None):
+        stat = os.stat(self.path)
+        current = {"mtime": stat.st_mtime_ns, "size": stat.st_size}
+        if validators == current:
+            return None
+        return _file_blocks(self.path), current
+
+    def read_chunks(self, file, chunk_rows, dtype=None):
+        return pd.read_csv(file, index_col=0, dtype=dtype, chunksize=chunk_rows)
+
+
+def _file_blocks(path):
+    with open(path, "rb") as file:
+        while block := file.read(BLOCK_SIZE):
+            yield block
+
+
+# Источник данных из локального Parquet файла (типы столбцов хранятся в самом файле)
+class ParquetSource(CSVSource):
+    appendable = False
+
+    def read_chunks(self, file, chunk_rows, dtype=None):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(file).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+
+
+# Источник данных, опубликованный по HTTP в формате CSV (например, Google Таблица).
+# Повторные запросы условные (ETag / Last-Modified), тело читается потоком,
+# соединения переиспользуются через общую сессию
+class HTTPSource(CSVSource):
+    appendable = True
+
+    def __init__(self, url, timeout=HTTP_TIMEOUT, session=None):
+        self.url = url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def __str__(self):
+        return self.url
+
+    def open(self, validators=None):
+        headers = {}
+        if validators and validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators and validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        response = self.session.get(self.url, headers=headers, timeout=self.timeout, stream=True)
+        if response.status_code == 304:
+            response.close()
+            return None
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            response.close()
+            raise
+        return _response_blocks(response), {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+
+
+def _response_blocks(response):
+    with response:
+        yield from response.iter_content(BLOCK_SIZE)
+
+
+# Выбор источника по строке: URL, путь к .parquet или путь к CSV
+def make_source(spec, session=None):
+    if spec.startswith(("http://", "https://")):
+        return HTTPSource(spec, session=session)
+    if spec.endswith((".parquet", ".pq")):
+        return ParquetSource(spec)
+    return CSVSource(spec)
+
+
+# Источники из строки через запятую (например, таблицы нескольких регионов).
+# HTTP источники используют одну сессию и общий пул соединений
+def make_sources(spec):
+    session = requests.Session()
+    return [make_source(part.strip(), session) for part in spec.split(",") if part.strip()]
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from dash import html
+from config import ASSET_BUILD_DIR, BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Исходные изображения и файл описания собранных копий
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+MANIFEST_FILE = "manifest.json"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+# Адрес собранных файлов на сервере
+URL_PREFIX = "/static-assets/"
+
+# Ширины уменьшенных копий для srcset (копии шире исходного изображения не строятся)
+IMAGE_WIDTHS = [480, 960, 1920]
+
+# Современные форматы в порядке предпочтения: MIME-тип, расширение и параметры Pillow.
+# Исходный формат остаётся запасным для браузеров без их поддержки
+IMAGE_FORMATS = [
+    ("image/avif", "avif", {"quality": 60}),
+    ("image/webp", "webp", {"quality": 80, "method": 6}),
+]
+
+# В имени собранного файла - хеш содержимого, поэтому файл по этому адресу не меняется
+# и браузер хранит его год без повторных проверок; ссылки на assets Dash с отпечатком
+# времени изменения (?m=...) и значок с версией Dash (?v=...) кешируются так же
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+# Сборка изображений из assets: для каждого - копии ширин IMAGE_WIDTHS в форматах
+# IMAGE_FORMATS и сжатая копия исходного формата, с хешем содержимого в имени.
+# Описание копий сохраняется в manifest.json, по нему страницы строят <picture>.
+# Без пакета Pillow изображения только копируются под имена с хешем
+def build(source_dir=ASSETS_DIR, build_dir=ASSET_BUILD_DIR):
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+        logger.warning("Пакет Pillow не установлен (pip install pillow): изображения не сжимаются и не преобразуются")
+
+    tmp_dir = f"{build_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir)
+    manifest = {}
+    for name in sorted(os.listdir(source_dir)):
+        stem, extension = os.path.splitext(name)
+        if extension.lower() not in IMAGE_EXTENSIONS:
+            continue
+        path = os.path.join(source_dir, name)
+        with open(path, "rb") as file:
+            content = file.read()
+        # Параметры сборки входят в хеш: при их изменении меняются и адреса
+        digest = hashlib.sha1(content + repr((IMAGE_WIDTHS, IMAGE_FORMATS, Image is None)).encode()).hexdigest()[:10]
+        mime = "image/png" if extension.lower() == ".png" else "image/jpeg"
+        if Image is None:
+            target = f"{stem}.{digest}{extension}"
+            shutil.copyfile(path, os.path.join(tmp_dir, target))
+            manifest[name] = {"variants": {mime: [[URL_PREFIX + target, None]]}}
+            continue
+
+        with Image.open(path) as source:
+            source.load()
+            widths = [width for width in IMAGE_WIDTHS if width < source.width] + [source.width]
+            variants = {}
+            for width in widths:
+                image = source if width == source.width else source.resize((width, round(source.height * width / source.width)), Image.LANCZOS)
+                for format_mime, format_extension, options in IMAGE_FORMATS + [(mime, extension.lstrip("."), {"optimize": True})]:
+                    target = f"{stem}-{width}.{digest}.{format_extension}"
+                    image.save(os.path.join(tmp_dir, target), **options)
+                    variants.setdefault(format_mime, []).append([URL_PREFIX + target, width])
+            manifest[name] = {"width": source.width, "height": source.height, "variants": variants}
+
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=1)
+    # Старая сборка заменяется целиком; работающие процессы перечитают описание после перезапуска
+    old_dir = f"{build_dir}.{os.getpid()}.old"
+    if os.path.exists(build_dir):
+        os.replace(build_dir, old_dir)
+    os.replace(tmp_dir, build_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+def _read_manifest(build_dir=ASSET_BUILD_DIR):
+    try:
+        with open(os.path.join(build_dir, MANIFEST_FILE), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+# Описание собранных изображений; пусто - сборка не выполнялась, изображения отдаются из assets
+manifest = _read_manifest()
+
+
+def _srcset(variants):
+    return ", ".join(url if width is None else f"{url} {width}w" for url, width in variants)
+
+
+# Изображение name из assets. После сборки - <picture> с копиями в современных форматах,
+# из которых браузер выбирает поддерживаемый формат и ширину под sizes (ширина на странице),
+# иначе обычный <img>. props - свойства <img> (className, style и т.п.)
+def image(name, sizes=None, **props):
+    entry = manifest.get(name)
+    if entry is None:
+        return html.Img(src=f"/assets/{name}", **props)
+    variants = entry["variants"]
+    modern = [mime for mime, _, _ in IMAGE_FORMATS if mime in variants]
+    fallback = next(variants[mime] for mime in variants if mime not in modern)
+    sources = [html.Source(srcSet=_srcset(variants[mime]), type=mime, sizes=sizes) for mime in modern]
+    return html.Picture(sources + [html.Img(src=fallback[-1][0], srcSet=_srcset(fallback), sizes=sizes, **props)])
+
+
+# Подключение к Flask серверу: собранные файлы по адресу URL_PREFIX с долгим кешированием
+def init_app(server):
+    from flask import abort, request, send_from_directory
+
+    @server.route(URL_PREFIX + "<path:filename>")
+    def static_asset(filename):
+        if filename == MANIFEST_FILE:
+            abort(404)
+        response = send_from_directory(ASSET_BUILD_DIR, filename)
+        response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+    @server.after_request
+    def cache_fingerprinted_assets(response):
+        fingerprinted = (request.path.startswith("/assets/") and "m" in request.args) or \
+            (request.path == "/_favicon.ico" and "v" in request.args)
+        if response.status_code == 200 and fingerprinted:
+            response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+
+# Размеры исходных изображений и собранных копий (в байтах)
+def print_report(result, source_dir=ASSETS_DIR, build_dir=ASSET_BUILD_DIR):
+    for name, entry in result.items():
+        print(f"{name}: {os.path.getsize(os.path.join(source_dir, name))} байт")
+        for mime, variants in entry["variants"].items():
+            sizes = ", ".join(f"{width or 'исх.'}: {os.path.getsize(os.path.join(build_dir, url[len(URL_PREFIX):]))}"
+                              for url, width in variants)
+            print(f"  {mime} {sizes}")
+
+
+if __name__ == '__main__':
+    # Сборка изображений перед развёртыванием: python static_assets.py
+    logging.basicConfig(level=logging.INFO)
+    print_report(build())
@@ -0,0 +1,158 @@
+import sys
+import numpy as np
+
+# Ячейки статистики - сочетания значений фильтров страницы "Здоровье", показатели - индикаторов
+STATS_DIMENSIONS = ["BMI Category", "Occupation"]
+STATS_MEASURES = ["Stress Level", "Quality of Sleep"]
+
+# Квантиль нормального распределения для 95% доверительного интервала среднего
+Z_95 = 1.959963984540054
+
+
+# Потоковая статистика показателей по ячейкам: количество значений, среднее и сумма
+# квадратов отклонений от среднего (M2, как в алгоритме Уэлфорда). Ячейки объединяются
+# формулой Чана, поэтому среднее и дисперсия по фильтрам считаются за O(число ячеек),
+# а новые строки добавляются к ячейкам без пересчёта старых (updated).
+# Объект не изменяется: обновление возвращает новый, его подменяет DataStore
+class CellStats:
+    def __init__(self, df=None, dimensions=STATS_DIMENSIONS, measures=STATS_MEASURES):
+        self.dimensions = list(dimensions)
+        self.measures = list(measures)
+        self.keys = []
+        self.counts = np.zeros((0, len(self.measures)))
+        self.means = np.zeros((0, len(self.measures)))
+        self.m2 = np.zeros((0, len(self.measures)))
+        if df is not None:
+            self.keys, self.counts, self.means, self.m2 = self._cells(df)
+
+    # Статистика из готовых ячеек: таблица со столбцами измерений и для каждого показателя
+    # m - столбцами count(m), mean(m) и m2(m) (например, посчитанная запросом SQL)
+    @classmethod
+    def from_cells(cls, cells, dimensions=STATS_DIMENSIONS, measures=STATS_MEASURES):
+        stats = cls(dimensions=dimensions, measures=measures)
+        stats.keys = list(cells[stats.dimensions].itertuples(index=False, name=None))
+        for attribute, prefix in [("counts", "count"), ("means", "mean"), ("m2", "m2")]:
+            columns = [f"{prefix}({measure})" for measure in stats.measures]
+            setattr(stats, attribute, cells[columns].to_numpy(dtype="float64"))
+        return stats
+
+    # Количество, среднее и M2 по ячейкам блока строк; пропуски показателей не учитываются
+    def _cells(self, df):
+        values = df[self.dimensions].assign(**{measure: df[measure].astype("float64") for measure in self.measures})
+        grouped = values.groupby(self.dimensions, observed=True)[self.measures]
+        counts = grouped.count()
+        means = grouped.mean()
+        # Дисперсия выборки (ddof=1), умноженная на n - 1, - это M2; для одной строки 0
+        m2 = (grouped.var() * (counts - 1)).fillna(0.0)
+        keys = [key if isinstance(key, tuple) else (key,) for key in counts.index]
+        return keys, counts.to_numpy(dtype="float64"), means.fillna(0.0).to_numpy(), m2.to_numpy()
+
+    # Новая статистика с добавленными строками new_rows (например, дописанными в источник)
+    def updated(self, new_rows):
+        keys, counts, means, m2 = self._cells(new_rows)
+        result = CellStats(dimensions=self.dimensions, measures=self.measures)
+        result.keys = list(self.keys)
+        position = {key: i for i, key in enumerate(result.keys)}
+        new_keys = [key for key in keys if key not in position]
+        result.keys += new_keys
+        for key in new_keys:
+            position[key] = len(position)
+        padding = np.zeros((len(new_keys), len(self.measures)))
+        result.counts = np.vstack([self.counts, padding])
+        result.means = np.vstack([self.means, padding])
+        result.m2 = np.vstack([self.m2, padding])
+        rows = np.array([position[key] for key in keys], dtype=np.intp)
+        result.counts[rows], result.means[rows], result.m2[rows] = _merge(
+            result.counts[rows], result.means[rows], result.m2[rows], counts, means, m2)
+        return result
+
+    # Сводка показателей по ячейкам, выбранным фильтрами {столбец: значения}:
+    # {показатель: {"count", "mean", "variance", "std", "ci_low", "ci_high"}}.
+    # Пустой список или None - фильтр не задан; для пустой выборки значения None
+    def summary(self, selections):
+        mask = np.ones(len(self.keys), dtype=bool)
+        for column, values in selections.items():
+            if not values:
+                continue
+            if column not in self.dimensions:
+                raise ValueError(f"Статистика не разбита по столбцу {column}")
+            allowed = set(values)
+            level = self.dimensions.index(column)
+            mask &= np.array([key[level] in allowed for key in self.keys], dtype=bool)
+
+        counts, means, m2 = self.counts[mask], self.means[mask], self.m2[mask]
+        count = counts.sum(axis=0)
+        result = {}
+        for i, measure in enumerate(self.measures):
+            n = count[i]
+            if not n:
+                result[measure] = dict.fromkeys(["count", "mean", "variance", "std", "ci_low", "ci_high"])
+                result[measure]["count"] = 0
+                continue
+            mean = (counts[:, i] * means[:, i]).sum() / n
+            # Формула Чана для нескольких ячеек: M2 = сумма M2 ячеек + сумма n_i (mean_i - mean)^2
+            total_m2 = m2[:, i].sum() + (counts[:, i] * (means[:, i] - mean) ** 2).sum()
+            variance = total_m2 / (n - 1) if n > 1 else 0.0
+            half_width = Z_95 * np.sqrt(variance / n)
+            result[measure] = {
+                "count": int(n),
+                "mean": float(mean),
+                "variance": float(variance),
+                "std": float(np.sqrt(variance)),
+                "ci_low": float(mean - half_width),
+                "ci_high": float(mean + half_width),
+            }
+        return result
+
+
+# Объединение статистик двух наборов (формула Чана), поэлементно для массивов
+def _merge(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    count = count_a + count_b
+    safe = np.where(count > 0, count, 1)
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / safe
+    m2 = m2_a + m2_b + delta ** 2 * count_a * count_b / safe
+    return count, mean, m2
+
+
+# Проверка: статистика, построенная блоками через updated, совпадает с пересчётом
+# всего набора и с pandas. Выводит расхождения и время сводки
+def _check(chunks=10):
+    import time
+    from data import get_df
+
+    df = get_df()
+    full = CellStats(df)
+    bounds = np.linspace(0, len(df), chunks + 1, dtype=int)
+    streamed = CellStats(df.iloc[:bounds[1]])
+    for start, stop in zip(bounds[1:-1], bounds[2:]):
+        streamed = streamed.updated(df.iloc[start:stop])
+
+    selections = [{}, {"BMI Category": ["Obese"]}, {"Occupation": ["Doctor", "Nurse"]},
+                  {"BMI Category": ["Normal Weight", "Overweight"], "Occupation": ["Engineer"]}]
+    worst = 0.0
+    for selection in selections:
+        mask = np.ones(len(df), dtype=bool)
+        for column, values in selection.items():
+            mask &= df[column].isin(values).to_numpy()
+        for stats in (full, streamed):
+            summary = stats.summary(selection)
+            for measure in stats.measures:
+                column = df.loc[mask, measure].astype("float64")
+                expected = [len(column), column.mean(), column.var()]
+                actual = [summary[measure][name] for name in ["count", "mean", "variance"]]
+                worst = max(worst, max(abs(a - e) / max(abs(e), 1.0) for a, e in zip(actual, expected)))
+    repeats = 1000
+    started = time.perf_counter()
+    for _ in range(repeats):
+        full.summary(selections[-1])
+    elapsed = time.perf_counter() - started
+    print(f"строк {len(df)}, ячеек {len(full.keys)}, блоков {chunks}")
+    print(f"наибольшее относительное расхождение с pandas: {worst:.2e}")
+    print(f"сводка по фильтрам: {elapsed * 1000 / repeats:.3f} мс")
+    return worst
+
+
+if __name__ == '__main__':
+    # Проверка на текущем наборе: python stats.py [число блоков]
+    sys.exit(0 if _check(*(int(arg) for arg in sys.argv[1:2])) < 1e-9 else 1)
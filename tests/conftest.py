@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest import download_all, read_downloads
+from sources import make_sources
+
+# Значения категорий синтетического набора (как в исходной таблице)
+GENDERS = ["Male", "Female"]
+OCCUPATIONS = ["Accountant", "Doctor", "Engineer", "Lawyer", "Nurse", "Teacher"]
+BMI_CATEGORIES = ["Normal Weight", "Obese", "Overweight"]
+DISORDERS = ["No", "Insomnia", "Sleep Apnea"]
+PRESSURES = ["115/75", "120/80", "126/83", "130/85", "140/95"]
+
+
+# Синтетические строки со схемой исходной таблицы
+def sleep_rows(rows, seed=0, start=1):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Person ID": np.arange(start, start + rows),
+        "Gender": rng.choice(GENDERS, rows),
+        "Age": rng.integers(27, 60, rows),
+        "Occupation": rng.choice(OCCUPATIONS, rows),
+        "Sleep Duration": rng.choice(np.round(np.arange(5.8, 8.6, 0.1), 1), rows),
+        "Quality of Sleep": rng.integers(4, 10, rows),
+        "Physical Activity Level": rng.integers(30, 91, rows),
+        "Stress Level": rng.integers(3, 9, rows),
+        "BMI Category": rng.choice(BMI_CATEGORIES, rows),
+        "Blood Pressure": rng.choice(PRESSURES, rows),
+        "Heart Rate": rng.integers(65, 86, rows),
+        "Daily Steps": rng.integers(3000, 10001, rows),
+        "Sleep Disorder": rng.choice(DISORDERS, rows),
+    })
+
+
+# Набор, разобранный так же, как источник приложения (ingest, schema)
+def read_source(path):
+    sources = make_sources(path)
+    downloads = download_all(sources, [None] * len(sources))
+    try:
+        return read_downloads(downloads)
+    finally:
+        for loaded in downloads:
+            loaded.close()
+
+
+@pytest.fixture
+def sleep_csv(tmp_path):
+    path = tmp_path / "sleep.csv"
+    sleep_rows(600).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def sleep_df(sleep_csv):
+    return read_source(sleep_csv)
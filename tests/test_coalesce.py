@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+from coalesce import SupersedeTracker
+
+
+def test_newer_request_supersedes_older(tmp_path):
+    tracker = SupersedeTracker(str(tmp_path / "requests.sqlite"))
+    old = tracker.begin("tab", "pages.first.update_pie", 1)
+    assert tracker.is_current(old)
+    new = tracker.begin("tab", "pages.first.update_pie", 2)
+    assert not tracker.is_current(old)
+    assert tracker.is_current(new)
+    # Запрос, пришедший позже более нового, номер не понижает
+    late = tracker.begin("tab", "pages.first.update_pie", 1)
+    assert not tracker.is_current(late)
+    # Другие вкладки и обратные вызовы учитываются отдельно
+    assert tracker.is_current(tracker.begin("other", "pages.first.update_pie", 1))
+    assert tracker.is_current(tracker.begin("tab", "pages.first.update_line", 1))
+
+
+# Устаревший и новый запросы вкладки в разных процессах сервера
+def test_supersede_across_processes(tmp_path):
+    path = str(tmp_path / "requests.sqlite")
+    tracker = SupersedeTracker(path)
+    old = tracker.begin("tab", "pages.second.update_line", 1)
+    code = f"from coalesce import SupersedeTracker; SupersedeTracker({path!r}).begin('tab', 'pages.second.update_line', 2)"
+    subprocess.run([sys.executable, "-c", code], check=True)
+    assert not tracker.is_current(old)
+
+
+def test_prunes_oldest_sessions(tmp_path, monkeypatch):
+    monkeypatch.setattr("coalesce.PRUNE_EVERY", 10)
+    tracker = SupersedeTracker(str(tmp_path / "requests.sqlite"), limit=5)
+    for number in range(10):
+        tracker.begin(f"tab-{number}", "update", 1)
+    count = tracker._connection().execute("SELECT COUNT(*) FROM latest").fetchone()[0]
+    assert count == 5
@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from cube import GROUPINGS, Cube
+from query import Query, result_column
+
+FILTERS = [{}, {"Gender": {"values": ["Female"]}, "BMI Category": {"values": ["Normal Weight", "Obese"]}}]
+
+
+# Среднее и количество из ячеек куба совпадают с groupby по исходным строкам
+@pytest.mark.parametrize("name", list(GROUPINGS))
+@pytest.mark.parametrize("filters", FILTERS)
+def test_answer_matches_groupby(sleep_df, name, filters):
+    keys, measures = GROUPINGS[name]
+    cube = Cube(sleep_df)
+    result = cube.answer(name, Query(filters=filters, group_by=keys, aggregations={measure: ["mean"] for measure in measures}))
+
+    df = sleep_df
+    for column, condition in filters.items():
+        df = df[df[column].isin(condition["values"])]
+    if keys:
+        grouped = df.groupby(keys, observed=True)
+        expected = grouped.size().rename("count").to_frame()
+        for measure in measures:
+            expected[result_column("mean", measure)] = grouped[measure].mean()
+        expected = expected.reset_index()
+    else:
+        expected = pd.DataFrame({"count": [len(df)], **{result_column("mean", measure): [df[measure].mean()] for measure in measures}})
+
+    result = result.sort_values(keys).reset_index(drop=True) if keys else result
+    pd.testing.assert_frame_equal(result, expected[result.columns], check_dtype=False, check_categorical=False)
@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+
+import data
+from data import DataStore
+from sources import make_sources
+
+
+def read_pointer(store):
+    with open(store.pointer_path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+# Новые валидаторы при том же содержимом сохраняются, и следующий опрос снова условный
+def test_refresh_keeps_new_validators(sleep_csv, tmp_path, monkeypatch):
+    store = DataStore(make_sources(sleep_csv), str(tmp_path / "snapshots"))
+    assert store.refresh()
+    version = read_pointer(store)["version"]
+
+    stat = os.stat(sleep_csv)
+    os.utime(sleep_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not store.refresh()
+    pointer = read_pointer(store)
+    assert pointer["version"] == version
+    assert pointer["sources"][0]["validators"]["mtime"] == stat.st_mtime_ns + 10 ** 9
+
+    downloads = []
+    original = data.download_all
+
+    def download_all(sources, validators):
+        downloads.extend(original(sources, validators))
+        return downloads
+
+    monkeypatch.setattr(data, "download_all", download_all)
+    assert not store.refresh()
+    assert downloads == [None]
+
+
+# Недописанные снимки завершившихся процессов удаляются при публикации, живых - остаются
+def test_prune_removes_abandoned_tmp(sleep_csv, tmp_path):
+    snapshot_dir = tmp_path / "snapshots"
+    store = DataStore(make_sources(sleep_csv), str(snapshot_dir))
+    finished = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+    abandoned = snapshot_dir / f"0123456789abcdef.{finished.pid}.tmp"
+    abandoned.mkdir(parents=True)
+    (abandoned / "column.npy").write_bytes(b"0")
+    pointer = snapshot_dir / f"current.json.{finished.pid}.tmp"
+    pointer.write_text("{")
+    alive = snapshot_dir / f"fedcba9876543210.{os.getppid()}.tmp"
+    alive.mkdir()
+
+    assert store.refresh()
+    assert not abandoned.exists()
+    assert not pointer.exists()
+    assert alive.exists()
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("duckdb")
+
+from api import describe_columns
+from cube import GROUPINGS, Cube
+from duckdb_store import (Snapshot, _differences, _random_query, build_cube, build_stats, describe, execute,
+                          import_sources)
+from query import Query, scan
+from query import execute as execute_pandas
+from sources import make_sources
+from stats import CellStats
+
+SELECTIONS = [{}, {"BMI Category": ["Obese"]}, {"Occupation": ["Doctor", "Nurse"], "BMI Category": ["Overweight"]}]
+
+
+@pytest.fixture
+def snapshot(sleep_csv, tmp_path):
+    path = str(tmp_path / "sleep.parquet")
+    import_sources(make_sources(sleep_csv), path)
+    return Snapshot(path, temp_dir=str(tmp_path))
+
+
+# Случайные запросы и группировки страниц
+def parity_queries(df, count=150, seed=0):
+    random = np.random.default_rng(seed)
+    queries = [_random_query(df, random) for _ in range(count)]
+    queries += [Query(filters={"Gender": {"values": ["Male"]}, "BMI Category": {"values": ["Normal Weight", "Obese"]}},
+                      group_by=keys, aggregations={measure: ["mean"] for measure in measures})
+                for keys, measures in GROUPINGS.values()]
+    return queries
+
+
+def test_sql_matches_pandas_scan(snapshot, sleep_df):
+    for query in parity_queries(sleep_df):
+        expected = execute_pandas(sleep_df, query)[0]
+        result, plan = execute(snapshot, query)
+        assert plan == "sql"
+        assert _differences(expected, result) is None, query.__dict__
+
+
+def test_sql_cube_matches_pandas(snapshot, sleep_df):
+    cube, pandas_cube = build_cube(snapshot), Cube(sleep_df)
+    for query in parity_queries(sleep_df):
+        expected = execute_pandas(sleep_df, query, pandas_cube)[0]
+        assert _differences(expected, execute(snapshot, query, cube)[0]) is None, query.__dict__
+        assert _differences(scan(sleep_df, query).iloc[:query.limit], execute(snapshot, query, cube)[0]) is None
+
+
+def test_cube_cells_match(snapshot, sleep_df):
+    cube, pandas_cube = build_cube(snapshot), Cube(sleep_df)
+    assert cube.dimensions == pandas_cube.dimensions
+    for name, (keys, measures) in GROUPINGS.items():
+        query = Query(group_by=keys, aggregations={measure: ["mean", "sum"] for measure in measures})
+        assert _differences(pandas_cube.answer(name, query), cube.answer(name, query)) is None, name
+
+
+def test_stats_match(snapshot, sleep_df):
+    stats, pandas_stats = build_stats(snapshot), CellStats(sleep_df)
+    for selection in SELECTIONS:
+        actual, expected = stats.summary(selection), pandas_stats.summary(selection)
+        for measure, fields in expected.items():
+            for field, value in fields.items():
+                assert actual[measure][field] == pytest.approx(value, rel=1e-9), (selection, measure, field)
+
+
+def test_describe_matches(snapshot, sleep_df):
+    assert describe(snapshot) == describe_columns(sleep_df)
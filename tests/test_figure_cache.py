@@ -0,0 +1,46 @@
+from figure_cache import FigureCache
+
+
+def make_cache(tmp_path, max_entries=3, touch_interval=0):
+    return FigureCache(str(tmp_path / "figures.sqlite"), max_entries=max_entries, touch_interval=touch_interval)
+
+
+def keys(cache):
+    return {key for key, in cache._connection().execute("SELECT key FROM figures")}
+
+
+# Вытесняются давно не использованные записи, закреплённые остаются сверх лимита
+def test_lru_eviction_keeps_pinned(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set_many([("warm-1", "w1"), ("warm-2", "w2")], version="v", pinned=True)
+    for number in range(3):
+        cache.set(f"key-{number}", str(number))
+    assert cache.get("key-0") == "0"
+    cache.set("key-3", "3")
+    assert keys(cache) == {"warm-1", "warm-2", "key-0", "key-2", "key-3"}
+
+    for number in range(4, 10):
+        cache.set(f"key-{number}", str(number))
+    stats = cache.stats()
+    assert stats["entries"] - stats["pinned"] == 3
+    assert stats["pinned"] == 2
+    assert stats["evictions"] == 7
+
+
+# Чтение обновляет время обращения не чаще интервала, счётчики видны в статистике
+def test_get_touches_coarsely(tmp_path):
+    cache = make_cache(tmp_path, touch_interval=60)
+    cache.set("key", "value")
+    connection = cache._connection()
+    connection.execute("UPDATE figures SET accessed = accessed - 30")
+    accessed = connection.execute("SELECT accessed FROM figures").fetchone()[0]
+    assert cache.get("key") == "value"
+    assert connection.execute("SELECT accessed FROM figures").fetchone()[0] == accessed
+    assert connection.execute("SELECT COUNT(*) FROM counters").fetchone()[0] == 0
+
+    connection.execute("UPDATE figures SET accessed = accessed - 60")
+    assert cache.get("key") == "value"
+    assert connection.execute("SELECT accessed FROM figures").fetchone()[0] > accessed
+    assert cache.get("missing") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from filter_index import FilterIndex
+
+SELECTIONS = [
+    {"Gender": ["Male"]},
+    {"BMI Category": ["Obese", "Overweight"]},
+    {"Gender": ["Female"], "Occupation": ["Doctor", "Nurse", "Doctor"]},
+    {"Gender": ["Male", "Female"], "BMI Category": ["Normal Weight"], "Occupation": ["Teacher"]},
+    {"Occupation": ["Doctor", "Astronaut"]},
+    {"Gender": [], "BMI Category": ["Obese"]},
+]
+
+
+# Маска индекса совпадает с фильтром pandas (isin) для категорий и обычных строк
+@pytest.mark.parametrize("categorical", [True, False])
+def test_mask_matches_pandas(sleep_df, categorical):
+    df = sleep_df if categorical else sleep_df.astype({column: object for column in ["Gender", "BMI Category", "Occupation"]})
+    index = FilterIndex(df)
+    for selections in SELECTIONS:
+        expected = np.ones(len(df), dtype=bool)
+        for column, values in selections.items():
+            if values:
+                expected &= df[column].isin(values).to_numpy()
+        np.testing.assert_array_equal(index.mask(selections), expected, err_msg=str(selections))
+
+
+def test_empty_selection_is_no_filter(sleep_df):
+    index = FilterIndex(sleep_df)
+    assert index.mask({}) is None
+    assert index.mask({"Gender": [], "Occupation": None}) is None
@@ -0,0 +1,58 @@
+import pytest
+from flask import Flask
+
+import api
+from query import Query
+
+# Корректный JSON с неверной структурой запроса: ошибка разбора (400), а не 500
+MALFORMED = [
+    [],
+    {"filters": [1]},
+    {"filters": "Gender"},
+    {"aggregations": ["Age"]},
+    {"aggregations": {"Age": 5}},
+    {"aggregations": {"Age": [5]}},
+    {"aggregations": {"Age": {"mean": True}}},
+    {"group_by": "Gender"},
+    {"group_by": [{}]},
+    {"group_by": [["Gender"]]},
+    {"group_by": ["Gender", "Gender"]},
+    {"filters": {"Gender": "Male"}},
+    {"filters": {"Age": {"min": "30"}}},
+    {"limit": -1},
+    {"limit": True},
+    {"filters": {"Age": {"min": True}}},
+    {"filters": {"Age": [True]}},
+    {"select": ["Age"]},
+]
+
+
+@pytest.mark.parametrize("spec", MALFORMED)
+def test_parse_rejects_malformed(spec):
+    with pytest.raises(ValueError):
+        Query.parse(spec)
+
+
+@pytest.mark.parametrize("spec", MALFORMED)
+def test_api_returns_400(spec):
+    server = Flask(__name__)
+    api.init_app(server)
+    response = server.test_client().post("/api/query", json=spec)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_parse_normalizes():
+    query = Query.parse({
+        "filters": {"Gender": ["Male", "Female", "Male"], "Occupation": [], "Age": {"min": 30}},
+        "group_by": ["Occupation"],
+        "aggregations": {"Quality of Sleep": "mean", "Sleep Duration": ["p90", "count", "median"]},
+    })
+    assert query.filters == {"Gender": {"values": ["Female", "Male"]}, "Age": {"min": 30}}
+    assert query.aggregations == {"Quality of Sleep": ["mean"], "Sleep Duration": ["median", "p90"]}
+    same = Query.parse({
+        "filters": {"Age": {"min": 30}, "Gender": ["Male", "Female"]},
+        "group_by": ["Occupation"],
+        "aggregations": {"Sleep Duration": ["median", "p90"], "Quality of Sleep": ["mean"]},
+    })
+    assert query.fingerprint() == same.fingerprint()
@@ -0,0 +1,42 @@
+import pytest
+
+from conftest import read_source, sleep_rows
+from data import DataStore
+from sources import make_sources
+from stats import CellStats
+
+SELECTIONS = [{}, {"BMI Category": ["Obese"]}, {"Occupation": ["Doctor", "Nurse"]},
+              {"BMI Category": ["Normal Weight", "Overweight"], "Occupation": ["Engineer", "Lawyer"]}]
+
+
+def assert_same_summaries(actual, expected):
+    for selection in SELECTIONS:
+        actual_summary, expected_summary = actual.summary(selection), expected.summary(selection)
+        for measure, fields in expected_summary.items():
+            for field, value in fields.items():
+                assert actual_summary[measure][field] == pytest.approx(value, rel=1e-9, abs=1e-12), (selection, measure, field)
+
+
+# Ячейки, которых не было в первой части (профессия Lawyer), добавляются при обновлении
+def test_updated_matches_full(sleep_df):
+    lawyers = sleep_df["Occupation"] == "Lawyer"
+    streamed = CellStats(sleep_df[~lawyers]).updated(sleep_df[lawyers]).updated(sleep_df.iloc[:0])
+    assert_same_summaries(streamed, CellStats(sleep_df))
+
+
+# Статистика снимка после дописывания строк в источник совпадает с пересчётом всего набора
+def test_append_refresh_matches_rebuild(sleep_csv, tmp_path, monkeypatch):
+    updates = []
+
+    def update(stats, new_rows):
+        updates.append(len(new_rows))
+        return CellStats.updated(stats, new_rows)
+
+    store = DataStore(make_sources(sleep_csv), str(tmp_path / "snapshots"))
+    store.register("stats", CellStats, persist=True, update=update)
+    assert store.refresh()
+    sleep_rows(150, seed=1, start=601).to_csv(sleep_csv, mode="a", header=False, index=False)
+    assert store.refresh()
+
+    assert updates == [150]
+    assert_same_summaries(store.get_derived("stats"), CellStats(read_source(sleep_csv)))
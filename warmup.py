@@ -0,0 +1,91 @@
+import argparse
+import importlib
+import itertools
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Страницы с фильтрами: пространство имён кеша -> модуль страницы
+PAGES = {"first": "pages.first", "second": "pages.second"}
+
+
+# Все подмножества значений фильтра, включая пустое (фильтр не задан)
+def subsets(options, max_selected=None):
+    values = [option["value"] for option in options]
+    sizes = range(min(len(values), max_selected if max_selected is not None else len(values)) + 1)
+    return [list(combination) for size in sizes for combination in itertools.combinations(values, size)]
+
+
+# Все комбинации фильтров страницы
+def combinations(page, max_selected=None):
+    columns = list(page.FILTERS)
+    for values in itertools.product(*(subsets(page.FILTERS[column], max_selected) for column in columns)):
+        yield dict(zip(columns, values))
+
+
+# Построение всех графиков страницы для одной комбинации в процессе пула.
+# Параметры построения (FIGURE_PARAMS страницы, например видимая область адаптивного
+# графика рассеяния) те же, что у обратного вызова при открытии страницы, иначе
+# ключ не совпадёт с запрашиваемым
+def render(namespace, selections):
+    from figure_cache import FigureCache, render_figure
+    from data import get_version
+
+    page = importlib.import_module(PAGES[namespace])
+    figure_params = getattr(page, "FIGURE_PARAMS", {})
+    version = get_version()
+    started = time.perf_counter()
+    items = []
+    for figure_id, build in page.FIGURES.items():
+        params = figure_params[figure_id](selections) if figure_id in figure_params else None
+        items.append((FigureCache.make_key(f"{namespace}/{figure_id}", selections, version, params),
+                      render_figure(build, selections, params)))
+    elapsed = time.perf_counter() - started
+    return items, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Предрасчёт графиков для всех комбинаций фильтров")
+    parser.add_argument("--pages", nargs="+", choices=list(PAGES), default=list(PAGES), help="страницы для предрасчёта")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="число процессов пула")
+    parser.add_argument("--max-selected", type=int, help="максимальное число выбранных значений в одном фильтре")
+    parser.add_argument("--report", help="путь к JSON файлу со временем построения каждой комбинации")
+    parser.add_argument("-v", "--verbose", action="store_true", help="выводить время каждой комбинации")
+    args = parser.parse_args()
+
+    from data import get_version
+    from figure_cache import cache
+
+    version = get_version()
+    pruned = cache.prune(version)
+    if pruned:
+        print(f"Удалено устаревших записей: {pruned}")
+
+    started = time.perf_counter()
+    report = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for namespace in args.pages:
+            page = importlib.import_module(PAGES[namespace])
+            tasks = [(selections, pool.submit(render, namespace, selections)) for selections in combinations(page, args.max_selected)]
+            timings = []
+            for selections, task in tasks:
+                items, elapsed = task.result()
+                cache.set_many(items, version, pinned=True)
+                timings.append(elapsed)
+                report.append({"page": namespace, "selections": selections, "seconds": elapsed})
+                if args.verbose:
+                    print(f"{namespace} {json.dumps(selections, ensure_ascii=False)}: {elapsed * 1000:.1f} мс")
+            print(f"{namespace}: {len(timings)} комбинаций, медиана {statistics.median(timings) * 1000:.1f} мс, "
+                  f"максимум {max(timings) * 1000:.1f} мс, сумма {sum(timings):.1f} с")
+    total = time.perf_counter() - started
+    print(f"Общее время: {total:.1f} с (версия данных {version})")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump({"version": version, "wall_seconds": total, "combinations": report}, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()